@@ -1,28 +1,17 @@
-import geocoder
-from skyfield.api import load, Topos
-from datetime import datetime
-import requests
-from io import BytesIO
-from PIL import Image
+# Heavy libraries (geocoder, Skyfield, requests, PIL, matplotlib, Streamlit, pandas) are
+# imported inside the functions that use them, so importing this module stays cheap.
+from datetime import datetime, date, timezone
 import html
-from skyfield.api import utc
 import re
-import matplotlib.pyplot as plt
-from skyfield.data import hipparcos
-from skyfield.api import Star
-import streamlit as st
-import pydeck as pdk
-from datetime import date, time
-import pandas as pd
-import math
 import os
-import numpy as np
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from constellation_utils import load_constellation_data
+
+utc = timezone.utc # Same object as skyfield.api.utc, without importing Skyfield
 
 # Step 1: Get User Location (Working well do not touch )
 def get_user_location():
+    import geocoder
     permission = input("Do you allow access to your location? (yes/no): ").strip().lower()
     if permission != 'yes':
         print("Location access denied. Exiting.")
@@ -52,12 +41,16 @@ def get_user_datetime():
 
 # Step 2: Retrieve Astronomical Data
 def get_visible_objects(lat, lon, user_dt=None):
-    ts = load.timescale()
+    from skyfield.api import Topos, Star
+    from skyfield.data import hipparcos
+    from resource_utils import get_timescale, get_ephemeris, get_hipparcos
+    from constellation_utils import constellation_at
+    ts = get_timescale()
     if user_dt:
         t = ts.from_datetime(user_dt)
     else:
         t = ts.now()
-    planets = load('de421.bsp')
+    planets = get_ephemeris('de421.bsp')
     earth = planets['earth']
     observer = earth + Topos(latitude_degrees=lat, longitude_degrees=lon)
     visible = []
@@ -68,7 +61,8 @@ def get_visible_objects(lat, lon, user_dt=None):
             continue
         try:
             planet = planets[name]
-            alt, az, _ = observer.at(t).observe(planet).apparent().altaz()
+            apparent = observer.at(t).observe(planet).apparent()
+            alt, az, _ = apparent.altaz()
             if alt.degrees > 0:
                 pretty_name = name.replace(' barycenter', '').capitalize()
                 obj_type = 'Planet' if pretty_name in ['Mercury','Venus','Earth','Mars','Jupiter','Saturn','Uranus','Neptune','Pluto'] else pretty_name
@@ -77,47 +71,43 @@ def get_visible_objects(lat, lon, user_dt=None):
                     'type': obj_type,
                     'altitude': round(alt.degrees, 2),
                     'azimuth': round(az.degrees, 2),
-                    'raw_name': name
+                    'raw_name': name,
+                    'constellation': constellation_at(apparent), # IAU boundaries
                 })
         except Exception:
             continue
     # for Bright stars (Hipparcos, mag < 2.0)
-    with load.open(hipparcos.URL) as f:
-        stars = hipparcos.load_dataframe(f)
+    stars = get_hipparcos(hipparcos.URL)
     bright_stars = stars[stars['magnitude'] < 2.0]
+    above = []
     for hip, star_row in bright_stars.iterrows():
         star = Star(ra_hours=star_row['ra_hours'], dec_degrees=star_row['dec_degrees'])
-        astrometric = observer.at(t).observe(star)
-        alt, az, _ = astrometric.apparent().altaz()
+        apparent = observer.at(t).observe(star).apparent()
+        alt, az, _ = apparent.altaz()
         if alt.degrees > 0:
-            # Try to get a common name from 'proper', else fetch from Wikipedia description, else None
-            star_name = star_row.get('proper')
-            if isinstance(star_name, str) and star_name.strip():
-                common_name = star_name.strip()
-            else:
-                # Try to get name from Wikipedia description
-                desc = get_object_description(f"HIP {hip}")
-                if desc:
-                    match = re.match(r"([A-Z][a-zA-Z0-9\-]*) ", desc)
-                    if match:
-                        common_name = match.group(1)
-                    else:
-                        common_name = None
-                else:
-                    common_name = None
-            if common_name:
-                name_to_use = f"Common Name: {common_name} | Name: HIP {hip}"
-            else:
-                name_to_use = f"Common Name: None | Name: HIP {hip}"
-            constellation = star_row['constellation'] if 'constellation' in star_row else ''
-            visible.append({
-                'name': name_to_use,
-                'type': 'Star',
-                'altitude': round(alt.degrees, 2),
-                'azimuth': round(az.degrees, 2),
-                'raw_name': f"HIP {hip}",
-                'constellation': constellation
-            })
+            above.append((hip, star_row, apparent, alt, az))
+    # Names come from the bundled star-name index, so naming a star needs no Wikipedia request
+    from resource_utils import get_star_names
+    star_names = get_star_names()
+    for hip, star_row, apparent, alt, az in above:
+        # Common name from 'proper', else the IAU proper name or Bayer/Flamsteed designation, else None
+        names = star_names.get(hip) or {}
+        common_name = _proper_name(star_row) or names.get('proper') or names.get('bayer') or names.get('flamsteed')
+        if common_name:
+            name_to_use = f"Common Name: {common_name} | Name: HIP {hip}"
+        else:
+            name_to_use = f"Common Name: None | Name: HIP {hip}"
+        # The catalog's own column if it has one, else the IAU boundaries at the star's position
+        constellation = star_row.get('constellation') or constellation_at(apparent)
+        visible.append({
+            'name': name_to_use,
+            'type': 'Star',
+            'altitude': round(alt.degrees, 2),
+            'azimuth': round(az.degrees, 2),
+            'raw_name': f"HIP {hip}",
+            'constellation': constellation,
+            'wiki_title': names.get('wiki_title'),
+        })
     # Remove duplicates and sort by altitude descending
     seen = set()
     unique_visible = []
@@ -128,8 +118,13 @@ def get_visible_objects(lat, lon, user_dt=None):
             unique_visible.append(obj)
     return unique_visible
 
+def _proper_name(star_row):
+    name = star_row.get('proper')
+    return name.strip() if isinstance(name, str) and name.strip() else None
+
 # Step 3: Retrieve and Display Object Images
 def get_object_image_url(name):
+    import requests
     url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{name}"
     try:
         resp = requests.get(url, timeout=5)
@@ -141,29 +136,32 @@ def get_object_image_url(name):
         pass
     return None
 
-def display_image(image_url, title, wiki_name=None):
+def display_image(image_url, title, wiki_name=None, description=None):
+    from io import BytesIO
+    from PIL import Image
+    import matplotlib.pyplot as plt
+    from image_utils import DETAIL_SIZE, get_thumbnail
     if wiki_name is None:
         wiki_name = title
-    desc = get_object_description(wiki_name)
+    # Only fetched when the caller has not resolved the description already
+    desc = description if description is not None else get_object_description(wiki_name)
     print(f"Description for {title}:\n{desc}\n" if desc else f"No description found for {title}.")
     if not image_url:
         print(f"No image found for {title}.")
         return
-    try:
-        resp = requests.get(image_url, timeout=5)
-        if resp.status_code == 200:
-            img = Image.open(BytesIO(resp.content))
-            plt.imshow(img)
-            plt.axis('off')
-            plt.title(title)
-            plt.show()
-        else:
-            print(f"Could not retrieve image for {title}.")
-    except Exception:
+    # Downloaded and resized once; later views decode the small cached copy
+    data = get_thumbnail(image_url, DETAIL_SIZE, crop=False)
+    if data is None:
         print(f"Could not retrieve image for {title}.")
+        return
+    plt.imshow(Image.open(BytesIO(data)))
+    plt.axis('off')
+    plt.title(title)
+    plt.show()
 
 # New helper function to get a readable description from Wikipedia API
 def get_object_description(name):
+    import requests
     url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{name}"
     try:
         resp = requests.get(url, timeout=5)
@@ -175,74 +173,75 @@ def get_object_description(name):
         pass
     return None
 
-def load_constellation_lines(fab_path):
-    """Load constellation lines from .fab file. Returns a list of (HIP1, HIP2) tuples."""
-    lines = []
-    with open(fab_path, 'r') as f:
-        for line in f:
-            parts = line.strip().split()
-            if len(parts) < 3:
-                continue
-            # Format: CONST_ABBR N HIP1 HIP2 HIP3 ...
-            hips = [int(p) for p in parts[2:]]
-            for i in range(0, len(hips)-1, 2):
-                lines.append((hips[i], hips[i+1]))
-    return lines
-
-def label_constellations(ax, constellation_lines, hip_coords, hip_name_df):
-    """Label constellations at the midpoint of their lines."""
-    for (hip1, hip2) in constellation_lines:
-        if hip1 in hip_coords and hip2 in hip_coords:
-            az1, r1 = hip_coords[hip1]
-            az2, r2 = hip_coords[hip2]
-            mid_az = (az1 + az2) / 2
-            mid_r = (r1 + r2) / 2
-            name1 = hip_name_df.get(hip1, str(hip1))
-            ax.text(mid_az, mid_r, name1, fontsize=6, color='gray', ha='center', va='center', alpha=0.5)
-
 # --- Sky Chart ---
-def plot_sky_chart(objects, address, time_label, constellation_lines, hip_name_df):
+def plot_sky_chart(records, address, time_label, constellation_index=None):
+    """PNG bytes of the polar sky chart of resolve_objects() records; all drawing is done by
+    chart_utils (one scatter, one LineCollection)."""
+    from chart_utils import sky_chart_png
     print("[INFO] Plotting sky chart...")
-    fig = plt.figure(figsize=(8, 8))
-    ax = plt.subplot(111, polar=True)
-    ax.set_theta_zero_location('N')
-    ax.set_theta_direction(-1)
-    ax.set_title(f"Sky Chart – {address} – {time_label}", fontsize=14)
+    # Stars here carry 'raw_name' ("HIP n"), which chart_utils.hip_number uses to join the stick figures
+    charted = [dict(record['object'], display_name=record['label']) for record in records]
+    return sky_chart_png(charted, f"Sky Chart – {address} – {time_label}", constellation_index)
 
-    hip_coords = {}
-    for obj in objects:
-        if obj['type'] == 'Star':
-            hip_id = obj.get('hip_id')
-            if hip_id is not None:
-                az_rad = math.radians(obj['azimuth'])
-                r = 90 - obj['altitude']
-                hip_coords[hip_id] = (az_rad, r)
+def _common_name(obj):
+    """A star's common name from its 'Common Name: X | Name: HIP n' label, or None."""
+    match = re.search(r"Common Name: ([^|]+)", obj['name'])
+    name = match.group(1).strip() if match else None
+    if not name or name.lower() == 'none' or name.lower().startswith('hip') or name.isdigit():
+        return None
+    return name
 
-    for hip1, hip2 in constellation_lines:
-        if hip1 in hip_coords and hip2 in hip_coords:
-            az1, r1 = hip_coords[hip1]
-            az2, r2 = hip_coords[hip2]
-            ax.plot([az1, az2], [r1, r2], 'gray', linewidth=0.5)
+def _wiki_object(obj):
+    """The object as enrichment_utils.candidate_titles expects it (type, name, hip_id, wiki_title)."""
+    if obj['type'] != 'Star':
+        return {'type': obj['type'], 'name': obj['name']}
+    hip_name = obj.get('raw_name', obj['name'])
+    return {'type': 'Star', 'name': _common_name(obj) or hip_name, 'hip_id': hip_name, 'wiki_title': obj.get('wiki_title')}
 
-    label_constellations(ax, constellation_lines, hip_coords, hip_name_df)
+def _chart_label(obj):
+    if obj['type'] != 'Star':
+        return obj['name']
+    return _common_name(obj) or obj.get('raw_name', obj['name'])
 
-    for obj in objects:
-        az_rad = math.radians(obj['azimuth'])
-        r = 90 - obj['altitude']
-        marker = {'Planet': 'o', 'Star': '*', 'Satellite': 's', 'Sun': 'X', 'Moon': 'D'}.get(obj['type'], '.')
-        name = obj.get('display_name', obj['name'])
-        ax.plot(az_rad, r, marker, label=f"{name} ({obj['type']})", markersize=6)
-        ax.text(az_rad, r, name, fontsize=8, ha='center', va='bottom')
+def _constellation_from_description(description):
+    match = re.search(r"constellation ([A-Za-z ]+)[,\.]", description, re.IGNORECASE) if description else None
+    return match.group(1).strip() if match else None
 
-    ax.set_rlim(0, 90)
-    ax.set_rlabel_position(135)
-    ax.grid(True)
-    plt.legend(loc='lower right', bbox_to_anchor=(1.25, 0.0))
-    plt.savefig(f"sky_chart_{time_label}.png")
-    plt.show()
+def resolve_objects(objects, details, images):
+    """One record per object with everything the dashboard shows about it, resolved once per render
+    and shared by the table, the charts, the details and the CSV export. details are enrich()
+    results and images thumbnails by URL, both keyed as the objects are ordered."""
+    from wiki_utils import summary_description, summary_image_url
+    records = []
+    for i, obj in enumerate(objects):
+        wiki_name, summary = details[i]
+        description = summary_description(summary)
+        image_url = summary_image_url(summary)
+        if obj['type'] == 'Star':
+            hip_name = obj.get('raw_name', obj['name'])
+            name = f"{_common_name(obj) or hip_name} ({hip_name}) (Star)"
+        else:
+            name = f"{obj['name']} ({obj['type']})"
+        records.append({
+            'object': obj,
+            'name': name,                  # Table, details and export
+            'label': _chart_label(obj),    # Charts
+            'type': obj['type'],
+            'altitude': obj['altitude'],
+            'azimuth': obj['azimuth'],
+            # Computed with the positions; the Wikipedia text only for anything still without one
+            'constellation': obj.get('constellation') or _constellation_from_description(description) or '',
+            'wiki_name': wiki_name,
+            'description': description,
+            'image_url': image_url,
+            'image': images.get(image_url), # Cached thumbnail bytes, None if it could not be fetched
+        })
+    return records
 
 # Main Program
 def main():
+    import streamlit as st
+    import pandas as pd
     st.set_page_config(page_title="What's Up? Astronomy Dashboard", layout="wide")
     st.title("What's Up? Astronomy Dashboard")
     st.write("This dashboard shows visible astronomical objects from your location and time.")
@@ -254,6 +253,7 @@ def main():
     manual = col2.checkbox("Enter location manually")
     lat, lon, address = None, None, None
     if use_auto:
+        import geocoder # Only needed (and only paid for) on the auto-detect path
         g = geocoder.ip('me')
         if g.ok:
             lat, lon = g.latlng
@@ -288,11 +288,17 @@ def main():
     show_planets = st.checkbox("Show Planets", value=True)
     show_sun = st.checkbox("Show Sun", value=True)
     show_moon = st.checkbox("Show Moon", value=True)
+    from satellite_utils import TLE_PATH
+    # Only offered with a local element file; the sunlit satellites in a dark sky, as they can be seen
+    show_satellites = os.path.exists(TLE_PATH) and st.checkbox("Show Satellites", value=False)
 
     # --- Fetch Data ---
     st.header("4. Visible Astronomical Objects")
     with st.spinner("Fetching visible astronomical objects..."):
         visible_objects = get_visible_objects(lat, lon, dt)
+        if show_satellites:
+            from satellite_utils import get_visible_satellites
+            visible_objects += get_visible_satellites(lat, lon, dt, sunlit_only=True)
     if not visible_objects:
         st.warning("No astronomical objects are currently visible from your location.")
         st.stop()
@@ -317,76 +323,44 @@ def main():
     elif sort_by == "Type":
         filtered = sorted(filtered, key=lambda x: x['type'])
 
+    # --- Wikipedia Details ---
+    # Candidate page titles of every object ("X (star)", "X (astronomy)", X, HIP ...) are resolved
+    # in one pass before the table and detail view need them: identical titles once, many titles
+    # per request, and each object keeps the first page that exists
+    from enrichment_utils import candidate_titles, enrich
+    from wiki_utils import summary_image_url
+    from image_utils import DETAIL_SIZE, iter_thumbnails
+    with st.spinner("Fetching object details..."):
+        details = enrich({i: candidate_titles(_wiki_object(obj)) for i, obj in enumerate(filtered)})
+        # Images are downloaded and resized concurrently, once each, then served from the local cache
+        images = dict(iter_thumbnails([summary_image_url(summary) for _, summary in details.values()], DETAIL_SIZE, crop=False))
+    records = resolve_objects(filtered, details, images)
+
     # --- Table ---
-    table_data = []
-    for obj in filtered:
-        # Always show constellation if available, and try to extract from star_row if missing
-        constellation = obj.get('constellation', '')
-        if not constellation and 'Constellation:' in obj['name']:
-            match = re.search(r"Constellation: ([^|]+)", obj['name'])
-            if match:
-                constellation = match.group(1).strip()
-        # For stars, also try to extract from raw_name if missing
-        if obj['type'] == 'Star' and not constellation:
-            hip_match = re.search(r"HIP (\d+)", obj['raw_name']) if 'raw_name' in obj else None
-            if hip_match:
-                hip_num = int(hip_match.group(1))
-                try:
-                    with load.open(hipparcos.URL) as f:
-                        stars = hipparcos.load_dataframe(f)
-                    star_row = stars.loc[hip_num]
-                    if 'constellation' in star_row and isinstance(star_row['constellation'], str):
-                        constellation = star_row['constellation']
-                except Exception:
-                    pass
-        # Try to extract constellation from Wikipedia description if still missing
-        if not constellation:
-            desc = get_object_description(obj['name'])
-            if desc:
-                match = re.search(r"constellation ([A-Za-z ]+)[,\.]", desc, re.IGNORECASE)
-                if match:
-                    constellation = match.group(1).strip()
-        if obj['type'] == 'Star':
-            hip_match = re.search(r"HIP (\d+)", obj['name'])
-            hip_name = f"HIP {hip_match.group(1)}" if hip_match else obj['name']
-            common_name_match = re.search(r"Common Name: ([^|]+)", obj['name'])
-            common_name = common_name_match.group(1).strip() if common_name_match else None
-            if common_name and common_name.lower() != 'none' and common_name.strip() and not common_name.lower().startswith('hip') and not common_name.strip().isdigit():
-                display_name = f"{common_name} ({hip_name}) (Star)"
-            else:
-                display_name = f"{hip_name} ({hip_name}) (Star)"
-            table_data.append({
-                'Name': display_name,
-                'Type': obj['type'],
-                'Constellation': constellation,
-                'Altitude (°)': obj['altitude'],
-                'Azimuth (°)': obj['azimuth']
-            })
-        else:
-            table_data.append({
-                'Name': f"{obj['name']} ({obj['type']})",
-                'Type': obj['type'],
-                'Constellation': constellation,
-                'Altitude (°)': obj['altitude'],
-                'Azimuth (°)': obj['azimuth']
-            })
-    st.dataframe(pd.DataFrame(table_data))
+    table = pd.DataFrame({
+        'Name': [record['name'] for record in records],
+        'Type': [record['type'] for record in records],
+        'Constellation': [record['constellation'] for record in records],
+        'Altitude (°)': [record['altitude'] for record in records],
+        'Azimuth (°)': [record['azimuth'] for record in records],
+    })
+    st.dataframe(table)
 
     # --- Sky Chart Visualization ---
     st.header("5. Sky Chart (Experimental)")
     try:
         import matplotlib.pyplot as plt
-        import numpy as np
         fig, ax = plt.subplots(figsize=(8, 4))
         ax.set_xlim(0, 360)
         ax.set_ylim(0, 90)
         ax.set_xlabel('Azimuth (°)')
         ax.set_ylabel('Altitude (°)')
         ax.set_title('Sky Chart: Altitude vs Azimuth')
-        for obj in filtered:
-            color = 'yellow' if obj['name'] == 'Sun' else ('gray' if obj['name'] == 'Moon' else ('red' if obj['type'] == 'Planet' else 'white'))
-            ax.scatter(obj['azimuth'], obj['altitude'], color=color, label=obj['name'], s=60, edgecolor='black')
-            ax.text(obj['azimuth'], obj['altitude']+2, obj['name'], fontsize=8, ha='center', color=color)
+        for record in records:
+            label = record['label']
+            color = 'yellow' if label == 'Sun' else ('gray' if label == 'Moon' else ('red' if record['type'] == 'Planet' else 'white'))
+            ax.scatter(record['azimuth'], record['altitude'], color=color, label=label, s=60, edgecolor='black')
+            ax.text(record['azimuth'], record['altitude']+2, label, fontsize=8, ha='center', color=color)
         ax.set_facecolor('navy')
         ax.grid(True, color='white', alpha=0.2)
         handles, labels = ax.get_legend_handles_labels()
@@ -399,151 +373,40 @@ def main():
     # --- Sky Chart Visualization (Full) ---
     st.header("5. Full Sky Chart (Constellations)")
     try:
-        # Load constellation lines and HIP name data
+        from resource_utils import get_constellation_index
         fab_path = os.path.join(os.path.dirname(__file__), '../constellationship.fab')
-        constellation_lines = load_constellation_lines(fab_path)
-        # HIP name DataFrame: map HIP int to name (for labeling)
-        hip_name_df = {}
-        try:
-            with open(os.path.join(os.path.dirname(__file__), '../hip_main.dat'), 'r', encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    parts = line.strip().split()
-                    if len(parts) > 1:
-                        try:
-                            hip_id = int(parts[0])
-                            name = parts[1]
-                            hip_name_df[hip_id] = name
-                        except Exception:
-                            continue
-        except Exception:
-            pass
-        # Use filtered objects for the chart
         time_label = dt.strftime('%Y%m%d_%H%M')
-        plot_sky_chart(filtered, address, time_label, constellation_lines, hip_name_df)
+        st.image(plot_sky_chart(records, address, time_label, get_constellation_index(fab_path)))
         st.success("Full sky chart with constellation lines generated.")
     except Exception as e:
         st.warning(f"Full sky chart not available: {e}")
 
     # --- Details Section ---
     st.header("6. Learn More About Each Object")
-    for obj in filtered:
-        # Always show constellation if available, and try to extract from star_row if missing
-        constellation = obj.get('constellation', '')
-        if not constellation and 'Constellation:' in obj['name']:
-            match = re.search(r"Constellation: ([^|]+)", obj['name'])
-            if match:
-                constellation = match.group(1).strip()
-        if obj['type'] == 'Star' and not constellation:
-            hip_match = re.search(r"HIP (\d+)", obj['raw_name']) if 'raw_name' in obj else None
-            if hip_match:
-                hip_num = int(hip_match.group(1))
-                try:
-                    with load.open(hipparcos.URL) as f:
-                        stars = hipparcos.load_dataframe(f)
-                    star_row = stars.loc[hip_num]
-                    if 'constellation' in star_row and isinstance(star_row['constellation'], str):
-                        constellation = star_row['constellation']
-                except Exception:
-                    pass
+    for record in records:
+        obj = record['object']
+        constellation = record['constellation']
         with st.expander(f"Details: {obj['name']}"):
+            st.markdown(f"**Name:** {record['name'] if obj['type'] == 'Star' else obj['name']}")
+            st.markdown(f"**Type:** {record['type']}")
             if obj['type'] == 'Star':
-                hip_match = re.search(r"HIP (\d+)", obj['name'])
-                hip_name = f"HIP {hip_match.group(1)}" if hip_match else obj['name']
-                common_name_match = re.search(r"Common Name: ([^|]+)", obj['name'])
-                common_name = common_name_match.group(1).strip() if common_name_match else None
-                if not (common_name and common_name.lower() != 'none' and common_name.strip() and not common_name.lower().startswith('hip') and not common_name.strip().isdigit()):
-                    desc = get_object_description(hip_name)
-                    if desc:
-                        match = re.match(r"([A-Z][a-zA-Z0-9\-]*)[ ,]", desc)
-                        if match:
-                            common_name = match.group(1)
-                if common_name and common_name.lower() != 'none' and common_name.strip() and not common_name.lower().startswith('hip') and not common_name.strip().isdigit():
-                    display_name = f"{common_name} ({hip_name}) (Star)"
-                else:
-                    display_name = f"{hip_name} ({hip_name}) (Star)"
-                st.markdown(f"**Name:** {display_name}")
-                st.markdown(f"**Type:** {obj['type']}")
                 st.markdown(f"**Constellation:** {constellation if constellation else 'Unknown'}")
-                st.markdown(f"**Altitude:** {obj['altitude']}°")
-                st.markdown(f"**Azimuth:** {obj['azimuth']}°")
-                image_url = None
-                wiki_name = None
-                if common_name and common_name.lower() != 'none' and common_name.strip() and not common_name.lower().startswith('hip') and not common_name.strip().isdigit():
-                    image_url = get_object_image_url(common_name + " (star)")
-                    wiki_name = common_name + " (star)"
-                    if not image_url:
-                        image_url = get_object_image_url(common_name + " (astronomy)")
-                        wiki_name = common_name + " (astronomy)"
-                    if not image_url:
-                        image_url = get_object_image_url(common_name)
-                        wiki_name = common_name
-                if not image_url:
-                    image_url = get_object_image_url(hip_name)
-                    wiki_name = hip_name
-                if not image_url and 'desc' in locals() and desc:
-                    bayer_match = re.search(r"designation ([^,\. ]+)", desc, re.IGNORECASE)
-                    if bayer_match:
-                        bayer_name = bayer_match.group(1)
-                        image_url = get_object_image_url(bayer_name)
-                        wiki_name = bayer_name
-                desc = get_object_description(wiki_name) if wiki_name else None
-                if desc:
-                    st.info(desc)
-                if image_url:
-                    st.image(image_url, caption=wiki_name, use_column_width=True)
-                else:
-                    st.warning("No image found.")
-            elif obj['name'] in ['Sun', 'Moon']:
-                st.markdown(f"**Name:** {obj['name']}")
-                st.markdown(f"**Type:** {obj['type']}")
-                st.markdown(f"**Altitude:** {obj['altitude']}°")
-                st.markdown(f"**Azimuth:** {obj['azimuth']}°")
-                st.markdown(f"**Constellation:** {constellation if constellation else 'N/A'}")
-                wiki_name = obj['name']
-                image_url = get_object_image_url(obj['name'])
-                desc = get_object_description(wiki_name)
-                if desc:
-                    st.info(desc)
-                if image_url:
-                    st.image(image_url, caption=wiki_name, use_column_width=True)
-                else:
-                    st.warning("No image found.")
-            elif obj['type'] == 'Planet':
-                st.markdown(f"**Name:** {obj['name']}")
-                st.markdown(f"**Type:** {obj['type']}")
-                st.markdown(f"**Altitude:** {obj['altitude']}°")
-                st.markdown(f"**Azimuth:** {obj['azimuth']}°")
+            st.markdown(f"**Altitude:** {record['altitude']}°")
+            st.markdown(f"**Azimuth:** {record['azimuth']}°")
+            if obj['type'] != 'Star':
                 st.markdown(f"**Constellation:** {constellation if constellation else 'N/A'}")
-                wiki_name = obj['name'] + " (planet)"
-                image_url = get_object_image_url(wiki_name)
-                desc = get_object_description(wiki_name)
-                if desc:
-                    st.info(desc)
-                if image_url:
-                    st.image(image_url, caption=wiki_name, use_column_width=True)
-                else:
-                    st.warning("No image found.")
+            if record['description']:
+                st.info(record['description'])
+            if record['image_url']:
+                # The cached thumbnail, or the original URL only if it could not be fetched
+                st.image(record['image'] or record['image_url'], caption=record['wiki_name'], use_column_width=True)
             else:
-                st.markdown(f"**Name:** {obj['name']}")
-                st.markdown(f"**Type:** {obj['type']}")
-                st.markdown(f"**Altitude:** {obj['altitude']}°")
-                st.markdown(f"**Azimuth:** {obj['azimuth']}°")
-                st.markdown(f"**Constellation:** {constellation if constellation else 'N/A'}")
-                wiki_name = obj['name']
-                image_url = get_object_image_url(wiki_name)
-                desc = get_object_description(wiki_name)
-                if desc:
-                    st.info(desc)
-                if image_url:
-                    st.image(image_url, caption=wiki_name, use_column_width=True)
-                else:
-                    st.warning("No image found.")
+                st.warning("No image found.")
 
     # --- Export Section ---
     st.header("7. Export Visible Objects")
-    if table_data:
-        df = pd.DataFrame(table_data)
-        csv = df.to_csv(index=False).encode('utf-8')
+    if len(table):
+        csv = table.to_csv(index=False).encode('utf-8') # The table above, as shown
         st.download_button(
             label="Download visible objects as CSV",
             data=csv,
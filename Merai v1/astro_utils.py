@@ -1,53 +1,78 @@
-from skyfield.api import load, Topos, Star
-from skyfield.data import hipparcos
+import numpy as np
+from skyfield.api import Topos
+from resource_utils import DE421_PATH, HIPP_PATH, get_timescale, get_ephemeris, get_star_catalog, get_star_index, get_star_names
+from catalog_utils import star_from_catalog, proper_names
+from constellation_utils import constellation_at
+from planet_utils import compute_bodies, visible_body_state
+from sky_state import SkyState
 
-DE421_PATH = r"D:\NITM ED\Coding - Python\Final Whatsups\CodingNITSoSe25\Assignment Whats Up\Merai\de421.bsp"
-HIPP_PATH = r"D:\NITM ED\Coding - Python\Final Whatsups\CodingNITSoSe25\Assignment Whats Up\Merai\hip_main.dat"
+# Faintest visual magnitude included in the star pass (naked-eye limit)
+STAR_MAGNITUDE_LIMIT = 6.5
 
-def get_visible_objects(lat, lon, user_dt=None):
-    ts = load.timescale()
+def altaz_from_radec(ra_hours, dec_degrees, lat_degrees, lst_hours):
+    """Altitude and azimuth in degrees for apparent RA/Dec (of date) seen at a local sidereal time.
+    Plain NumPy, so it broadcasts: e.g. stars as a column and times or sites as a row give a grid.
+    Matches Skyfield's altaz() without refraction to a few arcseconds for anything but the Moon.
+    """
+    lat = np.radians(lat_degrees)
+    dec = np.radians(dec_degrees)
+    hour_angle = np.radians((np.asarray(lst_hours) - ra_hours) * 15.0)
+    sin_alt = np.sin(lat) * np.sin(dec) + np.cos(lat) * np.cos(dec) * np.cos(hour_angle)
+    alt = np.degrees(np.arcsin(np.clip(sin_alt, -1.0, 1.0)))
+    az = np.degrees(np.arctan2(
+        -np.cos(dec) * np.sin(hour_angle),
+        np.sin(dec) * np.cos(lat) - np.cos(dec) * np.cos(hour_angle) * np.sin(lat),
+    )) % 360.0
+    return alt, az
+
+def compute_sky_state(lat, lon, user_dt=None, mag_limit=STAR_MAGNITUDE_LIMIT):
+    """SkyState of everything above the horizon: Sun, Moon and planets, then stars brightest first.
+    Columns are filled straight from the arrays Skyfield returns; the state is frozen (read-only)."""
+    ts = get_timescale()
     t = ts.from_datetime(user_dt) if user_dt else ts.now()
-    planets = load(DE421_PATH)
+    planets = get_ephemeris(DE421_PATH)
     earth = planets['earth']
     observer = earth + Topos(latitude_degrees=lat, longitude_degrees=lon)
-    visible = []
-    for name in planets.names():
-        if name == 'earth':
-            continue
-        try:
-            planet = planets[name]
-            alt, az, _ = observer.at(t).observe(planet).apparent().altaz()
-            if alt.degrees > 0:
-                pretty_name = name.replace(' barycenter', '').capitalize()
-                obj_type = 'Planet' if pretty_name in ['Mercury','Venus','Earth','Mars','Jupiter','Saturn','Uranus','Neptune','Pluto'] else pretty_name
-                visible.append({
-                    'name': pretty_name,
-                    'type': obj_type,
-                    'altitude': round(alt.degrees, 2),
-                    'azimuth': round(az.degrees, 2)
-                })
-        except Exception:
-            continue
-    with open(HIPP_PATH, 'rb') as f:
-        stars = hipparcos.load_dataframe(f)
-    bright_stars = stars[stars['magnitude'] < 2.0]
-    for hip, star_row in bright_stars.iterrows():
-        star = Star(ra_hours=star_row['ra_hours'], dec_degrees=star_row['dec_degrees'])
-        alt, az, _ = observer.at(t).observe(star).apparent().altaz()
-        if alt.degrees > 0:
-            proper_name = star_row.get('proper')
-            hip_id_int = int(hip) # HIP ID as integer for map lookup
-            hip_id_str = f"HIP {hip_id_int}"
-            
-            # Determine the primary display name for H1
-            display_name_h1 = proper_name if proper_name and proper_name.strip() else hip_id_str
-            
-            visible.append({
-                'name': display_name_h1, # Primary name for H1 (Common name or HIP ID)
-                'hip_id': hip_id_str,    # Always the HIP ID, for H2
-                'hip_int': hip_id_int, # Add integer HIP ID for constellation lookup
-                'type': 'Star',
-                'altitude': round(alt.degrees, 2),
-                'azimuth': round(az.degrees, 2)
-            })
-    return visible
+    # Sun, Moon and planets from the fixed body table; failures are logged by planet_utils
+    bodies = visible_body_state(compute_bodies(observer, t, planets))
+    catalog = get_star_catalog(source_path=HIPP_PATH)
+    # Only stars that can be above the horizon (a slightly wide cone around the zenith) are
+    # transformed; rows come back ascending, so the slice stays in magnitude order
+    rows = get_star_index(source_path=HIPP_PATH).above_horizon(t, lat, lon, mag_limit)
+    if len(rows) == 0:
+        return bodies.freeze()
+    bright_stars = catalog[rows]
+    # One array-valued Star for the whole slice: a single observe() call computes every alt/az
+    star_array = star_from_catalog(bright_stars)
+    apparent = observer.at(t).observe(star_array).apparent()
+    alt, az, _ = apparent.altaz()
+    above_horizon = alt.degrees > 0 # Horizon filter as a mask instead of a per-star check
+    visible_stars = bright_stars[above_horizon]
+    hip = visible_stars['hip'].astype(np.int64)
+    names = get_star_names().lookup(hip) # Bundled index: no Wikipedia lookups for names
+    stars = SkyState({
+        # Primary display name: the proper name, else the HIP ID
+        'name': [name or f"HIP {h}" for name, h in zip(proper_names(visible_stars), hip.tolist())],
+        'type': np.full(len(hip), 'Star', dtype=object),
+        'altitude': np.round(alt.degrees[above_horizon], 2),
+        'azimuth': np.round(az.degrees[above_horizon], 2),
+        'magnitude': np.round(visible_stars['magnitude'].astype(float), 2),
+        'constellation': constellation_at(apparent)[above_horizon],
+        'hip': hip,
+        'designation': np.where(names['bayer'].astype(bool), names['bayer'], names['flamsteed']),
+        'hd': visible_stars['hd'].astype(np.int64),
+        'wiki_title': names['wiki_title'],
+    }, len(hip))
+    return SkyState.concat([bodies, stars]).freeze()
+
+def get_visible_objects(lat, lon, user_dt=None, mag_limit=STAR_MAGNITUDE_LIMIT):
+    """compute_sky_state() as a list of dicts ('name', 'type', 'altitude', 'azimuth', 'magnitude',
+    'constellation', plus 'phase' for bodies and 'hip_id'/'hip_int' for stars, with 'designation'
+    and 'wiki_title' where the star-name index has them and 'hd' where hip_main.dat does)."""
+    return compute_sky_state(lat, lon, user_dt, mag_limit).records()
+
+def get_stars_near(ra_hours, dec_degrees, radius_degrees, mag_limit=STAR_MAGNITUDE_LIMIT):
+    """Catalog rows (magnitude-sorted structured array) within radius_degrees of an RA/Dec,
+    e.g. the stars in a circular field of view. Catalog (J1991.25) positions, no apparent-place terms."""
+    rows = get_star_index(source_path=HIPP_PATH).cone_radec(ra_hours, dec_degrees, radius_degrees, mag_limit)
+    return get_star_catalog(source_path=HIPP_PATH)[rows]
@@ -0,0 +1,130 @@
+# batch_utils.py
+# Visible objects for many observing sites at one instant.
+# The expensive part (ephemeris lookups, star astrometry, light-time, aberration) is
+# geocentric and identical for every site, so it is computed once. Each site then only
+# needs a rotation to its local horizon, done for a whole block of sites in NumPy.
+
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from resource_utils import DE421_PATH, HIPP_PATH, get_timescale, get_ephemeris, get_star_catalog
+from catalog_utils import brighter_than, star_from_catalog, proper_names
+from constellation_utils import constellation_at
+from astro_utils import STAR_MAGNITUDE_LIMIT, altaz_from_radec
+from planet_utils import resolve_bodies
+
+EARTH_RADIUS_AU = 6378.137 / 149597870.700
+
+SITE_CHUNK_SIZE = 256 # sites rotated per NumPy block; bounds memory at (objects x 256) per array
+
+def compute_geocentric_state(user_dt=None, mag_limit=STAR_MAGNITUDE_LIMIT):
+    """Apparent geocentric RA/Dec (of date) for the Sun, Moon, planets and stars brighter than mag_limit.
+    Returns a dict of equal-length columns plus the Greenwich apparent sidereal time 'gast'."""
+    ts = get_timescale()
+    t = ts.from_datetime(user_dt) if user_dt else ts.now()
+    planets = get_ephemeris(DE421_PATH)
+    earth_at_t = planets['earth'].at(t)
+
+    names, types, hip_ids, ra, dec, distance, constellations = [], [], [], [], [], [], []
+    bodies, errors = resolve_bodies(planets)
+    for pretty_name, obj_type, target in bodies:
+        apparent = earth_at_t.observe(target).apparent()
+        body_ra, body_dec, body_distance = apparent.radec(epoch='date')
+        names.append(pretty_name)
+        types.append(obj_type)
+        hip_ids.append(None)
+        ra.append(body_ra.hours)
+        dec.append(body_dec.degrees)
+        distance.append(body_distance.au)
+        constellations.append(constellation_at(apparent))
+
+    stars = brighter_than(get_star_catalog(source_path=HIPP_PATH), mag_limit)
+    star_ra = star_dec = np.empty(0)
+    star_constellations = np.empty(0, dtype=object)
+    if len(stars):
+        apparent = earth_at_t.observe(star_from_catalog(stars)).apparent()
+        star_ra_angle, star_dec_angle, _ = apparent.radec(epoch='date')
+        star_ra, star_dec = star_ra_angle.hours, star_dec_angle.degrees
+        star_constellations = constellation_at(apparent)
+        for hip, proper_name in zip(stars['hip'], proper_names(stars)):
+            hip_id = f"HIP {int(hip)}"
+            names.append(proper_name or hip_id)
+            types.append('Star')
+            hip_ids.append(hip_id)
+
+    return {
+        'time': t.utc_datetime(),
+        'errors': errors,
+        'gast': float(t.gast),
+        'name': np.array(names, dtype=object),
+        'type': np.array(types, dtype=object),
+        'hip_id': np.array(hip_ids, dtype=object),
+        'ra_hours': np.concatenate([ra, star_ra]),
+        'dec_degrees': np.concatenate([dec, star_dec]),
+        # Stars are effectively at infinity: zero parallax
+        'distance_au': np.concatenate([distance, np.full(len(star_ra), np.inf)]),
+        'constellation': np.concatenate([np.array(constellations, dtype=object), star_constellations.astype(object)]),
+    }
+
+def _rotate_sites(ra_hours, dec_degrees, distance_au, gast, lats, lons):
+    """Topocentric alt/az (objects x sites) for one block of sites. Top-level so a process pool can pickle it."""
+    lst = (gast + np.asarray(lons) / 15.0) % 24.0
+    alt, az = altaz_from_radec(ra_hours[:, None], dec_degrees[:, None], np.asarray(lats)[None, :], lst[None, :])
+    # Diurnal parallax lowers nearby bodies (about 1 degree for the Moon); azimuth is unchanged to first order
+    parallax = np.degrees(np.arcsin(np.clip(EARTH_RADIUS_AU / distance_au, 0.0, 1.0)))[:, None]
+    alt = alt - parallax * np.cos(np.radians(alt))
+    return alt, az
+
+def _visible_block(state, lats, lons, site_offset):
+    alt, az = _rotate_sites(state['ra_hours'], state['dec_degrees'], state['distance_au'], state['gast'], lats, lons)
+    obj_idx, site_idx = np.nonzero(alt > 0)
+    return {
+        'site': site_idx + site_offset,
+        'object': obj_idx,
+        'altitude': np.round(alt[obj_idx, site_idx], 2),
+        'azimuth': np.round(az[obj_idx, site_idx], 2),
+    }
+
+def _visible_block_worker(args):
+    return _visible_block(*args)
+
+def get_visible_objects_batch(sites, user_dt=None, mag_limit=STAR_MAGNITUDE_LIMIT,
+                              processes=None, chunk_size=SITE_CHUNK_SIZE):
+    """Visible objects for N (lat, lon) sites at one time, as a single columnar DataFrame.
+
+    Columns: site (index into sites), lat, lon, name, type, hip_id, altitude, azimuth, constellation.
+    Geocentric positions are computed once; only the horizon rotation runs per site.
+    processes > 1 spreads blocks of sites over a process pool (worth it for thousands of sites).
+    Agrees with get_visible_objects to within about 0.01 degrees (0.02 for the Moon).
+    """
+    sites = np.asarray(sites, dtype=float).reshape(-1, 2)
+    lats, lons = sites[:, 0], sites[:, 1]
+    state = compute_geocentric_state(user_dt, mag_limit)
+    # Workers only need the numeric columns; names and types are joined back in here
+    numeric_state = {k: state[k] for k in ('ra_hours', 'dec_degrees', 'distance_au', 'gast')}
+    starts = range(0, len(sites), chunk_size)
+    jobs = [(numeric_state, lats[i:i + chunk_size], lons[i:i + chunk_size], i) for i in starts]
+
+    if processes and processes > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            blocks = list(pool.map(_visible_block_worker, jobs))
+    else:
+        blocks = [_visible_block(*job) for job in jobs]
+
+    if blocks:
+        columns = {key: np.concatenate([b[key] for b in blocks]) for key in ('site', 'object', 'altitude', 'azimuth')}
+    else:
+        columns = {key: np.empty(0, dtype=int) for key in ('site', 'object', 'altitude', 'azimuth')}
+    site_idx, obj_idx = columns['site'], columns['object']
+    return pd.DataFrame({
+        'site': site_idx,
+        'lat': lats[site_idx],
+        'lon': lons[site_idx],
+        'name': state['name'][obj_idx],
+        'type': state['type'][obj_idx],
+        'hip_id': state['hip_id'][obj_idx],
+        'altitude': columns['altitude'],
+        'azimuth': columns['azimuth'],
+        'constellation': state['constellation'][obj_idx],
+    })
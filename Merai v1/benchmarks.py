@@ -0,0 +1,494 @@
+# benchmarks.py
+# Benchmark suite for the astronomy and enrichment pipeline, runnable fully offline.
+#
+#   python benchmarks.py                      # run everything, compare with bench_baselines.json
+#   python benchmarks.py visibility           # only benchmarks whose name contains "visibility"
+#   python benchmarks.py --save               # run and store the results as the new baseline
+#
+# Data comes from bench_fixtures/ instead of the real files: a DE421 excerpt (2025-2026)
+# and the Hipparcos stars down to magnitude 6.5 in hip_main.dat format. Satellites come from
+# a synthetic TLE file of SATELLITE_COUNT orbits (about the size of the active catalog),
+# generated into the scratch directory on every run. The app modules
+# are pointed at them (and at a scratch cache directory) through the MERAI_* variables,
+# and Wikipedia is replaced by a local stub server with a fixed per-request latency.
+# Each benchmark reports the best of several runs; the report flags anything slower than
+# the baseline by more than --threshold and the exit status is 1 if there is one.
+# Baselines are machine-specific: save them on the machine you compare on.
+#
+# To rebuild the fixtures from the full data files:
+#   python benchmarks.py --build-fixtures path/to/de421.bsp path/to/hip_main.dat
+
+import argparse
+import gzip
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(HERE, "bench_fixtures")
+EPHEMERIS_FIXTURE = os.path.join(FIXTURE_DIR, "de421_2025_2026.bsp")
+HIPPARCOS_FIXTURE = os.path.join(FIXTURE_DIR, "hip_main_v6.5.dat.gz")
+CONSTELLATION_FIXTURE = os.path.join(HERE, "constellationship.fab")
+BASELINE_PATH = os.path.join(HERE, "bench_baselines.json")
+
+FIXTURE_START, FIXTURE_END = "2025/1/1", "2027/1/1"
+FIXTURE_MAG_LIMIT = 6.5
+SITE = (28.61, 77.21) # New Delhi
+OBSERVING_TIME = datetime(2025, 6, 14, 20, 0, tzinfo=timezone.utc)
+STUB_LATENCY = 0.05 # seconds per stub Wikipedia request
+# Objects for the candidate-title pipeline: the stub has no "Missing ..." pages, so each star
+# falls through its name-based candidates to its HIP ID, as unnamed stars do on Wikipedia
+ENRICHMENT_OBJECTS = [{'type': 'Planet', 'name': name} for name in ('Mercury', 'Venus', 'Mars', 'Jupiter', 'Saturn')]
+ENRICHMENT_TITLES = [f"HIP {hip}" for hip in (11767, 24436, 27989, 32349, 37279, 49669, 65474, 69673, 80763, 91262,
+                                               97649, 102098, 113368, 677, 3179, 5447, 9884, 15863, 21421, 25336,
+                                               25930, 26311, 26727, 28360, 30438, 33579, 36850, 45238, 54061, 62956)]
+ENRICHMENT_OBJECTS += [{'type': 'Star', 'name': f"Missing {title}", 'hip_id': title} for title in ENRICHMENT_TITLES]
+
+IMAGE_COUNT = 12 # tiles on a typical first screen
+SATELLITE_COUNT = 10000
+STUB_IMAGE_SIZE = (1600, 1200) # px, about the size of a Wikipedia original
+
+# --- Fixtures ---
+
+# Columns of hip_main.dat filled in the fixture (0-based field index); the other 71 stay blank
+_HIP_FIELDS = {1: ('hip', '{:d}'), 5: ('magnitude', '{:.2f}'), 8: ('ra_degrees', '{:.8f}'), 9: ('dec_degrees', '{:.8f}'),
+               11: ('parallax_mas', '{:.2f}'), 12: ('ra_mas_per_year', '{:.2f}'), 13: ('dec_mas_per_year', '{:.2f}')}
+_HIP_FIELD_COUNT = 78
+
+def write_hipparcos_fixture(stars, dest_path, mag_limit=FIXTURE_MAG_LIMIT):
+    """Writes the stars of a skyfield hipparcos DataFrame brighter than mag_limit as gzipped
+    hip_main.dat lines (only the fields Skyfield reads are filled). Returns the star count."""
+    subset = stars[stars['magnitude'] <= mag_limit].reset_index()
+    with gzip.open(dest_path, 'wt', encoding='ascii', newline='\n') as f:
+        for row in subset.itertuples(index=False):
+            fields = [''] * _HIP_FIELD_COUNT
+            fields[0] = 'H'
+            for i, (column, fmt) in _HIP_FIELDS.items():
+                value = getattr(row, column)
+                if value == value: # Not NaN
+                    fields[i] = fmt.format(int(value) if column == 'hip' else value)
+            f.write('|'.join(fields) + '\n')
+    return len(subset)
+
+def build_fixtures(de421_path, hipparcos_path):
+    """Regenerates bench_fixtures/ from the full DE421 file and hip_main.dat."""
+    from skyfield.data import hipparcos
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    subprocess.run([sys.executable, "-m", "jplephem", "excerpt", FIXTURE_START, FIXTURE_END,
+                    de421_path, EPHEMERIS_FIXTURE], check=True)
+    with open(hipparcos_path, 'rb') as f:
+        count = write_hipparcos_fixture(hipparcos.load_dataframe(f), HIPPARCOS_FIXTURE)
+    print(f"Wrote {EPHEMERIS_FIXTURE} and {HIPPARCOS_FIXTURE} ({count} stars)")
+
+def write_satellite_fixture(dest_path, count=SATELLITE_COUNT, epoch=OBSERVING_TIME - timedelta(days=1), seed=1):
+    """Writes count random but plausible element sets (mostly low Earth orbit, a fifth up to
+    geostationary height) as a 3LE file; the same seed gives the same file."""
+    import numpy as np
+    from sgp4.api import Satrec, WGS72
+    from sgp4.exporter import export_tle
+    rng = np.random.default_rng(seed)
+    epoch_days = (epoch - datetime(1949, 12, 31, tzinfo=timezone.utc)).total_seconds() / 86400.0
+    with open(dest_path, 'w') as f:
+        for i in range(count):
+            height_km = rng.uniform(350.0, 1200.0) if i % 5 else rng.uniform(1200.0, 36000.0)
+            mean_motion = np.sqrt(398600.8 / (6378.137 + height_km) ** 3) * 60.0 # radians per minute
+            sat = Satrec()
+            sat.sgp4init(WGS72, 'i', 10000 + i, epoch_days, rng.uniform(0.0, 1e-4), 0.0, 0.0, rng.uniform(0.0, 0.02),
+                         rng.uniform(0.0, 2 * np.pi), np.radians(rng.uniform(0.0, 100.0)), rng.uniform(0.0, 2 * np.pi),
+                         mean_motion, rng.uniform(0.0, 2 * np.pi))
+            line1, line2 = export_tle(sat)
+            f.write(f"SAT-{i}\n{line1}\n{line2}\n")
+
+# --- Stub Wikipedia ---
+
+def _stub_page(title):
+    return {
+        'title': title,
+        'extract': f"{title} is a star used by the offline benchmark stub.",
+        'thumbnail': {'source': f"http://stub.invalid/{quote(title.replace(' ', '_'))}.jpg"},
+    }
+
+_stub_image_data = None
+
+def _stub_image():
+    """A JPEG of STUB_IMAGE_SIZE with some detail in it, so encoding costs are realistic."""
+    global _stub_image_data
+    if _stub_image_data is None:
+        from io import BytesIO
+        from PIL import Image
+        image = Image.effect_mandelbrot(STUB_IMAGE_SIZE, (-2.0, -1.2, 1.0, 1.2), 100).convert('RGB')
+        buffer = BytesIO()
+        image.save(buffer, format='JPEG', quality=90)
+        _stub_image_data = buffer.getvalue()
+    return _stub_image_data
+
+class _StubWikipedia(BaseHTTPRequestHandler):
+    """Answers /page/summary/<title> like the REST API, /w/api.php?titles=A|B|... like a
+    multi-title action API query and /images/<name>.jpg with a full-size image;
+    titles starting with 'Missing' do not exist."""
+
+    def do_GET(self):
+        time.sleep(STUB_LATENCY)
+        url = urlparse(self.path)
+        content_type = 'application/json'
+        if url.path.startswith('/images/'):
+            body, content_type = _stub_image(), 'image/jpeg'
+        elif url.path == '/w/api.php':
+            titles = parse_qs(url.query).get('titles', [''])[0].split('|')
+            pages = [{'title': title, 'missing': True} if title.startswith('Missing') else _stub_page(title)
+                     for title in titles]
+            body = json.dumps({'query': {'pages': pages}}).encode()
+        else:
+            title = unquote(url.path.rsplit('/', 1)[-1]).replace('_', ' ')
+            if not url.path.startswith('/page/summary/') or title.startswith('Missing'):
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = json.dumps(_stub_page(title)).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubWikipedia)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def prepare_environment(workdir, wiki_url):
+    """Points the app modules at the fixtures. Must run before any of them is imported."""
+    hip_path = os.path.join(workdir, "hip_main.dat")
+    os.makedirs(os.path.join(workdir, "cache"), exist_ok=True)
+    with gzip.open(HIPPARCOS_FIXTURE, 'rb') as src, open(hip_path, 'wb') as dest:
+        shutil.copyfileobj(src, dest)
+    tle_path = os.path.join(workdir, "active.tle")
+    write_satellite_fixture(tle_path)
+    os.environ.update({
+        'MERAI_DE421_PATH': EPHEMERIS_FIXTURE,
+        'MERAI_HIPPARCOS_PATH': hip_path,
+        'MERAI_CONSTELLATION_PATH': CONSTELLATION_FIXTURE,
+        'MERAI_TLE_PATH': tle_path,
+        'MERAI_CACHE_DIR': os.path.join(workdir, "cache"),
+        'MERAI_WIKI_API_URL': wiki_url,
+        'MERAI_WIKI_ACTION_URL': wiki_url + "/w/api.php",
+        'MERAI_OFFLINE': '0',
+    })
+
+# --- Benchmarks ---
+# Each entry is (name, setup, run): setup() returns the argument passed to run() and is not timed.
+
+BENCHMARKS = []
+
+def benchmark(name, setup=None):
+    def register(run):
+        BENCHMARKS.append((name, setup, run))
+        return run
+    return register
+
+def _warm_resources():
+    from resource_utils import get_timescale, get_ephemeris, get_star_catalog, get_star_index, get_star_names, DE421_PATH, HIPP_PATH
+    from catalog_utils import CATALOG_PATH, convert_hipparcos
+    if not os.path.exists(CATALOG_PATH):
+        convert_hipparcos(HIPP_PATH, CATALOG_PATH) # The app runs off the memory-mapped catalog
+    get_timescale(), get_ephemeris(DE421_PATH), get_star_catalog(source_path=HIPP_PATH), get_star_index(source_path=HIPP_PATH)
+    get_star_names()
+
+def _random_radec():
+    import numpy as np
+    _warm_resources()
+    rng = np.random.default_rng(0)
+    return rng.uniform(0, 24, 1000), np.degrees(np.arcsin(rng.uniform(-1, 1, 1000)))
+
+@benchmark("catalog.parse_hip_main")
+def catalog_parse(_):
+    from resource_utils import clear_resources, get_hipparcos
+    clear_resources()
+    get_hipparcos()
+
+@benchmark("catalog.convert_to_npy")
+def catalog_convert(_):
+    from resource_utils import HIPP_PATH
+    from catalog_utils import convert_hipparcos
+    convert_hipparcos(HIPP_PATH, os.path.join(os.environ['MERAI_CACHE_DIR'], "bench_catalog.npy"))
+
+@benchmark("catalog.load_npy", setup=_warm_resources)
+def catalog_load(_):
+    from catalog_utils import CATALOG_PATH, load_star_catalog
+    load_star_catalog(CATALOG_PATH)['magnitude'].sum() # Touch a column so the mapping is actually read
+
+@benchmark("catalog.star_index_build", setup=_warm_resources)
+def star_index_build(_):
+    from resource_utils import HIPP_PATH, get_star_catalog
+    from star_index import StarIndex
+    StarIndex(get_star_catalog(source_path=HIPP_PATH))
+
+@benchmark("catalog.cone_10deg_1000", setup=_random_radec)
+def star_index_cone(radec):
+    from astro_utils import get_stars_near
+    for ra_hours, dec_degrees in zip(*radec):
+        get_stars_near(ra_hours, dec_degrees, 10.0)
+
+def _visibility(mag_limit):
+    def run(_):
+        from astro_utils import get_visible_objects
+        get_visible_objects(*SITE, OBSERVING_TIME, mag_limit=mag_limit)
+    return run
+
+for _mag_limit in (2.0, 4.0, 6.5):
+    benchmark(f"visibility.instant_mag{_mag_limit:g}", setup=_warm_resources)(_visibility(_mag_limit))
+
+# The same table through per-object dicts and through the columnar SkyState
+@benchmark("visibility.table_records_mag6.5", setup=_warm_resources)
+def table_records(_):
+    import pandas as pd
+    from astro_utils import get_visible_objects
+    pd.DataFrame(get_visible_objects(*SITE, OBSERVING_TIME, mag_limit=6.5))
+
+@benchmark("visibility.table_state_mag6.5", setup=_warm_resources)
+def table_state(_):
+    from astro_utils import compute_sky_state
+    compute_sky_state(*SITE, OBSERVING_TIME, mag_limit=6.5).to_pandas()
+
+@benchmark("visibility.tracks_8h_mag4", setup=_warm_resources)
+def tracks_mag4(_):
+    from timeseries_utils import get_visibility_tracks
+    get_visibility_tracks(*SITE, OBSERVING_TIME, OBSERVING_TIME + timedelta(hours=8), step=timedelta(minutes=10),
+                          mag_limit=4.0, include_events=False)
+
+@benchmark("visibility.tracks_8h_mag2_events", setup=_warm_resources)
+def tracks_events(_):
+    from timeseries_utils import get_visibility_tracks
+    get_visibility_tracks(*SITE, OBSERVING_TIME, OBSERVING_TIME + timedelta(hours=8), step=timedelta(minutes=10),
+                          mag_limit=2.0, include_events=True)
+
+@benchmark("constellation.parse_fab")
+def constellation_parse(_):
+    from constellation_utils import ConstellationIndex, CONSTELLATION_FILE_PATH
+    ConstellationIndex.from_fab(CONSTELLATION_FILE_PATH)
+
+@benchmark("constellation.load_data")
+def constellation_load(_):
+    from constellation_utils import load_constellation_data
+    load_constellation_data()
+
+@benchmark("constellation.boundaries_1000", setup=_random_radec)
+def constellation_boundaries(radec):
+    from constellation_utils import constellation_at_radec
+    constellation_at_radec(*radec)
+
+@benchmark("names.load_index")
+def names_load(_):
+    from star_names import StarNames
+    StarNames.load()
+
+@benchmark("names.lookup_catalog", setup=_warm_resources)
+def names_lookup(_):
+    from resource_utils import HIPP_PATH, get_star_catalog, get_star_names
+    get_star_names().lookup(get_star_catalog(source_path=HIPP_PATH)['hip'])
+
+@benchmark("location.load_cities")
+def location_load(_):
+    from location_utils import CityDatabase
+    CityDatabase.load()
+
+def _city_database():
+    from location_utils import get_city_database
+    get_city_database()
+    return _random_radec()
+
+@benchmark("location.nearest_city_1000", setup=_city_database)
+def location_nearest(radec):
+    from location_utils import get_city_database
+    cities = get_city_database()
+    for ra_hours, dec_degrees in zip(*radec):
+        cities.nearest(dec_degrees, ra_hours * 15.0 - 180.0)
+
+@benchmark("satellites.load_tle_10000")
+def satellites_load(_):
+    from satellite_utils import SatelliteCatalog, TLE_PATH
+    SatelliteCatalog.load(TLE_PATH)
+
+def _warm_satellites():
+    from resource_utils import get_satellite_catalog
+    _warm_resources()
+    get_satellite_catalog()
+
+@benchmark("satellites.visible_10000", setup=_warm_satellites)
+def satellites_visible(_):
+    from satellite_utils import get_visible_satellites
+    get_visible_satellites(*SITE, OBSERVING_TIME)
+
+@benchmark("satellites.tracks_10000_30min", setup=_warm_satellites)
+def satellites_tracks(_):
+    from satellite_utils import get_satellite_tracks
+    get_satellite_tracks(*SITE, OBSERVING_TIME, OBSERVING_TIME + timedelta(minutes=30))
+
+_cache_ids = itertools.count()
+
+def _fresh_summary_cache():
+    from cache_utils import SummaryCache
+    from wiki_utils import set_summary_cache
+    path = os.path.join(os.environ['MERAI_CACHE_DIR'], f"summaries_{next(_cache_ids)}.sqlite3")
+    set_summary_cache(SummaryCache(path))
+
+@benchmark("enrichment.cold_30_titles")
+def enrichment_cold(_):
+    from wiki_utils import fetch_summaries
+    _fresh_summary_cache() # Inside the timed call, so every loop goes to the stub server
+    fetch_summaries(ENRICHMENT_TITLES)
+
+def _warm_enrichment():
+    from wiki_utils import fetch_summaries
+    _fresh_summary_cache()
+    fetch_summaries(ENRICHMENT_TITLES)
+
+@benchmark("enrichment.warm_30_titles", setup=_warm_enrichment)
+def enrichment_warm(_):
+    from wiki_utils import fetch_summaries
+    fetch_summaries(ENRICHMENT_TITLES)
+
+def _enrich_objects(batch_size):
+    def run(_):
+        from enrichment_utils import candidate_titles, enrich
+        _fresh_summary_cache()
+        enrich({i: candidate_titles(obj) for i, obj in enumerate(ENRICHMENT_OBJECTS)}, batch_size=batch_size)
+    return run
+
+# The same 35 objects (130 candidate titles) as multi-title queries and as one REST request per title
+benchmark("enrichment.cold_35_objects")(_enrich_objects(20))
+benchmark("enrichment.cold_35_objects_rest")(_enrich_objects(1))
+
+def _image_urls():
+    return [f"{os.environ['MERAI_WIKI_API_URL']}/images/{i}.jpg" for i in range(IMAGE_COUNT)]
+
+def _fresh_thumbnail_cache():
+    from cache_utils import ThumbnailCache
+    from image_utils import set_thumbnail_cache
+    set_thumbnail_cache(ThumbnailCache(os.path.join(os.environ['MERAI_CACHE_DIR'], f"thumbnails_{next(_cache_ids)}")))
+
+@benchmark("images.thumbnail_cold_12")
+def thumbnails_cold(_):
+    from image_utils import iter_thumbnails
+    _fresh_thumbnail_cache()
+    list(iter_thumbnails(_image_urls()))
+
+def _warm_thumbnails():
+    from image_utils import iter_thumbnails
+    _fresh_thumbnail_cache()
+    list(iter_thumbnails(_image_urls()))
+
+@benchmark("images.thumbnail_warm_12", setup=_warm_thumbnails)
+def thumbnails_warm(_):
+    from image_utils import cached_thumbnail
+    for url in _image_urls():
+        cached_thumbnail(url)
+
+# --- Runner ---
+
+def time_benchmark(setup, run, repeat=5, min_time=0.2):
+    """Best and median seconds per call. Fast calls are looped until a run lasts min_time."""
+    samples = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        loops, elapsed = 0, 0.0
+        while loops == 0 or elapsed < min_time:
+            start = time.perf_counter()
+            run(state)
+            elapsed += time.perf_counter() - start
+            loops += 1
+        samples.append(elapsed / loops)
+    return min(samples), statistics.median(samples)
+
+def run_benchmarks(selected, repeat=5):
+    results = {}
+    for name, setup, run in selected:
+        best, median = time_benchmark(setup, run, repeat)
+        results[name] = {'best': best, 'median': median}
+        print(f"  {name:38s} {best * 1000:10.2f} ms", file=sys.stderr)
+    return results
+
+def machine_info():
+    return {'python': platform.python_version(), 'machine': platform.machine(),
+            'processor': platform.processor() or platform.machine(), 'cpus': os.cpu_count()}
+
+def regression_report(results, baseline, threshold=1.25):
+    """(report text, regressed names). Compares best times; ratio > threshold is a regression."""
+    lines = [f"{'benchmark':38s} {'baseline ms':>12s} {'current ms':>12s} {'ratio':>7s}  status"]
+    regressed = []
+    for name, result in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            lines.append(f"{name:38s} {'-':>12s} {result['best'] * 1000:12.2f} {'-':>7s}  new")
+            continue
+        ratio = result['best'] / previous['best']
+        if ratio > threshold:
+            status = "REGRESSED"
+            regressed.append(name)
+        elif ratio < 1 / threshold:
+            status = "improved"
+        else:
+            status = "ok"
+        lines.append(f"{name:38s} {previous['best'] * 1000:12.2f} {result['best'] * 1000:12.2f} {ratio:7.2f}  {status}")
+    if baseline.get('machine') and baseline['machine'] != machine_info():
+        lines.append(f"Note: baseline was recorded on a different machine ({baseline['machine']})")
+    return "\n".join(lines), regressed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the Merai pipeline.")
+    parser.add_argument("filters", nargs="*", help="only run benchmarks whose name contains one of these")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio reported as a regression")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--build-fixtures", nargs=2, metavar=("DE421", "HIP_MAIN"),
+                        help="regenerate bench_fixtures/ from the full data files and exit")
+    args = parser.parse_args(argv)
+    if args.build_fixtures:
+        build_fixtures(*args.build_fixtures)
+        return 0
+
+    selected = [b for b in BENCHMARKS if not args.filters or any(f in b[0] for f in args.filters)]
+    server = start_stub_server()
+    with tempfile.TemporaryDirectory() as workdir:
+        prepare_environment(workdir, f"http://127.0.0.1:{server.server_port}")
+        print(f"Running {len(selected)} benchmarks...", file=sys.stderr)
+        results = run_benchmarks(selected, args.repeat)
+    server.shutdown()
+
+    record = {'created': datetime.now(timezone.utc).isoformat(timespec='seconds'), 'machine': machine_info(), 'results': results}
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(record, f, indent=2)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report, regressed = regression_report(results, baseline, args.threshold)
+    print(report)
+    if args.save:
+        if args.filters and baseline: # Partial run: keep the other baselines
+            record['results'] = {**baseline.get('results', {}), **results}
+        with open(args.baseline, 'w') as f:
+            json.dump(record, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    return 1 if regressed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+# cache_utils.py
+# Persistent on-disk caches shared by the app. Everything lives under CACHE_DIR
+# (override with MERAI_CACHE_DIR) so it survives reruns and restarts.
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_DIR = os.environ.get("MERAI_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".merai_cache"))
+
+SUMMARY_CACHE_PATH = os.path.join(CACHE_DIR, "wiki_summaries.sqlite")
+SUMMARY_TTL = 30 * 24 * 3600        # descriptions barely change; refresh monthly
+SUMMARY_NEGATIVE_TTL = 24 * 3600    # "no such page" is retried daily in case the page appears
+SUMMARY_MAX_ENTRIES = 20000
+
+THUMBNAIL_DIR = os.path.join(CACHE_DIR, "thumbnails")
+THUMBNAIL_MAX_BYTES = 100 * 1024 * 1024  # resized tiles are ~15 KB, so this holds several thousand
+THUMBNAIL_NEGATIVE_TTL = 24 * 3600       # broken or missing images are retried daily
+
+def ensure_cache_dir(path=CACHE_DIR):
+    os.makedirs(path, exist_ok=True)
+    return path
+
+class SummaryCache:
+    """SQLite cache of Wikipedia summaries keyed by lookup title.
+
+    Stores the extract and thumbnail URL of each page, or a negative entry when the
+    page does not exist. Entries expire after ttl (negative_ttl for misses) and the
+    least recently used ones are evicted once the table grows past max_entries.
+    """
+
+    def __init__(self, path=SUMMARY_CACHE_PATH, ttl=SUMMARY_TTL, negative_ttl=SUMMARY_NEGATIVE_TTL,
+                 max_entries=SUMMARY_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            ensure_cache_dir(os.path.dirname(os.path.abspath(path)))
+        # One connection shared across Streamlit threads; every access goes through the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            " name TEXT PRIMARY KEY,"
+            " found INTEGER NOT NULL,"
+            " extract TEXT,"
+            " thumbnail TEXT,"
+            " fetched_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS summaries_accessed ON summaries (accessed_at)")
+        self._conn.commit()
+
+    def get(self, name, allow_expired=False):
+        """Returns (hit, summary). summary is None for a cached negative result.
+        With allow_expired=True stale entries are still served (used in offline mode)."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT found, extract, thumbnail, fetched_at FROM summaries WHERE name = ?", (name,)
+            ).fetchone()
+            if row is None:
+                return False, None
+            found, extract, thumbnail, fetched_at = row
+            max_age = self.ttl if found else self.negative_ttl
+            if not allow_expired and now - fetched_at > max_age:
+                return False, None
+            self._conn.execute("UPDATE summaries SET accessed_at = ? WHERE name = ?", (now, name))
+            self._conn.commit()
+        if not found:
+            return True, None
+        summary = {}
+        if extract is not None:
+            summary['extract'] = extract
+        if thumbnail is not None:
+            summary['thumbnail'] = {'source': thumbnail}
+        return True, summary
+
+    def put(self, name, summary):
+        """Stores a summary dict (only extract and thumbnail are kept), or None as a negative result."""
+        now = time.time()
+        extract = summary.get('extract') if summary else None
+        thumbnail = summary.get('thumbnail', {}).get('source') if summary else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (name, found, extract, thumbnail, fetched_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (name, 1 if summary else 0, extract, thumbnail, now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM summaries WHERE name IN"
+                " (SELECT name FROM summaries ORDER BY accessed_at ASC LIMIT ?)",
+                (excess,),
+            )
+
+    def purge_expired(self):
+        """Deletes expired entries. Returns how many were removed."""
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM summaries WHERE (found = 1 AND fetched_at < ?) OR (found = 0 AND fetched_at < ?)",
+                (now - self.ttl, now - self.negative_ttl),
+            )
+            self._conn.commit()
+            return cur.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM summaries")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            total, found = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(found), 0) FROM summaries").fetchone()
+        return {'entries': total, 'found': found, 'negative': total - found}
+
+class ThumbnailCache:
+    """Content-addressed on-disk store of resized images, keyed by (source URL, variant), where
+    variant names the rendition (e.g. "360x216").
+
+    Image bytes live in files named by their SHA-256 under directory, so the same picture
+    reached through different URLs is stored once; an SQLite index maps each (url, variant) to
+    its digest, or to nothing for an image known to be unavailable (kept for negative_ttl).
+    Once the files add up to more than max_bytes the least recently used ones are deleted.
+    """
+
+    def __init__(self, directory=THUMBNAIL_DIR, max_bytes=THUMBNAIL_MAX_BYTES, negative_ttl=THUMBNAIL_NEGATIVE_TTL):
+        self.directory = ensure_cache_dir(directory)
+        self.max_bytes = max_bytes
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS thumbnails ("
+            " url TEXT NOT NULL,"
+            " variant TEXT NOT NULL,"
+            " digest TEXT,"
+            " fetched_at REAL NOT NULL,"
+            " PRIMARY KEY (url, variant))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            " digest TEXT PRIMARY KEY,"
+            " bytes INTEGER NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS blobs_accessed ON blobs (accessed_at)")
+        self._conn.commit()
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest + ".jpg")
+
+    def get(self, url, variant):
+        """Returns (hit, data). data is None for a cached negative result."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest, fetched_at FROM thumbnails WHERE url = ? AND variant = ?", (url, variant)
+            ).fetchone()
+            if row is None:
+                return False, None
+            digest, fetched_at = row
+            if digest is None:
+                return (True, None) if now - fetched_at <= self.negative_ttl else (False, None)
+            try:
+                with open(self._path(digest), 'rb') as f:
+                    data = f.read()
+            except OSError: # Deleted behind our back: forget it and fetch again
+                self._conn.execute("DELETE FROM thumbnails WHERE digest = ?", (digest,))
+                self._conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+                self._conn.commit()
+                return False, None
+            self._conn.execute("UPDATE blobs SET accessed_at = ? WHERE digest = ?", (now, digest))
+            self._conn.commit()
+        return True, data
+
+    def put(self, url, variant, data):
+        """Stores image bytes for (url, variant), or None as a negative result."""
+        now = time.time()
+        digest = hashlib.sha256(data).hexdigest() if data is not None else None
+        with self._lock:
+            if digest is not None:
+                path = self._path(digest)
+                if not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    temp_path = f"{path}.{threading.get_ident()}.tmp"
+                    with open(temp_path, 'wb') as f:
+                        f.write(data)
+                    os.replace(temp_path, path) # Readers never see a half-written file
+                self._conn.execute("INSERT OR REPLACE INTO blobs (digest, bytes, accessed_at) VALUES (?, ?, ?)",
+                                   (digest, len(data), now))
+            self._conn.execute("INSERT OR REPLACE INTO thumbnails (url, variant, digest, fetched_at) VALUES (?, ?, ?, ?)",
+                               (url, variant, digest, now))
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._total_bytes()
+        if total <= self.max_bytes:
+            return
+        # Oldest first until 10% under the limit, so eviction doesn't run again on the next put
+        target = total - self.max_bytes * 0.9
+        freed = 0
+        for digest, size in self._conn.execute("SELECT digest, bytes FROM blobs ORDER BY accessed_at ASC").fetchall():
+            if freed >= target:
+                break
+            try:
+                os.remove(self._path(digest))
+            except OSError:
+                pass
+            self._conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+            self._conn.execute("DELETE FROM thumbnails WHERE digest = ?", (digest,))
+            freed += size
+
+    def _total_bytes(self):
+        return self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM blobs").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            for (digest,) in self._conn.execute("SELECT digest FROM blobs").fetchall():
+                try:
+                    os.remove(self._path(digest))
+                except OSError:
+                    pass
+            self._conn.execute("DELETE FROM thumbnails")
+            self._conn.execute("DELETE FROM blobs")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM thumbnails WHERE digest IS NOT NULL").fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            entries, negative = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(digest IS NULL), 0) FROM thumbnails").fetchone()
+            files = self._conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+            return {'entries': entries, 'negative': negative, 'files': files, 'bytes': self._total_bytes()}
@@ -0,0 +1,113 @@
+# catalog_utils.py
+# Compact binary star catalog built once from hip_main.dat.
+# The catalog is a structured NumPy array holding only the columns the app uses,
+# sorted by magnitude, saved as .npy and memory-mapped on load. Every worker process
+# that maps the same file shares its pages, and "all stars brighter than X" is a slice.
+# The HD number of each star is read from field H71 of hip_main.dat while converting
+# (Skyfield's loader drops that column).
+
+import gzip
+import os
+import numpy as np
+from skyfield.api import Star
+
+from resource_utils import HIPP_PATH
+
+CATALOG_PATH = os.path.splitext(HIPP_PATH)[0] + ".npy"
+
+# Hipparcos positions are given at epoch J1991.25, as a Julian date
+HIPPARCOS_EPOCH = 1721045.0 + 1991.25 * 365.25
+
+CATALOG_DTYPE = np.dtype([
+    ('hip', '<i4'),
+    ('ra_hours', '<f8'),
+    ('dec_degrees', '<f8'),
+    ('magnitude', '<f4'),
+    ('ra_mas_per_year', '<f4'),
+    ('dec_mas_per_year', '<f4'),
+    ('parallax_mas', '<f4'),
+    ('proper', 'S24'), # UTF-8 proper name, empty when the catalog has none
+    ('hd', '<i4'),     # Henry Draper number, -1 when hip_main.dat has none
+])
+HIPPARCOS_HD_FIELD = 71 # H71 in hip_main.dat: Henry Draper catalog number
+
+def hd_numbers_from_hipparcos(path):
+    """{hip: hd} from the HD column of hip_main.dat (or .gz)."""
+    opener = gzip.open if path.endswith('.gz') else open
+    hd_by_hip = {}
+    with opener(path, 'rt', encoding='ascii', errors='replace') as f:
+        for line in f:
+            fields = line.split('|')
+            if len(fields) > HIPPARCOS_HD_FIELD and fields[HIPPARCOS_HD_FIELD].strip():
+                hd_by_hip[int(fields[1])] = int(fields[HIPPARCOS_HD_FIELD])
+    return hd_by_hip
+
+def catalog_from_dataframe(stars, hd_by_hip=None):
+    """Converts a Hipparcos DataFrame (as returned by hipparcos.load_dataframe) into the compact array,
+    with HD numbers from a {hip: hd} mapping (hd_numbers_from_hipparcos)."""
+    stars = stars[stars['ra_degrees'].notnull() & stars['magnitude'].notnull()]
+    stars = stars.sort_values('magnitude', kind='stable')
+    catalog = np.zeros(len(stars), dtype=CATALOG_DTYPE)
+    catalog['hip'] = stars.index.to_numpy()
+    catalog['ra_hours'] = stars['ra_hours'].to_numpy()
+    catalog['dec_degrees'] = stars['dec_degrees'].to_numpy()
+    catalog['magnitude'] = stars['magnitude'].to_numpy()
+    # Some entries have no astrometric solution beyond the position; treat those as fixed
+    for column in ('ra_mas_per_year', 'dec_mas_per_year', 'parallax_mas'):
+        catalog[column] = np.nan_to_num(stars[column].to_numpy())
+    if 'proper' in stars.columns:
+        catalog['proper'] = [
+            name.strip().encode('utf-8')[:24] if isinstance(name, str) else b''
+            for name in stars['proper']
+        ]
+    hd_by_hip = hd_by_hip or {}
+    catalog['hd'] = [hd_by_hip.get(hip, -1) for hip in catalog['hip'].tolist()]
+    return catalog
+
+def convert_hipparcos(src_path=HIPP_PATH, dest_path=CATALOG_PATH):
+    """One-time conversion of hip_main.dat into the binary catalog. Returns the number of stars written."""
+    from skyfield.data import hipparcos
+    with open(src_path, 'rb') as f:
+        stars = hipparcos.load_dataframe(f)
+    catalog = catalog_from_dataframe(stars, hd_numbers_from_hipparcos(src_path))
+    np.save(dest_path, catalog, allow_pickle=False)
+    return len(catalog)
+
+def load_star_catalog(path=CATALOG_PATH):
+    """Memory-maps the binary catalog read-only. Nothing is copied until a column is actually used."""
+    catalog = np.load(path, mmap_mode='r', allow_pickle=False)
+    if catalog.dtype != CATALOG_DTYPE:
+        raise ValueError(f"{path} is not a star catalog written by convert_hipparcos (dtype {catalog.dtype})")
+    return catalog
+
+def brighter_than(catalog, mag_limit):
+    """Returns the stars with magnitude < mag_limit as a view (the catalog is sorted by magnitude)."""
+    end = np.searchsorted(catalog['magnitude'], mag_limit, side='left')
+    return catalog[:end]
+
+def star_from_catalog(catalog):
+    """Builds one array-valued Skyfield Star from catalog rows."""
+    return Star(
+        ra_hours=catalog['ra_hours'],
+        dec_degrees=catalog['dec_degrees'],
+        ra_mas_per_year=catalog['ra_mas_per_year'],
+        dec_mas_per_year=catalog['dec_mas_per_year'],
+        parallax_mas=catalog['parallax_mas'],
+        epoch=HIPPARCOS_EPOCH,
+    )
+
+def proper_names(catalog):
+    """Proper name per catalog row as a list of str, None for unnamed stars. The catalog's own
+    'proper' column comes first, then the bundled star-name index (star_names)."""
+    from resource_utils import get_star_names
+    index_names = get_star_names().lookup(catalog['hip'])['proper']
+    return [name.decode('utf-8') or index_name for name, index_name in zip(catalog['proper'], index_names)]
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Convert hip_main.dat into the compact binary star catalog.")
+    parser.add_argument("src", nargs="?", default=HIPP_PATH, help="path to hip_main.dat")
+    parser.add_argument("dest", nargs="?", default=CATALOG_PATH, help="output .npy path")
+    args = parser.parse_args()
+    count = convert_hipparcos(args.src, args.dest)
+    print(f"Wrote {count} stars to {args.dest}")
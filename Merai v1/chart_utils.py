@@ -0,0 +1,209 @@
+# chart_utils.py
+# Polar sky chart: zenith at the centre, horizon at the rim, north up, azimuth clockwise.
+# Drawn with a fixed number of artists however many stars are visible: one scatter for all
+# stars, one per body type, and a single LineCollection for every constellation segment.
+# Uses matplotlib.figure.Figure directly rather than pyplot, so nothing touches global
+# state or opens a window; charts can be rendered from threads, worker processes or
+# Streamlit and returned as PNG bytes.
+
+from io import BytesIO
+import logging
+import numpy as np
+
+from sky_state import SkyState
+
+logger = logging.getLogger(__name__)
+
+TYPE_MARKERS = {'Planet': 'o', 'Star': '*', 'Satellite': 's', 'Sun': 'X', 'Moon': 'D'}
+TYPE_COLORS = {'Planet': '#ff6f61', 'Star': '#ffffff', 'Satellite': '#7fdbff', 'Sun': '#ffd700', 'Moon': '#c0c0c0'}
+BACKGROUND = '#0b1a2a'
+LINE_COLOR = '#6c8aa8'
+
+# Star marker area (points^2) runs from MAX at BRIGHT_MAG to MIN at FAINT_MAG
+BRIGHT_MAG, FAINT_MAG = -1.5, 6.5
+MIN_MARKER, MAX_MARKER = 2.0, 120.0
+BODY_MARKER = 70.0
+SATELLITE_MARKER = 14.0 # Smaller: hundreds of sunlit satellites can be up at once
+
+def hip_number(obj):
+    """HIP ID of an object dict as an int, or None. Accepts hip_int, or 'HIP n' in hip_id / raw_name."""
+    hip = obj.get('hip_int')
+    if hip is not None:
+        return int(hip)
+    for key in ('hip_id', 'raw_name'):
+        value = obj.get(key)
+        if isinstance(value, str) and value.startswith('HIP '):
+            try:
+                return int(value[4:])
+            except ValueError:
+                pass
+    return None
+
+def marker_sizes(magnitude):
+    """Marker areas for an array of magnitudes; brighter is bigger, unknown (nan) gets the mid size."""
+    magnitude = np.asarray(magnitude, dtype=float)
+    scale = np.clip((FAINT_MAG - magnitude) / (FAINT_MAG - BRIGHT_MAG), 0.0, 1.0)
+    scale = np.where(np.isfinite(scale), scale, 0.5)
+    return MIN_MARKER + (MAX_MARKER - MIN_MARKER) * scale ** 2
+
+def chart_arrays(objects):
+    """Column arrays for a SkyState or a list of object dicts: theta (azimuth, radians), r (zenith
+    distance, degrees), magnitude (nan if unknown), hip (-1 if none), type and label."""
+    if isinstance(objects, SkyState): # Already columns: no per-object work
+        return {
+            'theta': np.radians(objects['azimuth']),
+            'r': 90.0 - objects['altitude'],
+            'magnitude': objects['magnitude'],
+            'hip': objects['hip'] if 'hip' in objects else np.full(len(objects), -1, dtype=np.int64),
+            'type': objects['type'],
+            'label': (objects['display_name'] if 'display_name' in objects else objects['name']).tolist(),
+        }
+    count = len(objects)
+    arrays = {
+        'theta': np.radians(np.fromiter((o['azimuth'] for o in objects), float, count)),
+        'r': 90.0 - np.fromiter((o['altitude'] for o in objects), float, count),
+        'magnitude': np.fromiter((np.nan if o.get('magnitude') is None else o['magnitude'] for o in objects), float, count),
+        'hip': np.fromiter((hip_number(o) or -1 for o in objects), np.int64, count),
+        'type': np.array([o['type'] for o in objects], dtype=object),
+        'label': [o.get('display_name', o['name']) for o in objects],
+    }
+    return arrays
+
+def segment_rows(hip, constellation_index):
+    """(K, 2) row indices into `hip` for every stick-figure segment with both stars present,
+    plus the constellation id of each segment."""
+    pairs = constellation_index.segment_pairs
+    owners = np.repeat(np.arange(len(constellation_index), dtype=np.int32), np.diff(constellation_index.segment_offsets))
+    if not len(pairs) or not np.any(hip >= 0):
+        return np.empty((0, 2), dtype=np.int64), np.empty(0, dtype=np.int32)
+    # Dense HIP -> row lookup, so every segment endpoint resolves with one fancy index
+    lookup = np.full(max(int(hip.max()), int(pairs.max())) + 1, -1, dtype=np.int64)
+    present = hip >= 0
+    lookup[hip[present]] = np.flatnonzero(present)
+    rows = lookup[pairs]
+    keep = (rows >= 0).all(axis=1)
+    return rows[keep], owners[keep]
+
+def segment_lines(hip, theta, r, constellation_index):
+    """(K, 2, 2) (theta, r) endpoints of every stick-figure segment with both stars in `hip`,
+    plus the constellation id of each segment."""
+    rows, owners = segment_rows(hip, constellation_index)
+    return np.stack([theta[rows], r[rows]], axis=-1), owners
+
+def constellation_label_positions(lines, owners):
+    """(ids, theta, r) of one label per constellation present in owners."""
+    # Mean of each figure's endpoints, averaged in Cartesian so figures across north do not split
+    x = (lines[..., 1] * np.sin(lines[..., 0])).mean(axis=1)
+    y = (lines[..., 1] * np.cos(lines[..., 0])).mean(axis=1)
+    ids, inverse, counts = np.unique(owners, return_inverse=True, return_counts=True)
+    mean_x = np.bincount(inverse, weights=x) / counts
+    mean_y = np.bincount(inverse, weights=y) / counts
+    return ids, np.arctan2(mean_x, mean_y) % (2 * np.pi), np.hypot(mean_x, mean_y)
+
+def default_constellation_index():
+    try:
+        from resource_utils import get_constellation_index
+        return get_constellation_index()
+    except OSError as e:
+        logger.warning("No constellation lines: %s", e)
+        return None
+
+def setup_axes(ax, title=None):
+    """Polar sky-chart axes: north up, azimuth clockwise, horizon at r = 90."""
+    ax.set_facecolor(BACKGROUND)
+    ax.set_theta_zero_location('N')
+    ax.set_theta_direction(-1)
+    ax.set_rlim(0, 90)
+    ax.set_rticks([30, 60, 90])
+    ax.set_yticklabels(['60°', '30°', '0°'], color='#8899aa', fontsize=7)
+    ax.set_xticks(np.radians([0, 90, 180, 270]))
+    ax.set_xticklabels(['N', 'E', 'S', 'W'])
+    ax.set_rlabel_position(135)
+    ax.grid(True, color='white', alpha=0.15)
+    if title:
+        ax.set_title(title, fontsize=12)
+
+def draw_sky_chart(ax, objects, constellation_index=None, label_limit=15, constellation_names=True):
+    """Draws objects (a SkyState or get_visible_objects-style dicts) on polar axes prepared by setup_axes.
+
+    Every star goes into one scatter sized by magnitude, other objects into one scatter per
+    type, and all constellation segments between visible stars into one LineCollection.
+    Only the label_limit brightest stars and label_limit highest satellites are named; every other object is.
+    Returns the artists added, so a caller can remove them and redraw on the same axes.
+    """
+    from matplotlib.collections import LineCollection
+    artists = []
+    if not objects:
+        return artists
+    arrays = chart_arrays(objects)
+    theta, r, magnitude, types = arrays['theta'], arrays['r'], arrays['magnitude'], arrays['type']
+
+    if constellation_index is not None:
+        lines, owners = segment_lines(arrays['hip'], theta, r, constellation_index)
+        if len(lines):
+            artists.append(ax.add_collection(LineCollection(lines, colors=LINE_COLOR, linewidths=0.6, alpha=0.8, zorder=1)))
+            if constellation_names:
+                ids, label_theta, label_r = constellation_label_positions(lines, owners)
+                for cid, t, radius in zip(ids, label_theta, label_r):
+                    artists.append(ax.text(t, radius, constellation_index.names[cid], fontsize=6, color=LINE_COLOR,
+                                           ha='center', va='center', alpha=0.9, zorder=1))
+
+    stars = types == 'Star'
+    if stars.any():
+        artists.append(ax.scatter(theta[stars], r[stars], s=marker_sizes(magnitude[stars]), c=TYPE_COLORS['Star'],
+                                  marker='o', linewidths=0, label='Star', zorder=2))
+    for obj_type in dict.fromkeys(types[~stars]):
+        mask = types == obj_type
+        size = SATELLITE_MARKER if obj_type == 'Satellite' else BODY_MARKER
+        artists.append(ax.scatter(theta[mask], r[mask], s=size, c=TYPE_COLORS.get(obj_type, '#dddddd'),
+                                  marker=TYPE_MARKERS.get(obj_type, 'o'), edgecolors='black', linewidths=0.5,
+                                  label=obj_type, zorder=3))
+
+    star_rows = np.flatnonzero(stars)
+    named_stars = star_rows[np.argsort(np.nan_to_num(magnitude[star_rows], nan=np.inf), kind='stable')[:label_limit]]
+    satellite_rows = np.flatnonzero(types == 'Satellite')
+    named_satellites = satellite_rows[np.argsort(r[satellite_rows], kind='stable')[:label_limit]]
+    for i in np.concatenate([np.flatnonzero(~stars & (types != 'Satellite')), named_stars, named_satellites]):
+        artists.append(ax.text(theta[i], r[i], arrays['label'][i], fontsize=7, color='#dddddd',
+                               ha='center', va='bottom', zorder=4))
+    return artists
+
+def sky_chart_figure(objects, title=None, constellation_index=None, figsize=(8, 8), **kwargs):
+    """New Figure with the chart; constellation_index defaults to the shared one from resource_utils."""
+    from matplotlib.figure import Figure
+    if constellation_index is None:
+        constellation_index = default_constellation_index()
+    fig = Figure(figsize=figsize)
+    ax = fig.add_subplot(111, polar=True)
+    setup_axes(ax, title)
+    draw_sky_chart(ax, objects, constellation_index, **kwargs)
+    if ax.get_legend_handles_labels()[0]:
+        fig.legend(loc='lower right', fontsize=7, facecolor=BACKGROUND, labelcolor='#dddddd')
+    return fig
+
+def figure_png(fig, dpi=100):
+    """PNG bytes of a Figure (no window, no file)."""
+    buffer = BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi)
+    return buffer.getvalue()
+
+def sky_chart_png(objects, title=None, constellation_index=None, dpi=100, **kwargs):
+    """Renders the chart straight to PNG bytes, e.g. for st.image or for writing charts in a batch job."""
+    return figure_png(sky_chart_figure(objects, title, constellation_index, **kwargs), dpi)
+
+def track_objects(tracks, j):
+    """Object dicts above the horizon at time index j of a timeseries_utils.get_visibility_tracks result."""
+    altitude, azimuth = tracks['altitude'][:, j], tracks['azimuth'][:, j]
+    objects = []
+    for i in np.flatnonzero(altitude > 0):
+        magnitude = np.ravel(tracks['magnitude'][i])
+        magnitude = float(magnitude[j] if magnitude.size > 1 else magnitude[0])
+        objects.append({
+            'name': tracks['name'][i],
+            'type': tracks['type'][i],
+            'hip_id': tracks['hip_id'][i],
+            'altitude': float(altitude[i]),
+            'azimuth': float(azimuth[i]),
+            'magnitude': magnitude if np.isfinite(magnitude) else None,
+        })
+    return objects
@@ -0,0 +1,160 @@
+# cli.py
+# Headless entry point: visible objects for a location and time range, streamed as
+# CSV, JSON Lines or Parquet to stdout or a file. Meant for cron jobs and pipelines.
+#
+#   python cli.py --lat 28.61 --lon 77.21 --start 2025-06-14T20:00 --end 2025-06-15T04:00 --step 15 -f jsonl
+#
+# Only the standard library is imported at module level; the astronomy stack (NumPy,
+# Skyfield via timeseries_utils) is loaded after arguments are parsed, and pyarrow only
+# for Parquet. Each sample is a SkyState, exported through its columns (to_arrow for
+# Parquet). Streamlit, pydeck and matplotlib are never imported. --timing reports
+# startup and per-stage times on stderr.
+
+import time
+_START = time.perf_counter()
+
+import argparse
+import csv
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+
+from perf_utils import StageTimer
+
+FIELDS = ['time', 'name', 'type', 'hip_id', 'magnitude', 'altitude', 'azimuth', 'constellation']
+
+def parse_time(value):
+    """ISO 8601 date/time; naive values are taken as UTC (like the rest of the app)."""
+    dt = datetime.fromisoformat(value)
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compute visible astronomical objects without the web UI.")
+    parser.add_argument("--lat", type=float, required=True, help="observer latitude in degrees")
+    parser.add_argument("--lon", type=float, required=True, help="observer longitude in degrees")
+    parser.add_argument("--start", type=parse_time, default=None, help="ISO start time, UTC if no offset (default: now)")
+    parser.add_argument("--end", type=parse_time, default=None, help="ISO end time (default: same as start)")
+    parser.add_argument("--step", type=float, default=10.0, help="minutes between samples (default: 10)")
+    parser.add_argument("--mag-limit", type=float, default=None, help="faintest star magnitude (default: astro_utils limit)")
+    parser.add_argument("-f", "--format", choices=("csv", "jsonl", "parquet"), default="csv")
+    parser.add_argument("-o", "--output", default="-", help="output file, '-' for stdout (Parquet needs a file)")
+    parser.add_argument("--timing", action="store_true", help="print startup and stage timings to stderr")
+    args = parser.parse_args(argv)
+    if args.start is None:
+        args.start = datetime.now(timezone.utc).replace(microsecond=0)
+    if args.end is None:
+        args.end = args.start
+    if args.end < args.start:
+        parser.error("--end must not be before --start")
+    if args.step <= 0:
+        parser.error("--step must be positive")
+    if args.format == "parquet" and args.output == "-":
+        parser.error("Parquet output needs --output FILE")
+    return args
+
+def iter_states(tracks):
+    """One SkyState per sample time with the objects above the horizon, time-major,
+    sliced straight from the track arrays."""
+    import numpy as np
+    from sky_state import SkyState
+    altitude, azimuth = tracks['altitude'], tracks['azimuth']
+    magnitude = np.empty(altitude.shape)
+    for i, values in enumerate(tracks['magnitude']):
+        magnitude[i] = values # Stars: one value; Sun, Moon and planets: one per sample
+    magnitude = np.round(magnitude, 2)
+    names, types, constellations = (np.array(tracks[key], dtype=object) for key in ('name', 'type', 'constellation'))
+    hip = np.array([int(h[4:]) if h else -1 for h in tracks['hip_id']], dtype=np.int64)
+    for j, when in enumerate(tracks['times']):
+        rows = np.flatnonzero(altitude[:, j] > 0)
+        yield SkyState({
+            'time': np.full(len(rows), when.isoformat(), dtype=object),
+            'name': names[rows],
+            'type': types[rows],
+            'hip': hip[rows],
+            'magnitude': magnitude[rows, j],
+            'altitude': np.round(altitude[rows, j], 2),
+            'azimuth': np.round(azimuth[rows, j], 2),
+            'constellation': constellations[rows],
+        }, len(rows))
+
+def write_csv(states, out):
+    writer = csv.writer(out)
+    writer.writerow(FIELDS)
+    count = 0
+    for state in states:
+        writer.writerows(state.tuples(FIELDS))
+        count += len(state)
+    return count
+
+def write_jsonl(states, out):
+    count = 0
+    for state in states:
+        out.writelines(json.dumps(dict(zip(FIELDS, row))) + "\n" for row in state.tuples(FIELDS))
+        count += len(state)
+    return count
+
+def write_parquet(states, path, batch_size=10000):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        sys.exit("Parquet output needs pyarrow (pip install pyarrow)")
+    from sky_state import SkyState
+    schema = pa.schema([
+        ('time', pa.string()), ('name', pa.string()), ('type', pa.string()), ('hip_id', pa.string()),
+        ('magnitude', pa.float64()), ('altitude', pa.float64()), ('azimuth', pa.float64()),
+        ('constellation', pa.string()),
+    ])
+    count = 0
+    # Written in row groups as samples arrive, so memory stays flat for long ranges
+    with pq.ParquetWriter(path, schema) as writer:
+        batch, rows = [], 0
+        for state in states:
+            batch.append(state)
+            rows += len(state)
+            if rows >= batch_size:
+                writer.write_table(SkyState.concat(batch).to_arrow(FIELDS).cast(schema))
+                count += rows
+                batch, rows = [], 0
+        if rows:
+            writer.write_table(SkyState.concat(batch).to_arrow(FIELDS).cast(schema))
+            count += rows
+    return count
+
+def main(argv=None):
+    timer = StageTimer()
+    args = parse_args(argv)
+    with timer.stage("import"):
+        from timeseries_utils import get_visibility_tracks
+        from astro_utils import STAR_MAGNITUDE_LIMIT
+    startup_seconds = time.perf_counter() - _START
+    mag_limit = STAR_MAGNITUDE_LIMIT if args.mag_limit is None else args.mag_limit
+
+    with timer.stage("compute"):
+        tracks = get_visibility_tracks(args.lat, args.lon, args.start, args.end,
+                                       step=timedelta(minutes=args.step), mag_limit=mag_limit,
+                                       include_events=False)
+    for name, message in tracks['errors']:
+        print(f"Warning: skipped {name}: {message}", file=sys.stderr)
+
+    with timer.stage("write"):
+        states = iter_states(tracks)
+        if args.format == "parquet":
+            count = write_parquet(states, args.output)
+        else:
+            writer = write_csv if args.format == "csv" else write_jsonl
+            if args.output == "-":
+                count = writer(states, sys.stdout)
+            else:
+                with open(args.output, "w", newline="" if args.format == "csv" else None, encoding="utf-8") as out:
+                    count = writer(states, out)
+
+    if args.timing:
+        print(f"startup: {startup_seconds * 1000:.1f} ms (including imports)", file=sys.stderr)
+        for row in timer.rows():
+            print(f"{row['stage']}: {row['ms']} ms", file=sys.stderr)
+        print(f"rows: {count}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
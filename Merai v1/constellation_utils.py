@@ -1,6 +1,11 @@
 # constellation_utils.py
 
-CONSTELLATION_FILE_PATH = r"D:\NITM ED\Coding - Python\Final Whatsups\CodingNITSoSe25\Assignment Whats Up\Merai\Merai v1\constellationship.fab"
+import os
+from functools import lru_cache
+import numpy as np
+from cache_utils import CACHE_DIR
+
+CONSTELLATION_FILE_PATH = os.environ.get("MERAI_CONSTELLATION_PATH", r"D:\NITM ED\Coding - Python\Final Whatsups\CodingNITSoSe25\Assignment Whats Up\Merai\Merai v1\constellationship.fab")
 
 # Full constellation names from abbreviations
 CONSTELLATION_NAMES = {
@@ -19,36 +24,144 @@ CONSTELLATION_NAMES = {
     "ORI": "Orion", "PAV": "Pavo", "PEG": "Pegasus", "PER": "Perseus", "PHE": "Phoenix",
     "PIC": "Pictor", "PSA": "Piscis Austrinus", "PSC": "Pisces", "PUP": "Puppis", "PYX": "Pyxis",
     "RET": "Reticulum", "SCL": "Sculptor", "SCO": "Scorpius", "SCT": "Scutum", "SER": "Serpens",
-    "SEX": "Sextans", "SGE": "Sagitta", "SGR": "Sagittarius", "TAH": "Taurus", "TEL": "Telescopium",
+    "SEX": "Sextans", "SGE": "Sagitta", "SGR": "Sagittarius", "TAU": "Taurus", "TEL": "Telescopium",
     "TRA": "Triangulum Australe", "TRI": "Triangulum", "TUC": "Tucana", "UMA": "Ursa Major",
     "UMI": "Ursa Minor", "VEL": "Vela", "VIR": "Virgo", "VOL": "Volans", "VUL": "Vulpecula"
 }
 
+INDEX_CACHE_PATH = os.path.join(CACHE_DIR, "constellation_index.npz")
+
+def full_constellation_name(abbr):
+    """Full name for an IAU abbreviation in any case ("Aql", "AQL"), falling back to the abbreviation."""
+    return CONSTELLATION_NAMES.get(abbr.upper(), abbr)
+
+class ConstellationIndex:
+    """Stick-figure data from constellationship.fab held as compact arrays.
+
+    Each line of the file is ``ABBR N HIP1 HIP2 HIP3 HIP4 ...``: an abbreviation, the number
+    of line segments, then N pairs of HIP IDs. Constellations are numbered in file order.
+    hip_to_constellation is a dense int16 array indexed by HIP ID (-1 = not in any figure),
+    so membership is one array read. Segments are stored as an (M, 2) array of HIP pairs,
+    grouped by constellation and addressed through segment_offsets.
+    """
+
+    def __init__(self, abbreviations, segment_pairs, segment_offsets):
+        self.abbreviations = np.asarray(abbreviations)
+        self.segment_pairs = np.asarray(segment_pairs, dtype=np.int32).reshape(-1, 2)
+        self.segment_offsets = np.asarray(segment_offsets, dtype=np.int32)
+        self.names = np.array([full_constellation_name(a) for a in self.abbreviations])
+        self._id_by_abbr = {a.upper(): i for i, a in enumerate(self.abbreviations)}
+        # Stars shared by two figures keep the first constellation listed in the file
+        max_hip = int(self.segment_pairs.max()) if len(self.segment_pairs) else 0
+        self.hip_to_constellation = np.full(max_hip + 1, -1, dtype=np.int16)
+        owners = np.repeat(np.arange(len(self.abbreviations), dtype=np.int16), np.diff(self.segment_offsets))
+        hips = self.segment_pairs.ravel()
+        owners = np.repeat(owners, 2)
+        first = np.unique(hips, return_index=True)[1]
+        self.hip_to_constellation[hips[first]] = owners[first]
+
+    @classmethod
+    def from_fab(cls, file_path=CONSTELLATION_FILE_PATH):
+        abbreviations, pairs, offsets = [], [], [0]
+        with open(file_path, 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 2:
+                    continue
+                try:
+                    count = int(parts[1])
+                    hips = [int(p) for p in parts[2:2 + 2 * count]]
+                except ValueError:
+                    continue
+                abbreviations.append(parts[0])
+                pairs.extend(hips[:len(hips) - len(hips) % 2])
+                offsets.append(len(pairs) // 2)
+        return cls(abbreviations, np.array(pairs, dtype=np.int32), offsets)
+
+    @classmethod
+    def load(cls, file_path=CONSTELLATION_FILE_PATH, cache_path=INDEX_CACHE_PATH):
+        """Loads the index from the on-disk cache, re-parsing the .fab file only when it has changed."""
+        stat = os.stat(file_path)
+        stamp = np.array([stat.st_mtime_ns, stat.st_size], dtype=np.int64)
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with np.load(cache_path, allow_pickle=False) as data:
+                    if np.array_equal(data['source_stamp'], stamp):
+                        return cls(data['abbreviations'], data['segment_pairs'], data['segment_offsets'])
+            except (OSError, KeyError, ValueError):
+                pass # Unreadable cache: fall through and rebuild it
+        index = cls.from_fab(file_path)
+        if cache_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+                np.savez(cache_path, abbreviations=index.abbreviations, segment_pairs=index.segment_pairs,
+                         segment_offsets=index.segment_offsets, source_stamp=stamp)
+            except OSError:
+                pass
+        return index
+
+    def __len__(self):
+        return len(self.abbreviations)
+
+    def constellation_id(self, hip):
+        """Constellation number for a HIP ID, or -1 when the star is in no stick figure."""
+        hip = int(hip)
+        if 0 <= hip < len(self.hip_to_constellation):
+            return int(self.hip_to_constellation[hip])
+        return -1
+
+    def constellation_ids(self, hips):
+        """Vectorized constellation_id for an array of HIP IDs."""
+        hips = np.asarray(hips, dtype=np.int64)
+        ids = np.full(hips.shape, -1, dtype=np.int16)
+        in_range = (hips >= 0) & (hips < len(self.hip_to_constellation))
+        ids[in_range] = self.hip_to_constellation[hips[in_range]]
+        return ids
+
+    def constellation_of(self, hip):
+        """Full constellation name whose stick figure contains the star, or None."""
+        cid = self.constellation_id(hip)
+        return str(self.names[cid]) if cid >= 0 else None
+
+    def segments(self, abbr=None):
+        """(M, 2) HIP pairs for one constellation, or for all of them when abbr is None."""
+        if abbr is None:
+            return self.segment_pairs
+        cid = self._id_by_abbr[abbr.upper()]
+        return self.segment_pairs[self.segment_offsets[cid]:self.segment_offsets[cid + 1]]
+
+@lru_cache(maxsize=None)
+def _constellation_boundaries():
+    from skyfield.api import load_constellation_map
+    return load_constellation_map()
+
+def constellation_at(position):
+    """Full constellation name(s) for a Skyfield position using the IAU boundaries.
+    Works for any object (planets, the Moon, stars) and for array-valued positions."""
+    abbr = _constellation_boundaries()(position)
+    if np.ndim(abbr) == 0:
+        return full_constellation_name(str(abbr))
+    unique_abbr, inverse = np.unique(abbr, return_inverse=True)
+    names = np.array([full_constellation_name(str(a)) for a in unique_abbr])
+    return names[inverse]
+
+def constellation_at_radec(ra_hours, dec_degrees):
+    """Constellation name(s) for J2000 RA/Dec, scalars or arrays."""
+    from skyfield.api import position_of_radec
+    return constellation_at(position_of_radec(ra_hours, dec_degrees))
+
 def load_constellation_data(file_path=CONSTELLATION_FILE_PATH):
     """Loads constellation data from the .fab file.
-    Assumes format: HIP_ID CONSTELLATION_ABBREVIATION (potentially with other data)
-    Returns a dictionary mapping HIP ID (int) to full constellation name (str).
+    Returns a dictionary mapping HIP ID (int) to full constellation name (str)
+    for every star that appears in a constellation stick figure.
     """
-    constellation_map = {}
     try:
-        with open(file_path, 'r') as f:
-            for line in f:
-                parts = line.strip().split()
-                if len(parts) >= 2:
-                    try:
-                        # Assuming HIP ID is the first part and is an integer
-                        # Sometimes .fab files have HIP prefix, sometimes not.
-                        hip_str = parts[0].replace("HIP", "").strip()
-                        hip_id = int(hip_str)
-                        # Assuming constellation abbreviation is the second part
-                        const_abbr = parts[1].upper()
-                        constellation_map[hip_id] = CONSTELLATION_NAMES.get(const_abbr, const_abbr) # Fallback to abbr if full name not found
-                    except ValueError:
-                        # Skip lines that don't conform to expected HIP ID format
-                        continue
+        index = ConstellationIndex.load(file_path)
     except FileNotFoundError:
         print(f"Error: Constellation file not found at {file_path}")
-    return constellation_map
+        return {}
+    hips = np.flatnonzero(index.hip_to_constellation >= 0)
+    return {int(hip): str(index.names[index.hip_to_constellation[hip]]) for hip in hips}
 
 # Example usage (optional, for testing)
 # if __name__ == "__main__":
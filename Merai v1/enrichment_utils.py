@@ -0,0 +1,77 @@
+# enrichment_utils.py
+# Wikipedia enrichment for a whole set of objects in one pass.
+# Each object gets an ordered list of candidate page titles, most specific first (the order
+# the detail view used to try them one request at a time). The lists of every object are
+# merged and deduplicated, resolved together by wiki_utils.iter_summaries (cache first, then
+# multi-title queries in parallel), and each object takes the first candidate that exists.
+# A title that could not be answered (network failure, deadline, offline and not cached)
+# is not a miss: the object waits for it rather than settling for a less specific page.
+
+from wiki_utils import iter_summaries
+
+# Wikipedia titles of bodies whose plain name is a different article (Mercury is also an element)
+PLANET_SUFFIX = " (planet)"
+STAR_SUFFIXES = (" (star)", " (astronomy)")
+
+def candidate_titles(obj):
+    """Ordered Wikipedia titles for an object dict with 'type', 'name' and, for stars,
+    'hip_id' ("HIP n") and optionally 'wiki_title' from the star-name index and 'bayer'
+    (e.g. "Alpha Lyrae")."""
+    name, obj_type = obj['name'], obj['type']
+    if obj_type == 'Planet':
+        titles = [name + PLANET_SUFFIX, name]
+    elif obj_type == 'Star':
+        hip_id = obj.get('hip_id')
+        titles = [obj['wiki_title']] if obj.get('wiki_title') else [] # Known title first
+        titles += [] if not name or name == hip_id else [name + suffix for suffix in STAR_SUFFIXES] + [name]
+        titles += [title for title in (hip_id, obj.get('bayer')) if title]
+    elif obj_type == 'Satellite':
+        titles = [] # Catalog names ("STARLINK-1234", "ISS (ZARYA)") are not page titles
+    else:
+        titles = [name]
+    return list(dict.fromkeys(titles))
+
+def iter_enrichment(candidates, **kwargs):
+    """Yields (key, title, summary) per key of a {key: [titles]} mapping as soon as its
+    first existing title is known; (key, None, None) once every candidate is known to be missing.
+    Keys with an unanswered title before their pick are not yielded at all, so every result is
+    safe to keep. All titles are resolved in a single iter_summaries pass (kwargs are passed on to it)."""
+    waiting = {} # title -> keys whose next unresolved candidate it is
+    position = {}
+    resolved = {}
+
+    def advance(key):
+        titles = candidates[key]
+        while position[key] < len(titles):
+            title = titles[position[key]]
+            if title not in resolved:
+                waiting.setdefault(title, []).append(key)
+                return None
+            known, summary = resolved[title]
+            if not known:
+                return None # Left unresolved: the page may exist, so the next title must not stand in
+            if summary is not None:
+                return key, title, summary
+            position[key] += 1
+        return key, None, None
+
+    for key in candidates:
+        position[key] = 0
+        result = advance(key)
+        if result:
+            yield result
+    unique_titles = list(dict.fromkeys(title for titles in candidates.values() for title in titles))
+    for title, known, summary in iter_summaries(unique_titles, **kwargs):
+        resolved[title] = (known, summary)
+        for key in waiting.pop(title, []):
+            result = advance(key)
+            if result:
+                yield result
+    # Keys still waiting (on titles iter_summaries never reported) stay unresolved
+
+def enrich(candidates, **kwargs):
+    """{key: (title, summary)} for a {key: [titles]} mapping; (None, None) where nothing was found
+    or the titles could not be answered."""
+    results = dict.fromkeys(candidates, (None, None))
+    results.update((key, (title, summary)) for key, title, summary in iter_enrichment(candidates, **kwargs))
+    return results
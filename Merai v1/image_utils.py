@@ -0,0 +1,132 @@
+# image_utils.py
+# Object images served from the local thumbnail cache instead of hot-linked from Wikipedia.
+# Each image URL is downloaded once, cropped and resized with PIL to the size it is shown at,
+# re-encoded as a small JPEG and kept in cache_utils.ThumbnailCache. Pages embed the bytes
+# (as data: URIs or st.image input), so browsers never fetch the full image, repeat views
+# cost a disk read, and cached images keep working in offline mode.
+
+import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from io import BytesIO
+
+import wiki_utils
+from cache_utils import ThumbnailCache
+
+TILE_SIZE = (360, 216)    # px; tiles show images 180 px high at about 300 px wide, cropped like object-fit: cover
+DETAIL_SIZE = (640, 480)  # px, for the larger detail views
+JPEG_QUALITY = 82
+BACKGROUND = (51, 51, 51) # The tiles' #333, behind transparent PNG/SVG renders
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_thumbnail_cache():
+    """The process-wide ThumbnailCache, opened on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ThumbnailCache()
+        return _cache
+
+def set_thumbnail_cache(cache):
+    """Swaps in a different ThumbnailCache (e.g. in a scratch directory), or None to reset."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+def variant_name(size, crop=True):
+    """Cache key of a rendition: '360x216' cropped to fill, '640x480-fit' scaled to fit inside."""
+    return f"{size[0]}x{size[1]}" + ("" if crop else "-fit")
+
+def make_thumbnail(data, size, crop=True, quality=JPEG_QUALITY):
+    """JPEG bytes of image data cropped to the aspect ratio of size and scaled to it, or with
+    crop=False scaled down to fit inside size with its own aspect ratio."""
+    from PIL import Image, ImageOps # Deferred: PIL is only needed when an image is actually resized
+    with Image.open(BytesIO(data)) as image:
+        image.draft('RGB', (size[0] * 2, size[1] * 2)) # JPEGs decode straight at a reduced scale
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            flat = Image.new('RGB', image.size, BACKGROUND)
+            flat.paste(image, mask=image.getchannel('A'))
+            image = flat
+        if crop:
+            thumbnail = ImageOps.fit(image.convert('RGB'), size, Image.LANCZOS)
+        else:
+            thumbnail = image.convert('RGB')
+            thumbnail.thumbnail(size, Image.LANCZOS)
+    buffer = BytesIO()
+    thumbnail.save(buffer, format='JPEG', quality=quality, optimize=True)
+    return buffer.getvalue()
+
+def _download(url, timeout=wiki_utils.REQUEST_TIMEOUT):
+    """Returns (ok, data) like wiki_utils._fetch_remote: (True, None) for a definite 404/410."""
+    try:
+        resp = wiki_utils.get_session().get(url, timeout=timeout)
+        if resp.status_code == 200:
+            return True, resp.content
+        if resp.status_code in (404, 410):
+            return True, None
+    except Exception:
+        pass
+    return False, None
+
+def get_thumbnail(url, size=TILE_SIZE, crop=True, timeout=wiki_utils.REQUEST_TIMEOUT, offline=None):
+    """Resized JPEG bytes for an image URL, through the cache; None if unavailable.
+    Offline (offline=True, or the MERAI_OFFLINE default) only cached thumbnails are returned."""
+    if not url:
+        return None
+    cache = get_thumbnail_cache()
+    variant = variant_name(size, crop)
+    hit, data = cache.get(url, variant)
+    if hit or wiki_utils.is_offline(offline):
+        return data
+    ok, original = _download(url, timeout)
+    if not ok:
+        return None # Transient failure: not cached, so the next view tries again
+    try:
+        data = make_thumbnail(original, size, crop) if original is not None else None
+    except Exception: # Not an image PIL can read
+        data = None
+    cache.put(url, variant, data)
+    return data
+
+def cached_thumbnail(url, size=TILE_SIZE, crop=True):
+    """Cached thumbnail bytes or None, without any network access."""
+    return get_thumbnail_cache().get(url, variant_name(size, crop))[1] if url else None
+
+def iter_thumbnails(urls, size=TILE_SIZE, crop=True, max_workers=wiki_utils.MAX_WORKERS, timeout=wiki_utils.REQUEST_TIMEOUT,
+                    deadline=wiki_utils.BATCH_DEADLINE, offline=None):
+    """Yields (url, bytes or None) for each distinct URL: cached ones first, then downloads in
+    completion order, then None for any still pending when the deadline passes. Offline only
+    cached thumbnails are yielded (None for the rest)."""
+    offline = wiki_utils.is_offline(offline)
+    unique_urls = list(dict.fromkeys(u for u in urls if u))
+    cache = get_thumbnail_cache()
+    missing = []
+    for url in unique_urls:
+        hit, data = cache.get(url, variant_name(size, crop))
+        if hit or offline:
+            yield url, data
+        else:
+            missing.append(url)
+    if not missing:
+        return
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(missing)))
+    futures = {executor.submit(get_thumbnail, url, size, crop, timeout): url for url in missing}
+    pending = set(missing)
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            url = futures[future]
+            pending.discard(url)
+            yield url, future.result()
+    except FuturesTimeoutError:
+        for url in missing:
+            if url in pending:
+                yield url, None
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def data_uri(data, mime='image/jpeg'):
+    """data: URI for embedding image bytes in HTML, or None."""
+    return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}" if data else None
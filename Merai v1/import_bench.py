@@ -0,0 +1,110 @@
+# import_bench.py
+# Import-time benchmark built on `python -X importtime`.
+# Each module is imported in a fresh interpreter several times; the fastest run is kept
+# and its heaviest direct dependencies are listed. Regenerate the checked-in report with:
+#
+#   python import_bench.py --markdown > IMPORT_TIMES.md
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Module name -> extra directory for sys.path (the Foundation block dashboard lives in a subfolder)
+MODULES = {
+    'perf_utils': None,
+    'cache_utils': None,
+    'sky_state': None,
+    'star_index': None,
+    'star_names': None,
+    'location_utils': None,
+    'wiki_utils': None,
+    'image_utils': None,
+    'constellation_utils': None,
+    'astro_utils': None,
+    'satellite_utils': None,
+    'timelapse_utils': None,
+    'cli': None,
+    'Merai': os.path.join(HERE, 'Foundation block'),
+}
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def measure(module, extra_path=None):
+    """One fresh-interpreter import. Returns (total_us, [(cumulative_us, name)] for direct imports)."""
+    paths = [HERE] + ([extra_path] if extra_path else [])
+    code = f"import sys; sys.path[:0] = {paths!r}; import {module}"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          capture_output=True, text=True, cwd=HERE)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    # importtime prints a module after its dependencies, indented 2 more per level; a top-level
+    # line closes the group, so only children seen since the previous one belong to `module`
+    total, children, pending = 0, [], []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        if indent == 1:
+            if name == module:
+                total, children = cumulative, pending
+            pending = []
+        elif indent == 3:
+            pending.append((cumulative, name))
+    return total, sorted(children, reverse=True)
+
+def run(modules, repeat=5, top=5):
+    results = []
+    for module, extra_path in modules.items():
+        try:
+            runs = [measure(module, extra_path) for _ in range(repeat)]
+        except RuntimeError as e:
+            results.append((module, None, [], str(e)))
+            continue
+        total, children = min(runs, key=lambda r: r[0])
+        results.append((module, total, children[:top], None))
+    return results
+
+def format_text(results):
+    lines = []
+    for module, total, children, error in results:
+        if error:
+            lines.append(f"{module:22s}  not importable here: {error}")
+            continue
+        heaviest = ", ".join(f"{name} {us / 1000:.1f}" for us, name in children)
+        lines.append(f"{module:22s} {total / 1000:8.1f} ms   {heaviest}")
+    return "\n".join(lines)
+
+def format_markdown(results):
+    lines = [
+        "# Import times",
+        "",
+        f"Generated by `python import_bench.py --markdown` with Python {sys.version.split()[0]};",
+        "fastest of several fresh-interpreter imports. Times in ms; the last column lists",
+        "the heaviest direct imports of each module.",
+        "",
+        "| module | import (ms) | heaviest direct imports (ms) |",
+        "|---|---:|---|",
+    ]
+    for module, total, children, error in results:
+        if error:
+            lines.append(f"| `{module}` | n/a | not importable here: {error} |")
+            continue
+        heaviest = ", ".join(f"`{name}` {us / 1000:.1f}" for us, name in children)
+        lines.append(f"| `{module}` | {total / 1000:.1f} | {heaviest} |")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure import time of the app's modules.")
+    parser.add_argument("modules", nargs="*", help="modules to measure (default: all known)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="heaviest direct imports to list")
+    parser.add_argument("--markdown", action="store_true", help="print a Markdown report")
+    args = parser.parse_args()
+    selected = {m: MODULES.get(m) for m in args.modules} if args.modules else MODULES
+    results = run(selected, args.repeat, args.top)
+    print(format_markdown(results) if args.markdown else format_text(results))
@@ -1,15 +1,257 @@
-import geocoder
-from skyfield.api import utc
-from datetime import datetime
+# location_utils.py
+# Where the observer is. Providers each return a Location or None, and locate() takes the
+# first answer:
+#   ManualLocation       coordinates or a city typed in by the user
+#   QueryParamsLocation  ?lat=..&lon=.. on the app URL, as set by the browser-geolocation page (index.html)
+#   IPLocation           geocoder.ip('me'), cached in memory and on disk, looked up on a background thread
+# Addresses come from an offline city database (GeoNames cities with at least 15000 people,
+# CC BY 4.0, bundled as cities.csv.gz) by nearest-city lookup, so no reverse-geocoding request is made.
 
-def get_user_location():
-    g = geocoder.ip('me')
-    if g.ok:
+import csv
+import gzip
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from cache_utils import CACHE_DIR, ensure_cache_dir
+
+logger = logging.getLogger(__name__)
+
+CITIES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cities.csv.gz")
+IP_CACHE_PATH = os.path.join(CACHE_DIR, "ip_location.json")
+IP_CACHE_TTL = 24 * 3600  # an IP's location rarely moves; re-check daily
+IP_TIMEOUT = 5.0          # seconds get_user_location() waits for a lookup in progress
+CITY_KM = 25.0            # closer than this to a city's centre, the address is the city itself
+NEAR_KM = 300.0           # further than this from every city, the address is the coordinates
+EARTH_RADIUS_KM = 6371.0
+
+Location = namedtuple('Location', ['lat', 'lon', 'address', 'source'])
+
+def valid_coordinates(lat, lon):
+    return -90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0
+
+def parse_coordinates(text):
+    """(lat, lon) from text like '28.61, 77.21' or '28.61 77.21', or None."""
+    parts = text.replace(',', ' ').split()
+    if len(parts) != 2:
+        return None
+    try:
+        lat, lon = float(parts[0]), float(parts[1])
+    except ValueError:
+        return None
+    return (lat, lon) if valid_coordinates(lat, lon) else None
+
+class CityDatabase:
+    """Offline city table, largest first, with nearest-city lookup and name search."""
+
+    def __init__(self, names, countries, latitude, longitude, population):
+        import numpy as np
+        from star_index import GridIndex, radec_to_vectors
+        self._radec_to_vectors = radec_to_vectors
+        self.names = list(names)
+        self.countries = list(countries)
+        self.latitude = np.asarray(latitude, dtype=float)
+        self.longitude = np.asarray(longitude, dtype=float)
+        self.population = np.asarray(population, dtype=np.int64)
+        self._lower_names = [name.lower() for name in self.names]
+        # Longitude/latitude play RA/Dec; a spherical Earth is plenty to pick the nearest city
+        self._index = GridIndex(self.longitude / 15.0, self.latitude)
+
+    @classmethod
+    def load(cls, path=CITIES_PATH):
+        """Reads the gzipped CSV (name, country, latitude, longitude, population)."""
+        with gzip.open(path, 'rt', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            next(reader) # header
+            names, countries, latitude, longitude, population = zip(*reader)
+        return cls(names, countries, list(map(float, latitude)), list(map(float, longitude)), list(map(int, population)))
+
+    def __len__(self):
+        return len(self.names)
+
+    def label(self, row):
+        return f"{self.names[row]}, {self.countries[row]}"
+
+    def location(self, row):
+        return Location(float(self.latitude[row]), float(self.longitude[row]), self.label(row), 'city')
+
+    def nearest(self, lat, lon, max_km=None):
+        """(row, distance in km) of the city closest to lat/lon, or (None, None) if none is within max_km."""
+        max_degrees = 180.0 if max_km is None else min(180.0, math.degrees(max_km / EARTH_RADIUS_KM))
+        row, angle = self._index.nearest(self._radec_to_vectors(lon / 15.0, lat), max_degrees)
+        if row is None:
+            return None, None
+        return row, math.radians(angle) * EARTH_RADIUS_KM
+
+    def describe(self, lat, lon):
+        """Address for coordinates: 'City, Country', 'near City, Country' further out, or the
+        coordinates themselves when no city is within NEAR_KM (e.g. at sea)."""
+        row, km = self.nearest(lat, lon, NEAR_KM)
+        if row is None:
+            return format_coordinates(lat, lon)
+        return self.label(row) if km <= CITY_KM else f"near {self.label(row)} ({km:.0f} km)"
+
+    def search(self, text, limit=10):
+        """Locations of cities whose name starts with text (then contains it), largest first."""
+        text = text.strip().lower()
+        if not text:
+            return []
+        starts = [row for row, name in enumerate(self._lower_names) if name.startswith(text)]
+        if len(starts) < limit:
+            starts += [row for row, name in enumerate(self._lower_names) if text in name and not name.startswith(text)]
+        return [self.location(row) for row in starts[:limit]]
+
+@lru_cache(maxsize=None)
+def get_city_database(path=CITIES_PATH):
+    """Shared CityDatabase, loaded once per process."""
+    return CityDatabase.load(path)
+
+def format_coordinates(lat, lon):
+    return f"{abs(lat):.2f}°{'N' if lat >= 0 else 'S'}, {abs(lon):.2f}°{'E' if lon >= 0 else 'W'}"
+
+def describe_location(lat, lon):
+    """Nearest-city address for coordinates, or the coordinates themselves without the city database."""
+    try:
+        return get_city_database().describe(lat, lon)
+    except OSError as e:
+        logger.warning("No city database: %s", e)
+        return format_coordinates(lat, lon)
+
+def search_cities(text, limit=10):
+    try:
+        return get_city_database().search(text, limit)
+    except OSError as e:
+        logger.warning("No city database: %s", e)
+        return []
+
+class ManualLocation:
+    """Fixed coordinates, e.g. typed in or picked from search_cities(); address from the city database unless given."""
+    source = 'manual'
+
+    def __init__(self, lat, lon, address=None):
+        self.lat, self.lon, self.address = lat, lon, address
+
+    def locate(self):
+        if self.lat is None or self.lon is None or not valid_coordinates(self.lat, self.lon):
+            return None
+        return Location(self.lat, self.lon, self.address or describe_location(self.lat, self.lon), self.source)
+
+class QueryParamsLocation(ManualLocation):
+    """lat/lon from a query-string mapping such as st.query_params. index.html asks the browser
+    for its position and opens the app with ?lat=..&lon=.. on the URL."""
+    source = 'browser'
+
+    def __init__(self, params):
+        try:
+            lat, lon = float(params['lat']), float(params['lon'])
+        except (KeyError, TypeError, ValueError):
+            lat = lon = None
+        super().__init__(lat, lon)
+
+class IPLocation:
+    """Location of this machine's public IP via geocoder.ip('me').
+
+    The answer is kept in memory and in a JSON file for ttl seconds, so only the first run
+    after it expires goes to the network, and that lookup runs on a background thread:
+    start() early, and locate() returns None rather than blocking until it has finished.
+    """
+    source = 'ip'
+
+    def __init__(self, cache_path=IP_CACHE_PATH, ttl=IP_CACHE_TTL):
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._thread = None
+        self._result = None
+        self._fetched_at = 0.0
+
+    def cached(self):
+        """The in-memory or on-disk answer if still fresh, without any network access."""
+        if self._result is not None and time.time() - self._fetched_at <= self.ttl:
+            return self._result
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                entry = json.load(f)
+            if time.time() - entry['fetched_at'] <= self.ttl:
+                self._result, self._fetched_at = Location(entry['lat'], entry['lon'], entry['address'], self.source), entry['fetched_at']
+                return self._result
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    def start(self):
+        """Starts the lookup on a background thread unless a fresh answer is cached or one is running."""
+        with self._lock:
+            if self.cached() is not None or self.pending():
+                return
+            self._thread = threading.Thread(target=self._lookup, name="ip-location", daemon=True)
+            self._thread.start()
+
+    def pending(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def wait(self, timeout=None):
+        """Waits up to timeout seconds for a running lookup; returns the answer or None."""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.cached()
+
+    def locate(self, wait=0.0):
+        location = self.cached()
+        if location is None:
+            self.start()
+            location = self.wait(wait) if wait else None
+        return location
+
+    def _lookup(self):
+        try:
+            import geocoder # Deferred: only the IP lookup path needs it
+            g = geocoder.ip('me')
+        except Exception as e: # Offline, DNS failure, rate limit...: other providers still work
+            logger.warning("IP location lookup failed: %s", e)
+            return
+        if not g.ok or not g.latlng:
+            logger.warning("IP location lookup found nothing")
+            return
         lat, lon = g.latlng
-        address = g.city + ", " + g.country if g.city and g.country else "Unknown location"
-        return lat, lon, address
-    else:
+        address = g.city + ", " + g.country if g.city and g.country else describe_location(lat, lon)
+        fetched_at = time.time()
+        try:
+            ensure_cache_dir(os.path.dirname(os.path.abspath(self.cache_path)))
+            with open(self.cache_path, 'w', encoding='utf-8') as f:
+                json.dump({'lat': lat, 'lon': lon, 'address': address, 'fetched_at': fetched_at}, f)
+        except OSError as e:
+            logger.warning("Could not cache IP location: %s", e)
+        self._result, self._fetched_at = Location(lat, lon, address, self.source), fetched_at
+
+_ip_location = IPLocation()
+
+def get_ip_location():
+    """The process-wide IPLocation, so a lookup started on one Streamlit run is reused by the next."""
+    return _ip_location
+
+def locate(providers):
+    """First Location any provider returns, in order, or None."""
+    for provider in providers:
+        location = provider.locate()
+        if location is not None:
+            return location
+    return None
+
+def get_user_location(wait=IP_TIMEOUT):
+    """(lat, lon, address) from the IP provider, waiting up to `wait` seconds if nothing is cached;
+    (None, None, None) when it is unavailable."""
+    location = get_ip_location().locate(wait)
+    if location is None:
         return None, None, None
+    return location.lat, location.lon, location.address
 
 def get_user_datetime():
-    return datetime.now().replace(tzinfo=utc)
+    return datetime.now().replace(tzinfo=timezone.utc)
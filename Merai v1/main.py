@@ -1,15 +1,12 @@
 import streamlit as st
 st.set_page_config(page_title="Merai")
-from datetime import date, datetime
-from skyfield.api import utc
-import pandas as pd
-from astro_utils import get_visible_objects
-from wiki_utils import get_object_image_url, get_object_description, extract_name_from_description
-from location_utils import get_user_location
-from constellation_utils import load_constellation_data # Import new utility
+import os
+from datetime import datetime, timezone
+from perf_utils import StageTimer, note_miss
 
-# Load constellation data once at the start
-CONSTELLATION_MAP = load_constellation_data()
+# Default faintest star magnitude; tiles are paginated and enriched a page at a time, so deeper limits stay usable
+MAG_LIMIT = 2.0
+TILES_PER_PAGE = 12
 
 # Immersive background and custom styles
 st.markdown(
@@ -38,114 +35,303 @@ st.markdown(
 
 st.title("Merai") # Changed from STAR DUST
 
-# Location
+# Without a browser-supplied location the IP lookup starts now (unless cached), so its
+# network round trip overlaps the imports below instead of following them
+from location_utils import (IP_TIMEOUT, ManualLocation, QueryParamsLocation, get_ip_location, locate,
+                            parse_coordinates, search_cities)
+if 'lat' not in st.query_params:
+    get_ip_location().start()
+
+# Heavy modules (pandas, NumPy, Skyfield via sky_cache, requests) load only after the
+# styles and title have been sent, so the first render does not wait on them
+import numpy as np
+import pandas as pd
+from sky_cache import cached_sky_state
+from sky_state import SkyState
+from wiki_utils import OFFLINE, summary_image_url, summary_description
+from enrichment_utils import candidate_titles, iter_enrichment
+from image_utils import cached_thumbnail, data_uri, iter_thumbnails
+from satellite_utils import TLE_PATH
+
+# Per-stage timings for this run, shown in the sidebar at the end of the script
+timer = StageTimer()
+
+# Offline mode: Wikipedia details and images come only from the local caches
+# This session only: passed to each Wikipedia and image call rather than set for the whole process
+offline = st.sidebar.checkbox("Offline mode (cached details only)", value=OFFLINE)
+
+# Satellites need a local element file (e.g. CelesTrak's active.tle at satellite_utils.TLE_PATH)
+show_satellites = os.path.exists(TLE_PATH) and st.sidebar.checkbox("Show satellites (sunlit, after dusk)", value=False)
+
+# --- Cached stages ---
+# Each stage only re-runs when its own inputs change: a new time re-runs astronomy,
+# only objects not seen before are enriched, and an unchanged rerun is all cache hits.
+# note_miss() sits inside each cached body, so it only fires when the stage really runs.
+# Sky states are frozen SkyStates, so they are cached as shared resources rather than copied per run.
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def compute_sky(lat, lon, dt, mag_limit):
+    note_miss()
+    return cached_sky_state(lat, lon, dt, mag_limit=mag_limit) # Shared across nearby users and reruns
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def compute_satellites(lat, lon, dt):
+    # Not bucketed by sky_cache: satellites cross degrees of sky in the time a bucket spans
+    note_miss()
+    from satellite_utils import visible_satellite_state
+    return visible_satellite_state(lat, lon, dt, sunlit_only=True).freeze()
+
+def compute_objects(lat, lon, dt, mag_limit, show_satellites):
+    sky = compute_sky(lat, lon, dt, mag_limit)
+    return SkyState.concat([sky, compute_satellites(lat, lon, dt)]) if show_satellites else sky
+
+@st.cache_resource
+def enrichment_store():
+    # wiki_key -> enrichment fields, shared by all sessions for the life of the process
+    return {}
+
+def enrich_stream(candidates, offline=False):
+    """Yields (key, enrichment fields) as each key's first existing Wikipedia page is known, for the
+    keys of a {key: [candidate titles]} mapping that were not enriched before. The store is shared
+    by every session, so it only keeps picks whose more specific titles are all definitely missing
+    (iter_enrichment never yields a pick made past a timeout or an offline cache miss)."""
+    store = enrichment_store()
+    missing = {key: titles for key, titles in candidates.items() if key not in store}
+    if missing:
+        note_miss()
+    # Every candidate of every key is resolved in one pass (identical titles once, many per request);
+    # description and image both come from the chosen page's summary
+    for key, title, summary in iter_enrichment(missing, offline=offline):
+        if summary is None:
+            continue # No page at all: left to the next rerun (the summary cache answers quickly)
+        store[key] = {
+            'description': summary_description(summary),
+            'image_url': summary_image_url(summary),
+        }
+        yield key, store[key]
+
+ENRICHMENT_COLUMNS = ('description', 'image_url')
+EMPTY_ENRICHMENT = dict.fromkeys(ENRICHMENT_COLUMNS)
+
+def enrichment_keys(sky):
+    """Enrichment key per row: the HIP ID for stars, the astro_utils name otherwise."""
+    return np.where(sky.get('hip') >= 0, sky.hip_ids(), sky['name'])
+
+def object_labels(sky, hip_ids):
+    """Display name per row from the sky state alone: the astro_utils name (the IAU proper name for
+    named stars), else a star's Bayer or Flamsteed designation, else its HIP ID."""
+    designation = sky.get('designation')
+    unnamed = (sky['name'] == hip_ids) & designation.astype(bool)
+    return np.where(unnamed, designation, sky['name'])
+
+def enrichment_columns(keys, store):
+    """Enrichment columns for the given keys from the store; None where nothing is known yet."""
+    fields = [store.get(key, EMPTY_ENRICHMENT) for key in keys]
+    return {column: [f[column] for f in fields] for column in ENRICHMENT_COLUMNS}
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def render_sky_chart(lat, lon, dt, mag_limit, show_satellites, title):
+    note_miss()
+    from chart_utils import sky_chart_png # matplotlib is only imported once a chart is drawn
+    return sky_chart_png(compute_objects(lat, lon, dt, mag_limit, show_satellites), title)
+
+MAX_DESC_LEN = 120  # characters
+TILE_HEIGHT = 550   # px, (already adjusted for constellation line)
+
+@st.cache_data(max_entries=4096, show_spinner=False)
+def render_tile_html(display_name_h1, display_name_h2, obj_type, altitude, azimuth, constellation_name_for_tile, description_for_tile, image_src, loading=False):
+    note_miss()
+    # Prepare HTML parts for embedding in the main f-string
+    if image_src:
+        image_html_part = f"<img src='{image_src}' style='width:100%;height:180px;object-fit:cover;border-top-left-radius:16px;border-top-right-radius:16px;margin-bottom:0;' alt='object image' />"
+    elif loading: # Placeholder while the Wikipedia summary or the thumbnail is still on its way
+        image_html_part = "<div style='width:100%;height:180px;display:flex;align-items:center;justify-content:center;background:#333;border-top-left-radius:16px;border-top-right-radius:16px;color:#bbb;font-size:18px;'>Loading…</div>"
+    else:
+        image_html_part = "<div style='width:100%;height:180px;display:flex;align-items:center;justify-content:center;background:#333;border-top-left-radius:16px;border-top-right-radius:16px;color:#ff6666;font-size:18px;'>No image found.</div>"
+    h1_html_part = f"<h1 style='color:#ffd700;margin:10px 0 0 0;font-size:1.5em;text-align:center;'>{display_name_h1}</h1>"
+    h2_html_part = f"<h2 style='color:#fff;margin:0 0 8px 0;font-size:1.1em;text-align:center;letter-spacing:1px;'>{display_name_h2}</h2>" if display_name_h2 else ""
+    details_html_part = f"<div style='text-align:center;color:#eee;font-size:0.95em;'><b>Type:</b> {obj_type}<br><b>Altitude:</b> {altitude}°<br><b>Azimuth:</b> {azimuth}°<br><b>Constellation:</b> {constellation_name_for_tile}</div>"
+    
+    description_html_part = ""
+    if description_for_tile:
+        desc_content = description_for_tile[:MAX_DESC_LEN] + "..." if len(description_for_tile) > MAX_DESC_LEN else description_for_tile
+        description_html_part = f"<h3 style='color:#bbb;font-size:0.9em;margin:8px 0 0 0;text-align:left;overflow-y:auto;max-height:60px;padding:0 5px;'>{desc_content}</h3>"
+
+    tile_html = f"""
+    <div style='height:{TILE_HEIGHT}px; display:flex; flex-direction:column; justify-content:space-between; border:2px solid #ffd700; border-radius:18px; padding:0; margin-bottom:18px; background:linear-gradient(135deg,#232526 0%,#414345 100%); box-shadow:0 4px 24px #000a;'>
+        <div> <!-- Top content container -->
+            {image_html_part}
+            <div style='padding: 0 10px;'> <!-- Text content padding -->
+                {h1_html_part}
+                {h2_html_part}
+                {details_html_part}
+                {description_html_part}
+            </div> <!-- Close Text content padding -->
+        </div> <!-- Close Top content container -->
+        <div style="flex-grow: 1;"></div> <!-- Spacer div to push content up, works with justify-content:space-between -->
+    </div>
+    """ # Closing triple quote for tile_html
+    return tile_html
+
+LOCATION_SOURCES = {'manual': "Entered location", 'city': "Selected city", 'browser': "Browser location", 'ip': "Detected location"}
+
+def sidebar_location():
+    """Location typed in the sidebar, as 'lat, lon' or a city from the offline database, or None."""
+    text = st.sidebar.text_input("Location (city or 'lat, lon')", value="")
+    if not text:
+        return None
+    coordinates = parse_coordinates(text)
+    if coordinates:
+        return ManualLocation(*coordinates).locate()
+    matches = search_cities(text)
+    if not matches:
+        st.sidebar.warning("No matching city.")
+        return None
+    return st.sidebar.selectbox("Matching cities", matches, format_func=lambda location: location.address)
+
+# Location: sidebar entry, then the browser's position from the URL, then the (cached) IP lookup
 st.header("Location")
-lat, lon, address = get_user_location()
-if lat is None:
-    st.error("Could not determine location.")
+with timer.stage("location"):
+    location = sidebar_location() or locate([QueryParamsLocation(st.query_params), get_ip_location()])
+    if location is None and get_ip_location().pending():
+        note_miss()
+        with st.spinner("Looking up your location..."):
+            location = get_ip_location().wait(IP_TIMEOUT)
+if location is None:
+    st.error("Could not determine location. Enter a city or coordinates in the sidebar, "
+             "or open the app from index.html to use your browser's location.")
     st.stop()
-st.success(f"Detected location: {address} ({lat}, {lon})")
+lat, lon, address = location.lat, location.lon, location.address
+st.success(f"{LOCATION_SOURCES[location.source]}: {address} ({lat}, {lon})")
 st.map(pd.DataFrame({"lat": [lat], "lon": [lon]}))
 
 # Date and Time
 st.header("Date and Time")
-d = st.date_input("Date", value=date.today())
-t = st.time_input("Time", value=datetime.now().time())
-dt = datetime.combine(d, t).replace(tzinfo=utc)
+# Defaults are set once per session: a default that changes every run makes Streamlit treat the
+# widget as new, dropping the user's choice. dt is truncated to the minute, so an unchanged rerun
+# hits the sky-state, satellite and chart caches
+if 'date' not in st.session_state:
+    now = datetime.now()
+    st.session_state['date'], st.session_state['time'] = now.date(), now.time().replace(second=0, microsecond=0)
+d = st.date_input("Date", key='date')
+t = st.time_input("Time", key='time')
+dt = datetime.combine(d, t).replace(second=0, microsecond=0, tzinfo=timezone.utc)
 
 # Fetch Data
 st.header("Visible Astronomical Objects")
+mag_limit = st.slider("Faintest star magnitude", min_value=0.0, max_value=6.5, value=MAG_LIMIT, step=0.5)
 with st.spinner("Fetching visible astronomical objects and details..."): # Updated spinner message
-    visible_objects = get_visible_objects(lat, lon, dt)
-    if not visible_objects:
+    with timer.stage("sky state"):
+        sky = compute_objects(lat, lon, dt, mag_limit, show_satellites)
+    if not len(sky):
         st.warning("No astronomical objects are currently visible from your location.")
         st.stop()
 
-    # Enhance objects with descriptions and refined names for DataFrame and Tiles
-    for obj in visible_objects:
-        original_astro_name = obj['name'] # Name from astro_utils (proper name or HIP ID)
-        hip_id = obj.get('hip_id')
-
-        description_lookup_key = hip_id if obj['type'] == 'Star' and hip_id else original_astro_name
-        description = get_object_description(description_lookup_key)
-        name_from_desc = extract_name_from_description(description) if description else None
-
-        # Update obj['name'] for DataFrame display: Wikipedia name > Hipparcos proper name > HIP ID
-        if name_from_desc:
-            obj['name'] = name_from_desc
-        # else obj['name'] remains what astro_utils set it to (proper_name or HIP ID)
-        
-        # Store details for tile generation to avoid re-fetching
-        obj['fetched_description'] = description
-        obj['name_extracted_from_description_for_tile_h1'] = name_from_desc
-        
-        # Add constellation for DataFrame if it's a star
-        obj['constellation'] = "N/A"
-        if obj['type'] == 'Star':
-            hip_int_for_lookup = obj.get('hip_int')
-            if hip_int_for_lookup and CONSTELLATION_MAP:
-                obj['constellation'] = CONSTELLATION_MAP.get(hip_int_for_lookup, "Unknown")
-
-# Create DataFrame for display
-df_columns = ['name', 'hip_id', 'type', 'altitude', 'azimuth', 'constellation']
-# hip_int is useful for debugging but maybe not for final table, user screenshot included it.
-if visible_objects and 'hip_int' in visible_objects[0]: # Check if hip_int exists
-    df_columns.insert(2, 'hip_int') # Insert hip_int after hip_id if present
-
-df_display_data = []
-for obj in visible_objects:
-    row = {col: obj.get(col, 'N/A') for col in df_columns}
-    df_display_data.append(row)
-
-df = pd.DataFrame(df_display_data)
-st.dataframe(df[df_columns]) # Ensure column order
+    # One enrichment key per object (HIP ID for stars, the astro_utils name otherwise). Whatever
+    # was enriched on earlier runs is filled in as new columns next to the shared, frozen ones;
+    # the rest streams in with the tiles below
+    store = enrichment_store()
+    hip_ids = sky.hip_ids()
+    keys = enrichment_keys(sky)
+    labels = object_labels(sky, hip_ids)
+    sky = sky.with_columns(**enrichment_columns(keys, store))
+
+# Table straight from the columns. Name: proper name > Bayer/Flamsteed designation > HIP ID,
+# all from the bundled star-name index, so it does not wait for Wikipedia
+df_columns = ['name', 'hip_id', 'type', 'magnitude', 'altitude', 'azimuth', 'constellation']
+if np.any(sky.get('hip') >= 0):
+    df_columns[2:2] = ['hip', 'designation'] # Star identifiers after the "HIP n" label when there are stars
+    if np.any(sky.get('hd') >= 0):
+        df_columns.insert(4, 'hd') # From field H71 of hip_main.dat; absent from trimmed catalogs
+table = sky.with_columns(name=labels)
+st.dataframe(table.to_pandas(df_columns).rename(columns={'hip': 'hip_int'}))
+
+# Polar chart of everything above the horizon, with constellation stick figures
+st.header("Sky Chart")
+with timer.stage("sky chart"):
+    st.image(render_sky_chart(lat, lon, dt, mag_limit, show_satellites, f"{address} – {dt:%Y-%m-%d %H:%M} UTC"))
 
 # Details as uniform dark-mode friendly tiles with fixed height and content truncation
+# Only one page of tiles is built per run; each tile is drawn at once (with a placeholder
+# if its summary is not known yet) and redrawn in place when the summary arrives.
 st.header("Learn More About Each Object")
-cols = st.columns(3)
-MAX_DESC_LEN = 120  # characters
-TILE_HEIGHT = 550   # px, (already adjusted for constellation line)
-import re
-for idx, obj_data in enumerate(visible_objects): 
-    with cols[idx % 3]:
-        display_name_h1 = obj_data['name_extracted_from_description_for_tile_h1'] if obj_data['name_extracted_from_description_for_tile_h1'] else "NULL"
-        display_name_h2 = obj_data.get('hip_id', '') 
-        description_for_tile = obj_data['fetched_description']
-        constellation_name_for_tile = obj_data.get('constellation', "N/A")
-
-        if display_name_h1 == display_name_h2 and display_name_h1 != "NULL":
-            display_name_h2 = ''
-
-        image_lookup_key = display_name_h2 if obj_data['type'] == 'Star' and display_name_h2 else obj_data['name']
-        image_url = get_object_image_url(image_lookup_key)
-
-        # Prepare HTML parts for embedding in the main f-string
-        image_html_part = f"<img src='{image_url}' style='width:100%;height:180px;object-fit:cover;border-top-left-radius:16px;border-top-right-radius:16px;margin-bottom:0;' alt='object image' />" if image_url else "<div style='width:100%;height:180px;display:flex;align-items:center;justify-content:center;background:#333;border-top-left-radius:16px;border-top-right-radius:16px;color:#ff6666;font-size:18px;'>No image found.</div>"
-        h1_html_part = f"<h1 style='color:#ffd700;margin:10px 0 0 0;font-size:1.5em;text-align:center;'>{display_name_h1}</h1>"
-        h2_html_part = f"<h2 style='color:#fff;margin:0 0 8px 0;font-size:1.1em;text-align:center;letter-spacing:1px;'>{display_name_h2}</h2>" if display_name_h2 else ""
-        details_html_part = f"<div style='text-align:center;color:#eee;font-size:0.95em;'><b>Type:</b> {obj_data['type']}<br><b>Altitude:</b> {obj_data['altitude']}°<br><b>Azimuth:</b> {obj_data['azimuth']}°<br><b>Constellation:</b> {constellation_name_for_tile}</div>"
-        
-        description_html_part = ""
-        if description_for_tile:
-            desc_content = description_for_tile[:MAX_DESC_LEN] + "..." if len(description_for_tile) > MAX_DESC_LEN else description_for_tile
-            description_html_part = f"<h3 style='color:#bbb;font-size:0.9em;margin:8px 0 0 0;text-align:left;overflow-y:auto;max-height:60px;padding:0 5px;'>{desc_content}</h3>"
-
-        tile_html = f"""
-        <div style='height:{TILE_HEIGHT}px; display:flex; flex-direction:column; justify-content:space-between; border:2px solid #ffd700; border-radius:18px; padding:0; margin-bottom:18px; background:linear-gradient(135deg,#232526 0%,#414345 100%); box-shadow:0 4px 24px #000a;'>
-            <div> <!-- Top content container -->
-                {image_html_part}
-                <div style='padding: 0 10px;'> <!-- Text content padding -->
-                    {h1_html_part}
-                    {h2_html_part}
-                    {details_html_part}
-                    {description_html_part}
-                </div> <!-- Close Text content padding -->
-            </div> <!-- Close Top content container -->
-            <div style="flex-grow: 1;"></div> <!-- Spacer div to push content up, works with justify-content:space-between -->
-        </div>
-        """ # Closing triple quote for tile_html
+page_count = max(1, -(-len(sky) // TILES_PER_PAGE))
+page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1) if page_count > 1 else 1
+page_rows = range((page - 1) * TILES_PER_PAGE, min(page * TILES_PER_PAGE, len(sky)))
+image_srcs = {} # row -> thumbnail data URI once known
+
+def draw_tile(slot, row, loading):
+    display_name_h1 = labels[row]
+    display_name_h2 = hip_ids[row] or ''
+    if sky['type'][row] == 'Satellite': # No Wikipedia page: catalog name and NORAD number
+        display_name_h1, display_name_h2 = sky['name'][row], f"NORAD {sky['norad_id'][row]}"
+    description_for_tile = sky['description'][row]
+    # Constellation comes from astro_utils (IAU boundaries), for planets and the Moon as well as stars
+    constellation_name_for_tile = sky['constellation'][row] or "N/A"
+
+    if display_name_h1 == display_name_h2:
+        display_name_h2 = ''
+
+    # The thumbnail is embedded from the local cache, so the browser never fetches the full image
+    image_src = image_srcs.get(row)
+
+    tile_html = render_tile_html(display_name_h1, display_name_h2, sky['type'][row], float(sky['altitude'][row]), float(sky['azimuth'][row]), constellation_name_for_tile, description_for_tile, image_src, loading)
+    with slot.container():
         st.markdown(tile_html, unsafe_allow_html=True)
 
         if description_for_tile and len(description_for_tile) > MAX_DESC_LEN:
             with st.expander("Know more"):
                 st.markdown(f"<h4 style='color:#bbb;font-size:1em;margin:0;'>{description_for_tile}</h4>", unsafe_allow_html=True)
+
+cols = st.columns(3)
+slots = {} # wiki_key -> [(placeholder, row)], several objects may share a key
+with timer.stage("rendering"):
+    for idx, row in enumerate(page_rows):
+        with cols[idx % 3]:
+            slot = st.empty()
+        slots.setdefault(keys[row], []).append((slot, row))
+        image_srcs[row] = data_uri(cached_thumbnail(sky['image_url'][row])) # Disk only, no network
+        image_pending = sky['image_url'][row] and not image_srcs[row]
+        draw_tile(slot, row, loading=keys[row] not in store or image_pending)
+
+with timer.stage("enrichment"):
+    # Candidate Wikipedia titles (most specific first) for the objects on this page only
+    candidates = {}
+    wiki_titles = sky.get('wiki_title') # Stars' known titles from the star-name index
+    for key, entries in slots.items():
+        row = entries[0][1]
+        candidates[key] = candidate_titles({'type': sky['type'][row], 'name': sky['name'][row], 'hip_id': hip_ids[row],
+                                            'wiki_title': wiki_titles[row]})
+    for key, fields in enrich_stream(candidates, offline):
+        for slot, row in slots[key]:
+            for column in ENRICHMENT_COLUMNS: # This run's own columns, so they can be filled in place
+                sky[column][row] = fields[column]
+            image_srcs[row] = data_uri(cached_thumbnail(sky['image_url'][row]))
+            draw_tile(slot, row, loading=bool(sky['image_url'][row] and not image_srcs[row]))
+    # Keys that got no summary: replace the placeholder with the final "No image found." tile
+    for key, entries in slots.items():
+        if key not in store:
+            for slot, row in entries:
+                draw_tile(slot, row, loading=False)
+
+with timer.stage("images"):
+    # Thumbnails not cached yet are downloaded and resized concurrently, once per URL,
+    # and each tile is redrawn in place as its image arrives
+    waiting = {} # image URL -> [(placeholder, row)]
+    for entries in slots.values():
+        for slot, row in entries:
+            if sky['image_url'][row] and not image_srcs[row]:
+                waiting.setdefault(sky['image_url'][row], []).append((slot, row))
+    if waiting:
+        note_miss()
+    for url, data in iter_thumbnails(list(waiting), offline=offline):
+        for slot, row in waiting[url]:
+            # Never the full-size original: a failed or late download shows the placeholder,
+            # and is tried again on the next run (only definite failures are cached)
+            image_srcs[row] = data_uri(data)
+            draw_tile(slot, row, loading=False)
+
+# Instrumentation: per-stage time and whether each stage was a cache hit on this run
+with st.sidebar.expander("Performance"):
+    st.table(pd.DataFrame(timer.rows()))
+    st.caption(f"Total staged time: {timer.total_seconds * 1000:.1f} ms")
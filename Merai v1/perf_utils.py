@@ -0,0 +1,48 @@
+# perf_utils.py
+# Lightweight per-stage timing for the app and the command-line tools.
+# A StageTimer records how long each named stage took and whether it was served from a
+# cache. Code that only runs on a cache miss (e.g. the body of a cached function) calls
+# note_miss() to flag the stage currently being timed on this thread.
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+_active = threading.local()
+
+class StageTimer:
+    def __init__(self):
+        self.stages = OrderedDict()
+
+    @contextmanager
+    def stage(self, name):
+        record = {'seconds': 0.0, 'cache': 'hit'}
+        self.stages[name] = record
+        stack = getattr(_active, 'stack', None)
+        if stack is None:
+            stack = _active.stack = []
+        stack.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            stack.pop()
+
+    @property
+    def total_seconds(self):
+        return sum(record['seconds'] for record in self.stages.values())
+
+    def rows(self):
+        """One dict per stage (stage, ms, cache), in the order the stages ran."""
+        return [
+            {'stage': name, 'ms': round(record['seconds'] * 1000, 1), 'cache': record['cache']}
+            for name, record in self.stages.items()
+        ]
+
+def note_miss():
+    """Marks the stage being timed on this thread as a cache miss (no-op outside a stage)."""
+    stack = getattr(_active, 'stack', None)
+    if stack:
+        stack[-1]['cache'] = 'miss'
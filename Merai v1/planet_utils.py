@@ -0,0 +1,130 @@
+# planet_utils.py
+# Solar-system bodies from a fixed table instead of iterating planets.names().
+# names() lists every alias (numeric ids, "x barycenter" and plain names for the same body),
+# so looping over it observed several bodies more than once. Here each body appears once,
+# keyed by its ephemeris target id, and every body is evaluated for all requested times
+# in one vectorized observe() call. Failures are returned and logged, not swallowed.
+
+import logging
+import numpy as np
+from skyfield.magnitudelib import planetary_magnitude
+
+logger = logging.getLogger(__name__)
+
+# (display name, ephemeris target, type); order is the display order
+BODIES = [
+    ('Sun', 'sun', 'Sun'),
+    ('Moon', 'moon', 'Moon'),
+    ('Mercury', 'mercury', 'Planet'),
+    ('Venus', 'venus', 'Planet'),
+    ('Mars', 'mars', 'Planet'),
+    ('Jupiter', 'jupiter barycenter', 'Planet'),
+    ('Saturn', 'saturn barycenter', 'Planet'),
+    ('Uranus', 'uranus barycenter', 'Planet'),
+    ('Neptune', 'neptune barycenter', 'Planet'),
+    ('Pluto', 'pluto barycenter', 'Planet'),
+]
+
+SUN_MAGNITUDE = -26.74
+PLUTO_ABSOLUTE_MAGNITUDE = -1.0 # H in V; Pluto's phase angle never exceeds ~2 degrees
+
+def resolve_bodies(planets, bodies=BODIES):
+    """[(name, type, target)] for the bodies present in the ephemeris, one entry per target id.
+    Returns (resolved, errors) where errors lists (name, message) for bodies that could not be resolved."""
+    resolved, errors, seen = [], [], set()
+    for name, target_name, obj_type in bodies:
+        try:
+            target = planets[target_name]
+        except (KeyError, ValueError) as e:
+            errors.append((name, f"not in ephemeris: {e}"))
+            continue
+        if target.target in seen:
+            continue
+        seen.add(target.target)
+        resolved.append((name, obj_type, target))
+    return resolved, errors
+
+def _moon_magnitude(phase_angle_degrees):
+    # Allen's approximation, good to ~0.1 mag away from new Moon
+    a = np.abs(phase_angle_degrees)
+    return -12.73 + 0.026 * a + 4e-9 * a ** 4
+
+def _pluto_magnitude(astrometric):
+    sun_to_observer = astrometric.center_barycentric.xyz.au
+    observer_to_pluto = astrometric.xyz.au
+    r = np.linalg.norm(sun_to_observer + observer_to_pluto, axis=0)
+    delta = np.linalg.norm(observer_to_pluto, axis=0)
+    return PLUTO_ABSOLUTE_MAGNITUDE + 5.0 * np.log10(r * delta)
+
+def compute_bodies(observer, t, planets, bodies=BODIES):
+    """Alt/az, magnitude and phase for every body at time(s) t as seen by observer.
+
+    t may be a single Time or a Time array; per-body values then have shape () or (T,).
+    Returns a dict of lists aligned by body: 'name', 'type', 'target_id', 'altitude',
+    'azimuth', 'magnitude', 'phase_angle' (degrees, Sun-body-observer) and 'illuminated'
+    (fraction 0..1), plus 'apparent' (the Skyfield positions) and 'errors' as (name, message).
+    Magnitude is nan where no formula applies (e.g. Saturn at large phase angles).
+    """
+    resolved, errors = resolve_bodies(planets, bodies)
+    sun = planets['sun']
+    observer_at_t = observer.at(t) # Shared by every body
+    result = {key: [] for key in ('name', 'type', 'target_id', 'altitude', 'azimuth',
+                                  'magnitude', 'phase_angle', 'illuminated', 'apparent')}
+    for name, obj_type, target in resolved:
+        try:
+            astrometric = observer_at_t.observe(target)
+            apparent = astrometric.apparent()
+            alt, az, _ = apparent.altaz()
+            if obj_type == 'Sun':
+                phase_angle = np.zeros_like(alt.degrees)
+                illuminated = np.ones_like(alt.degrees)
+                magnitude = np.full_like(alt.degrees, SUN_MAGNITUDE)
+            else:
+                phase_angle = astrometric.phase_angle(sun).degrees
+                illuminated = astrometric.fraction_illuminated(sun)
+                if obj_type == 'Moon':
+                    magnitude = _moon_magnitude(phase_angle)
+                elif name == 'Pluto':
+                    magnitude = _pluto_magnitude(astrometric)
+                else:
+                    magnitude = planetary_magnitude(astrometric)
+        except Exception as e:
+            errors.append((name, str(e)))
+            continue
+        result['name'].append(name)
+        result['type'].append(obj_type)
+        result['target_id'].append(target.target)
+        result['altitude'].append(alt.degrees)
+        result['azimuth'].append(az.degrees)
+        result['magnitude'].append(magnitude)
+        result['phase_angle'].append(phase_angle)
+        result['illuminated'].append(illuminated)
+        result['apparent'].append(apparent)
+    for name, message in errors:
+        logger.warning("Skipped %s: %s", name, message)
+    result['errors'] = errors
+    return result
+
+def _finite_or_nan(value, digits):
+    value = float(value)
+    return round(value, digits) if np.isfinite(value) else np.nan
+
+def visible_body_state(bodies):
+    """SkyState of the bodies above the horizon in a single-time compute_bodies result."""
+    from constellation_utils import constellation_at
+    from sky_state import SkyState
+    rows = [i for i, altitude in enumerate(bodies['altitude']) if float(altitude) > 0]
+    columns = {
+        'name': [bodies['name'][i] for i in rows],
+        'type': [bodies['type'][i] for i in rows],
+        'altitude': [round(float(bodies['altitude'][i]), 2) for i in rows],
+        'azimuth': [round(float(bodies['azimuth'][i]), 2) for i in rows],
+        'magnitude': [_finite_or_nan(bodies['magnitude'][i], 2) for i in rows],
+        'phase': [_finite_or_nan(bodies['illuminated'][i], 3) for i in rows],
+        'constellation': [constellation_at(bodies['apparent'][i]) for i in rows], # IAU boundaries, so planets get one too
+    }
+    return SkyState(columns, len(rows))
+
+def visible_body_records(bodies):
+    """get_visible_objects-style dicts for the bodies above the horizon in a single-time compute_bodies result."""
+    return visible_body_state(bodies).records()
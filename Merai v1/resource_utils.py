@@ -0,0 +1,139 @@
+# resource_utils.py
+# Process-wide cache for the heavy astronomy resources (timescale, ephemeris, star catalog, star names, satellites).
+# Each resource is loaded the first time it is asked for and then kept in memory,
+# so Streamlit reruns and repeated calls reuse the same objects instead of re-parsing files.
+
+import os
+import threading
+from functools import lru_cache
+
+from skyfield.api import load
+from skyfield.data import hipparcos
+
+# Data files; the MERAI_* variables override them (e.g. to point the benchmarks at bundled fixtures)
+DE421_PATH = os.environ.get("MERAI_DE421_PATH", r"D:\NITM ED\Coding - Python\Final Whatsups\CodingNITSoSe25\Assignment Whats Up\Merai\de421.bsp")
+HIPP_PATH = os.environ.get("MERAI_HIPPARCOS_PATH", r"D:\NITM ED\Coding - Python\Final Whatsups\CodingNITSoSe25\Assignment Whats Up\Merai\hip_main.dat")
+
+# Streamlit runs sessions on separate threads; the lock stops two of them parsing the same file at once
+_load_lock = threading.Lock()
+
+@lru_cache(maxsize=None)
+def _load_timescale():
+    return load.timescale()
+
+@lru_cache(maxsize=None)
+def _load_ephemeris(path):
+    return load(path)
+
+@lru_cache(maxsize=None)
+def _load_hipparcos(path):
+    # Local files are read directly; anything else (e.g. hipparcos.URL) goes through Skyfield's loader
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return hipparcos.load_dataframe(f)
+    with load.open(path) as f:
+        return hipparcos.load_dataframe(f)
+
+@lru_cache(maxsize=None)
+def _load_star_catalog(path, source_path):
+    import catalog_utils
+    if os.path.exists(path):
+        try:
+            return catalog_utils.load_star_catalog(path)
+        except ValueError: # Converted by an older version with fewer columns: convert again
+            if os.path.exists(source_path):
+                catalog_utils.convert_hipparcos(source_path, path)
+                return catalog_utils.load_star_catalog(path)
+    # Not converted yet: build the same array in memory from the text catalog
+    hd_by_hip = catalog_utils.hd_numbers_from_hipparcos(source_path) if os.path.exists(source_path) else None
+    return catalog_utils.catalog_from_dataframe(_load_hipparcos(source_path), hd_by_hip)
+
+def get_timescale():
+    """Returns the shared Skyfield timescale."""
+    with _load_lock:
+        return _load_timescale()
+
+def get_ephemeris(path=DE421_PATH):
+    """Returns the shared ephemeris (DE421 by default), opened once per process."""
+    with _load_lock:
+        return _load_ephemeris(path)
+
+def get_hipparcos(path=HIPP_PATH):
+    """Returns the shared Hipparcos DataFrame. Treat it as read-only: every caller gets the same object."""
+    with _load_lock:
+        return _load_hipparcos(path)
+
+def get_star_catalog(path=None, source_path=HIPP_PATH):
+    """Returns the compact, magnitude-sorted star catalog from catalog_utils.
+    Memory-mapped when the converted .npy exists, otherwise built from source_path."""
+    if path is None:
+        from catalog_utils import CATALOG_PATH
+        path = CATALOG_PATH
+    with _load_lock:
+        return _load_star_catalog(path, source_path)
+
+@lru_cache(maxsize=None)
+def _load_constellation_index(path):
+    from constellation_utils import ConstellationIndex
+    return ConstellationIndex.load(path)
+
+def get_constellation_index(path=None):
+    """Returns the shared ConstellationIndex (stick figures as arrays, cached on disk)."""
+    if path is None:
+        from constellation_utils import CONSTELLATION_FILE_PATH
+        path = CONSTELLATION_FILE_PATH
+    with _load_lock:
+        return _load_constellation_index(path)
+
+@lru_cache(maxsize=None)
+def _load_star_index(path, source_path):
+    from star_index import StarIndex
+    return StarIndex(_load_star_catalog(path, source_path))
+
+def get_star_index(path=None, source_path=HIPP_PATH):
+    """Returns the shared StarIndex over get_star_catalog(path, source_path); its rows index that catalog."""
+    if path is None:
+        from catalog_utils import CATALOG_PATH
+        path = CATALOG_PATH
+    with _load_lock:
+        return _load_star_index(path, source_path)
+
+@lru_cache(maxsize=None)
+def _load_star_names(path):
+    from star_names import StarNames
+    return StarNames.load(path)
+
+def get_star_names(path=None):
+    """Returns the shared StarNames index (proper names, designations, Wikipedia titles)."""
+    if path is None:
+        from star_names import STAR_NAMES_PATH
+        path = STAR_NAMES_PATH
+    with _load_lock:
+        return _load_star_names(path)
+
+@lru_cache(maxsize=4)
+def _load_satellite_catalog(path, modified):
+    from satellite_utils import SatelliteCatalog
+    return SatelliteCatalog.load(path)
+
+def get_satellite_catalog(path=None):
+    """Returns the shared SatelliteCatalog for a TLE/OMM file (satellite_utils.TLE_PATH by default).
+    Element files are replaced often, so a file with a newer modification time is read again."""
+    if path is None:
+        from satellite_utils import TLE_PATH
+        path = TLE_PATH
+    modified = os.path.getmtime(path)
+    with _load_lock:
+        return _load_satellite_catalog(path, modified)
+
+def clear_resources():
+    """Drops every cached resource, e.g. after replacing a data file on disk."""
+    with _load_lock:
+        _load_timescale.cache_clear()
+        _load_ephemeris.cache_clear()
+        _load_hipparcos.cache_clear()
+        _load_star_catalog.cache_clear()
+        _load_star_names.cache_clear()
+        _load_constellation_index.cache_clear()
+        _load_star_index.cache_clear()
+        _load_satellite_catalog.cache_clear()
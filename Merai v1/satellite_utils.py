@@ -0,0 +1,235 @@
+# satellite_utils.py
+# Artificial satellites from a local element file (TLE/3LE text, or OMM as CSV, XML or JSON,
+# e.g. CelesTrak's "active" group), propagated for the whole catalog at once.
+# All element sets go into one sgp4 SatrecArray, so a single call propagates every satellite
+# to every requested time in C. The TEME positions it returns are turned into Earth-fixed
+# coordinates by one rotation (GMST 1982, as SGP4 defines TEME), and into altitude/azimuth
+# with NumPy for the whole (satellites x times) grid; nothing loops over satellites in Python.
+# Sunlit means the line from the satellite to the Sun misses the Earth (the same spherical
+# Earth test as Skyfield's is_sunlit()); a satellite is only seen when sunlit and the sky is dark.
+
+import json
+import logging
+import os
+from datetime import timedelta
+
+import numpy as np
+
+from sky_state import SkyState
+
+logger = logging.getLogger(__name__)
+
+TLE_PATH = os.environ.get("MERAI_TLE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "active.tle"))
+EARTH_RADIUS_KM = 6378.137    # WGS84 equatorial radius, the sphere Skyfield's is_sunlit() uses
+MAX_ELEMENT_AGE_DAYS = 30.0   # SGP4 errors grow quickly away from the epoch; older element sets are dropped
+DARK_SKY_SUN_ALTITUDE = -6.0  # Sun below civil twilight: sunlit satellites stand out against the sky
+
+class SatelliteCatalog:
+    """Names and element sets of a satellite file, with one SatrecArray for all of them."""
+
+    def __init__(self, names, satrecs):
+        from sgp4.api import SatrecArray
+        self.names = np.array(list(names), dtype=object)
+        self.satrecs = list(satrecs)
+        self.norad_ids = np.array([sat.satnum for sat in self.satrecs], dtype=np.int64)
+        self.epochs = np.array([sat.jdsatepoch + sat.jdsatepochF for sat in self.satrecs]) # UTC Julian dates
+        self._array = SatrecArray(self.satrecs) if self.satrecs else None
+
+    @classmethod
+    def load(cls, path=TLE_PATH):
+        """Reads a TLE/3LE file, or an OMM file by extension (.csv, .xml or .json)."""
+        extension = os.path.splitext(path)[1].lower()
+        if extension in ('.csv', '.xml', '.json'):
+            return cls.from_omm(path)
+        with open(path, encoding='utf-8', errors='replace') as f:
+            return cls.from_tle_lines(f)
+
+    @classmethod
+    def from_tle_lines(cls, lines):
+        """Element sets from TLE text; a line before each '1 '/'2 ' pair is taken as the name (3LE)."""
+        from sgp4.api import Satrec
+        names, satrecs = [], []
+        name = line1 = None
+        for line in lines:
+            line = line.rstrip()
+            if line.startswith('1 ') and len(line) >= 69:
+                line1 = line
+            elif line.startswith('2 ') and line1 is not None:
+                try:
+                    sat = Satrec.twoline2rv(line1, line)
+                except ValueError as e:
+                    logger.warning("Skipped element set %s: %s", name or line1[2:7], e)
+                else:
+                    names.append(name or f"NORAD {sat.satnum}")
+                    satrecs.append(sat)
+                name = line1 = None
+            elif line.strip():
+                name = line[2:].strip() if line.startswith('0 ') else line.strip()
+        return cls(names, satrecs)
+
+    @classmethod
+    def from_omm(cls, path):
+        from sgp4 import omm
+        from sgp4.api import Satrec
+        with open(path, encoding='utf-8') as f:
+            extension = os.path.splitext(path)[1].lower()
+            records = json.load(f) if extension == '.json' else list(omm.parse_xml(f) if extension == '.xml' else omm.parse_csv(f))
+        names, satrecs = [], []
+        for fields in records:
+            sat = Satrec()
+            try:
+                omm.initialize(sat, fields)
+            except (KeyError, ValueError) as e:
+                logger.warning("Skipped element set %s: %s", fields.get('OBJECT_NAME'), e)
+                continue
+            names.append(fields.get('OBJECT_NAME') or f"NORAD {sat.satnum}")
+            satrecs.append(sat)
+        return cls(names, satrecs)
+
+    def __len__(self):
+        return len(self.satrecs)
+
+    def propagate(self, t):
+        """TEME positions in km, shape (N, T, 3), and SGP4 error codes (N, T) at Skyfield Time(s) t.
+        Element sets more than MAX_ELEMENT_AGE_DAYS from their epoch get error code -1."""
+        jd = np.atleast_1d(t.whole).astype(float)
+        # SGP4 takes UTC Julian dates (as EarthSatellite does, from TAI less the leap seconds)
+        fraction = np.atleast_1d(t.tai_fraction - t._leap_seconds() / 86400.0).astype(float)
+        if self._array is None:
+            return np.empty((0, len(jd), 3)), np.empty((0, len(jd)), dtype=np.uint8)
+        errors, positions, _ = self._array.sgp4(jd, fraction)
+        errors = errors.astype(np.int16)
+        stale = np.abs((jd + fraction)[None, :] - self.epochs[:, None]) > MAX_ELEMENT_AGE_DAYS
+        errors[stale & (errors == 0)] = -1
+        return positions, errors
+
+def teme_to_itrs(positions, t):
+    """Rotates TEME positions (N, T, 3) into the Earth-fixed frame (polar motion ignored)."""
+    from skyfield.sgp4lib import theta_GMST1982
+    theta, _ = theta_GMST1982(np.atleast_1d(t.whole), np.atleast_1d(t.ut1_fraction))
+    cos_t, sin_t = np.cos(theta), np.sin(theta)
+    x, y, z = positions[..., 0], positions[..., 1], positions[..., 2]
+    return np.stack([cos_t * x + sin_t * y, cos_t * y - sin_t * x, z], axis=-1)
+
+def _observer_frame(lat, lon, elevation_m=0.0):
+    """Earth-fixed position (km) of a WGS84 site and its east, north and up unit vectors."""
+    from skyfield.api import wgs84
+    site = wgs84.latlon(lat, lon, elevation_m)
+    phi, lam = np.radians(lat), np.radians(lon)
+    east = np.array([-np.sin(lam), np.cos(lam), 0.0])
+    north = np.array([-np.sin(phi) * np.cos(lam), -np.sin(phi) * np.sin(lam), np.cos(phi)])
+    up = np.array([np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)])
+    return site.itrs_xyz.km, east, north, up
+
+def _sun_itrs(t, ephemeris):
+    """Earth-fixed geocentric Sun position in km, shape (T, 3)."""
+    from skyfield.framelib import itrs
+    sun = (ephemeris['sun'] - ephemeris['earth']).at(t).frame_xyz(itrs).km
+    return np.atleast_2d(sun.T)
+
+def sunlit(positions, sun):
+    """Whether each Earth-fixed position (N, T, 3) sees the Sun (T, 3) past the Earth's limb."""
+    to_sun = sun[None, :, :] - positions
+    to_sun /= np.linalg.norm(to_sun, axis=-1, keepdims=True)
+    # Closest approach of the satellite-Sun line to the Earth's centre; behind the satellite means clear
+    along = -np.einsum('ntk,ntk->nt', positions, to_sun)
+    closest = positions + along[..., None] * to_sun
+    return (along <= 0) | (np.linalg.norm(closest, axis=-1) > EARTH_RADIUS_KM)
+
+def satellite_positions(catalog, lat, lon, t, ephemeris, elevation_m=0.0):
+    """Topocentric view of every satellite at Skyfield Time(s) t, as arrays of shape (N, T):
+    'altitude', 'azimuth' (degrees), 'range_km', 'sunlit', 'valid' (propagated without error),
+    plus 'sun_altitude' (T,) and 'itrs' (N, T, 3) Earth-fixed positions in km."""
+    teme, errors = catalog.propagate(t)
+    positions = teme_to_itrs(teme, t)
+    site, east, north, up = _observer_frame(lat, lon, elevation_m)
+    offset = positions - site
+    range_km = np.linalg.norm(offset, axis=-1)
+    with np.errstate(invalid='ignore'):
+        altitude = np.degrees(np.arcsin(np.clip((offset @ up) / range_km, -1.0, 1.0)))
+    azimuth = np.degrees(np.arctan2(offset @ east, offset @ north)) % 360.0
+    sun = _sun_itrs(t, ephemeris)
+    sun_offset = sun - site
+    sun_altitude = np.degrees(np.arcsin((sun_offset @ up) / np.linalg.norm(sun_offset, axis=-1)))
+    valid = (errors == 0) & np.isfinite(range_km)
+    return {
+        'altitude': altitude,
+        'azimuth': azimuth,
+        'range_km': range_km,
+        'sunlit': sunlit(positions, sun) & valid,
+        'valid': valid,
+        'sun_altitude': sun_altitude,
+        'itrs': positions,
+    }
+
+def _constellations(offsets, t):
+    """Constellation names for Earth-fixed topocentric offsets (K, 3) at a single Skyfield Time."""
+    from skyfield.framelib import itrs
+    from constellation_utils import constellation_at_radec
+    if not len(offsets):
+        return []
+    gcrs = offsets @ itrs.rotation_at(t) # Row vectors times R is R.T applied: ITRS back to GCRS
+    ra_hours = np.degrees(np.arctan2(gcrs[:, 1], gcrs[:, 0])) % 360.0 / 15.0
+    dec_degrees = np.degrees(np.arcsin(gcrs[:, 2] / np.linalg.norm(gcrs, axis=-1)))
+    return [str(name) for name in np.atleast_1d(constellation_at_radec(ra_hours, dec_degrees))]
+
+def visible_satellite_state(lat, lon, user_dt=None, catalog=None, min_altitude=0.0, sunlit_only=False):
+    """SkyState of the satellites above min_altitude, highest first.
+
+    catalog defaults to the shared one for TLE_PATH (resource_utils.get_satellite_catalog).
+    With sunlit_only, only satellites that can actually be seen are kept: sunlit while the
+    Sun is below DARK_SKY_SUN_ALTITUDE. Magnitude is unknown (element sets carry no size)."""
+    from resource_utils import DE421_PATH, get_ephemeris, get_satellite_catalog, get_timescale
+    ts = get_timescale()
+    t = ts.from_datetime(user_dt) if user_dt else ts.now()
+    if catalog is None:
+        catalog = get_satellite_catalog()
+    view = satellite_positions(catalog, lat, lon, t, get_ephemeris(DE421_PATH))
+    altitude, azimuth, range_km, lit = (view[key][:, 0] for key in ('altitude', 'azimuth', 'range_km', 'sunlit'))
+    keep = view['valid'][:, 0] & (altitude > min_altitude)
+    if sunlit_only:
+        keep &= lit & (view['sun_altitude'][0] < DARK_SKY_SUN_ALTITUDE)
+    rows = np.flatnonzero(keep)
+    rows = rows[np.argsort(-altitude[rows], kind='stable')]
+    site = _observer_frame(lat, lon)[0]
+    return SkyState({
+        'name': catalog.names[rows],
+        'type': np.full(len(rows), 'Satellite', dtype=object),
+        'altitude': np.round(altitude[rows], 2),
+        'azimuth': np.round(azimuth[rows], 2),
+        'constellation': _constellations(view['itrs'][rows, 0] - site, t),
+        'norad_id': catalog.norad_ids[rows],
+        'range_km': np.round(range_km[rows], 1),
+        'sunlit': lit[rows].astype(np.int8),
+    }, len(rows))
+
+def get_visible_satellites(lat, lon, user_dt=None, catalog=None, min_altitude=0.0, sunlit_only=False):
+    """visible_satellite_state() as get_visible_objects-style dicts."""
+    return visible_satellite_state(lat, lon, user_dt, catalog, min_altitude, sunlit_only).records()
+
+def get_satellite_tracks(lat, lon, start, end, step=timedelta(minutes=1), catalog=None, min_altitude=0.0):
+    """Altitude/azimuth tracks like timeseries_utils.get_visibility_tracks, for the satellites
+    above min_altitude at one sample or more. Returns a dict with 'times', 'name', 'type',
+    'norad_id', 'altitude', 'azimuth', 'range_km', 'sunlit' ((N, T) arrays) and 'magnitude' (nan)."""
+    from resource_utils import DE421_PATH, get_ephemeris, get_satellite_catalog, get_timescale
+    from timeseries_utils import time_grid
+    grid = time_grid(start, end, step)
+    times = get_timescale().from_datetimes(grid)
+    if catalog is None:
+        catalog = get_satellite_catalog()
+    view = satellite_positions(catalog, lat, lon, times, get_ephemeris(DE421_PATH))
+    rows = np.flatnonzero((view['valid'] & (view['altitude'] > min_altitude)).any(axis=1))
+    # Samples where propagation failed are set below the horizon, so track consumers skip them
+    altitude = np.where(view['valid'][rows], view['altitude'][rows], -90.0)
+    return {
+        'times': grid,
+        'name': [catalog.names[i] for i in rows],
+        'type': ['Satellite'] * len(rows),
+        'hip_id': [None] * len(rows),
+        'norad_id': [int(catalog.norad_ids[i]) for i in rows],
+        'altitude': altitude,
+        'azimuth': view['azimuth'][rows],
+        'range_km': view['range_km'][rows],
+        'sunlit': view['sunlit'][rows],
+        'magnitude': [np.nan] * len(rows),
+    }
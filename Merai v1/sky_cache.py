@@ -0,0 +1,267 @@
+# sky_cache.py
+# Cache of sky states (sky_state.SkyState) keyed by quantized location and time.
+# Requests are snapped to the centre of their (lat, lon, time) bucket and the result for
+# that centre is computed once, kept in an in-memory LRU and optionally on disk. Disk tiles
+# are .npz files (loaded without pickle) indexed in SQLite; like cache_utils.ThumbnailCache
+# the least recently used are deleted once they add up to more than disk_max_bytes.
+#
+# Accuracy: snapping moves the observer by at most lat_step/2 in latitude and lon_step/2
+# in longitude, and the time by at most time_bucket/2. Each of those rotates the sky by
+# no more than the same angle (time at 15.04 degrees per hour), so every cached position
+# is within accuracy_bound() of the exact one on the sky:
+#   defaults (0.1 degree, 60 s): 0.05 + 0.05 + 0.125 = 0.225 degrees.
+# That bound applies to altitude directly; azimuth is poorly defined near the zenith and
+# can differ more there. Objects within the bound of the horizon may appear or vanish.
+
+import os
+import sqlite3
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import numpy as np
+
+from cache_utils import CACHE_DIR, ensure_cache_dir
+from astro_utils import STAR_MAGNITUDE_LIMIT, compute_sky_state, get_visible_objects
+from sky_state import SkyState
+
+SKY_CACHE_DIR = os.path.join(CACHE_DIR, "sky_tiles")
+SKY_CACHE_MAX_BYTES = 100 * 1024 * 1024 # a tile is ~0.1 MB at the default magnitude limit
+TILE_FORMAT = 3 # Part of the file names on disk; bumped when computed states gain or change columns
+SIDEREAL_DEGREES_PER_SECOND = 360.0 / 86164.0905
+
+def accuracy_bound(lat_step=0.1, lon_step=0.1, time_bucket=60):
+    """Worst-case angular error (degrees) of a cached position versus the exact computation."""
+    return lat_step / 2 + lon_step / 2 + time_bucket / 2 * SIDEREAL_DEGREES_PER_SECOND
+
+def save_tile(f, state):
+    """Writes a state to f as compressed .npz. Object columns (text or None) are stored as a string array
+    plus a '<name>.none' mask, so load_tile never needs pickle."""
+    arrays = {}
+    for name in state.columns:
+        values = state[name]
+        if values.dtype == object:
+            none = np.fromiter((v is None for v in values), bool, len(values))
+            if not all(isinstance(v, str) for v in values[~none]):
+                raise TypeError(f"column {name!r} holds values other than text")
+            arrays[name] = np.array(['' if v is None else v for v in values.tolist()], dtype=str)
+            if none.any():
+                arrays[name + '.none'] = none
+        else:
+            arrays[name] = values
+    np.savez_compressed(f, **arrays)
+
+def load_tile(path):
+    """Frozen state from a file written by save_tile."""
+    with np.load(path, allow_pickle=False) as tile:
+        names = [name for name in tile.files if not name.endswith('.none')]
+        columns = {}
+        for name in names:
+            values = tile[name]
+            if values.dtype.kind == 'U':
+                column = values.astype(object)
+                if name + '.none' in tile.files:
+                    column[tile[name + '.none']] = None
+                values = column
+            columns[name] = values
+    return SkyState(columns, len(columns[names[0]]) if names else 0).freeze()
+
+class SkyStateCache:
+    """LRU (plus optional disk tier) of compute_sky_state results per quantized bucket."""
+
+    def __init__(self, max_entries=512, lat_step=0.1, lon_step=0.1, time_bucket=60, disk_dir=None,
+                 disk_max_bytes=SKY_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.lat_step = lat_step
+        self.lon_step = lon_step
+        self.time_bucket = time_bucket # seconds
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._index = None
+        if disk_dir:
+            ensure_cache_dir(disk_dir)
+            for file_name in os.listdir(disk_dir):
+                if file_name.endswith('.pkl'): # Pickled tiles of older versions, never read again
+                    try:
+                        os.remove(os.path.join(disk_dir, file_name))
+                    except OSError:
+                        pass
+            self._index = sqlite3.connect(os.path.join(disk_dir, "index.sqlite"), check_same_thread=False)
+            self._index.execute("PRAGMA journal_mode=WAL")
+            self._index.execute(
+                "CREATE TABLE IF NOT EXISTS tiles ("
+                " name TEXT PRIMARY KEY,"
+                " bytes INTEGER NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            self._index.execute("CREATE INDEX IF NOT EXISTS tiles_accessed ON tiles (accessed_at)")
+            self._index.commit()
+
+    @property
+    def accuracy_bound(self):
+        return accuracy_bound(self.lat_step, self.lon_step, self.time_bucket)
+
+    def bucket(self, lat, lon, user_dt=None, mag_limit=STAR_MAGNITUDE_LIMIT):
+        """Key for the bucket containing (lat, lon, time)."""
+        if user_dt is None:
+            user_dt = datetime.now(timezone.utc)
+        return (
+            int(np.floor(lat / self.lat_step)),
+            int(np.floor(((lon + 180.0) % 360.0) / self.lon_step)),
+            int(np.floor(user_dt.timestamp() / self.time_bucket)),
+            float(mag_limit),
+        )
+
+    def bucket_center(self, key):
+        """(lat, lon, datetime) at the centre of a bucket; the point actually computed."""
+        lat_i, lon_i, time_i, _ = key
+        lat = min(max((lat_i + 0.5) * self.lat_step, -90.0), 90.0)
+        lon = (lon_i + 0.5) * self.lon_step - 180.0
+        dt = datetime.fromtimestamp((time_i + 0.5) * self.time_bucket, tz=timezone.utc)
+        return lat, lon, dt
+
+    def _tile_name(self, key):
+        lat_i, lon_i, time_i, mag_limit = key
+        return f"{lat_i}_{lon_i}_{time_i}_{mag_limit:g}.v{TILE_FORMAT}.npz"
+
+    def _read_tile(self, key):
+        """State from the disk tier, or None. Tiles missing from the index are not read."""
+        name = self._tile_name(key)
+        with self._lock:
+            if self._index.execute("SELECT 1 FROM tiles WHERE name = ?", (name,)).fetchone() is None:
+                return None
+        try:
+            state = load_tile(os.path.join(self.disk_dir, name))
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile): # Deleted behind our back or damaged
+            with self._lock:
+                self._index.execute("DELETE FROM tiles WHERE name = ?", (name,))
+                self._index.commit()
+            return None
+        with self._lock:
+            self._index.execute("UPDATE tiles SET accessed_at = ? WHERE name = ?", (time.time(), name))
+            self._index.commit()
+        return state
+
+    def _write_tile(self, key, state):
+        name = self._tile_name(key)
+        path = os.path.join(self.disk_dir, name)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                save_tile(f, state)
+            os.replace(tmp_path, path) # Readers never see a half-written file
+            size = os.path.getsize(path)
+        except (OSError, TypeError):
+            return
+        with self._lock:
+            self._index.execute("INSERT OR REPLACE INTO tiles (name, bytes, accessed_at) VALUES (?, ?, ?)",
+                                (name, size, time.time()))
+            self._evict_tiles()
+            self._index.commit()
+
+    def _evict_tiles(self):
+        total = self._index.execute("SELECT COALESCE(SUM(bytes), 0) FROM tiles").fetchone()[0]
+        if total <= self.disk_max_bytes:
+            return
+        # Oldest first until 10% under the limit, so eviction doesn't run again on the next write
+        target = total - self.disk_max_bytes * 0.9
+        freed = 0
+        for name, size in self._index.execute("SELECT name, bytes FROM tiles ORDER BY accessed_at ASC").fetchall():
+            if freed >= target:
+                break
+            try:
+                os.remove(os.path.join(self.disk_dir, name))
+            except OSError:
+                pass
+            self._index.execute("DELETE FROM tiles WHERE name = ?", (name,))
+            freed += size
+
+    def get_sky_state(self, lat, lon, user_dt=None, mag_limit=STAR_MAGNITUDE_LIMIT):
+        """Same contract as astro_utils.compute_sky_state, served from the bucket cache.
+        The cached state itself is returned: it is frozen, so add columns with with_columns()."""
+        key = self.bucket(lat, lon, user_dt, mag_limit)
+        with self._lock:
+            state = self._entries.get(key)
+            if state is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if state is None and self.disk_dir:
+            state = self._read_tile(key)
+            if state is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self._store(key, state)
+        if state is None:
+            center_lat, center_lon, center_dt = self.bucket_center(key)
+            state = compute_sky_state(center_lat, center_lon, center_dt, mag_limit=mag_limit)
+            with self._lock:
+                self.misses += 1
+            self._store(key, state)
+            if self.disk_dir:
+                self._write_tile(key, state)
+        return state
+
+    def get_visible_objects(self, lat, lon, user_dt=None, mag_limit=STAR_MAGNITUDE_LIMIT):
+        """Same contract as astro_utils.get_visible_objects: fresh dicts from the cached state."""
+        return self.get_sky_state(lat, lon, user_dt, mag_limit).records()
+
+    def _store(self, key, objects):
+        with self._lock:
+            self._entries[key] = objects
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'accuracy_bound_degrees': round(self.accuracy_bound, 4),
+            }
+            if self._index is not None:
+                stats['disk_tiles'], stats['disk_bytes'] = self._index.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM tiles").fetchone()
+            return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+def measure_cache_error(cache, lat, lon, user_dt, mag_limit=STAR_MAGNITUDE_LIMIT):
+    """Largest altitude difference (degrees) between the cached and the exact result for the
+    objects present in both. Use it to check a configuration against cache.accuracy_bound."""
+    exact = {(o['name'], o['type']): o for o in get_visible_objects(lat, lon, user_dt, mag_limit=mag_limit)}
+    worst = 0.0
+    for obj in cache.get_visible_objects(lat, lon, user_dt, mag_limit):
+        match = exact.get((obj['name'], obj['type']))
+        if match is not None:
+            worst = max(worst, abs(obj['altitude'] - match['altitude']))
+    return worst
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_sky_cache():
+    """Process-wide cache with the default buckets and a disk tier under CACHE_DIR."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = SkyStateCache(disk_dir=SKY_CACHE_DIR)
+        return _default_cache
+
+def cached_sky_state(lat, lon, user_dt=None, mag_limit=STAR_MAGNITUDE_LIMIT):
+    return get_sky_cache().get_sky_state(lat, lon, user_dt, mag_limit)
+
+def cached_visible_objects(lat, lon, user_dt=None, mag_limit=STAR_MAGNITUDE_LIMIT):
+    return get_sky_cache().get_visible_objects(lat, lon, user_dt, mag_limit)
@@ -0,0 +1,197 @@
+# sky_state.py
+# Columnar container for what is in the sky: one NumPy array per field (name, type, HIP,
+# altitude, azimuth, magnitude, constellation, ...) instead of one dict per object.
+# Computation fills whole columns at once; caches keep a state and hand out the same arrays
+# (freeze() makes them read-only, so sharing is safe); enrichment adds columns next to the
+# existing ones with with_columns(); display and export read the columns straight into a
+# DataFrame, an Arrow table or row tuples. records() still gives get_visible_objects-style dicts.
+
+import numpy as np
+
+# Column -> (dtype, missing value). Columns not listed here are object columns with None.
+COLUMNS = {
+    'name': (object, None),
+    'type': (object, None),
+    'altitude': (float, np.nan),
+    'azimuth': (float, np.nan),
+    'magnitude': (float, np.nan),
+    'constellation': (object, None),
+    'hip': (np.int64, -1),        # Hipparcos number, stars only
+    'hd': (np.int64, -1),         # Henry Draper number, stars that have one in hip_main.dat
+    'phase': (float, np.nan),     # illuminated fraction, Sun, Moon and planets
+    'norad_id': (np.int64, -1),   # satellites only
+    'range_km': (float, np.nan),
+    'sunlit': (np.int8, -1),      # satellites: 1 sunlit, 0 in the Earth's shadow
+}
+# Always in records(); other columns only where they hold a value
+CORE_COLUMNS = ('name', 'type', 'altitude', 'azimuth', 'magnitude', 'constellation')
+
+def column_spec(name):
+    return COLUMNS.get(name, (object, None))
+
+def _is_missing(values, missing):
+    """Boolean mask of the rows of a column that hold its missing value."""
+    if missing is None:
+        return np.fromiter((v is None for v in values), bool, len(values))
+    if isinstance(missing, float) and np.isnan(missing):
+        return np.isnan(values)
+    return values == missing
+
+class SkyState:
+    """Equal-length named columns, one row per object.
+
+    state['altitude'] is a column; state[rows] (a slice, index array or boolean mask) is a new
+    SkyState with those rows. The core columns are always present, filled with missing values
+    when not given.
+    """
+
+    def __init__(self, columns=None, length=None):
+        columns = dict(columns or {})
+        if length is None:
+            length = len(next(iter(columns.values()))) if columns else 0
+        self._columns = {}
+        for name in CORE_COLUMNS:
+            columns.setdefault(name, None)
+        for name, values in columns.items():
+            dtype, missing = column_spec(name)
+            if values is None:
+                array = np.full(length, missing, dtype=dtype)
+            elif isinstance(values, np.ndarray) and values.dtype == np.dtype(dtype):
+                array = values # Kept as is: no copy
+            elif dtype is object:
+                array = np.empty(length, dtype=object)
+                array[:] = list(values) if not isinstance(values, np.ndarray) else values
+            else:
+                array = np.asarray(values, dtype=dtype)
+            if len(array) != length:
+                raise ValueError(f"column {name!r} has {len(array)} rows, expected {length}")
+            self._columns[name] = array
+        self._length = length
+
+    @classmethod
+    def empty(cls):
+        return cls(length=0)
+
+    @classmethod
+    def concat(cls, states):
+        """Rows of several states in order; columns missing from some are filled with missing values."""
+        states = [state for state in states if state is not None]
+        names = list(dict.fromkeys(name for state in states for name in state.columns))
+        columns = {}
+        for name in names:
+            dtype, missing = column_spec(name)
+            parts = [state._columns[name] if name in state else np.full(len(state), missing, dtype=dtype) for state in states]
+            columns[name] = np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+        return cls(columns, sum(len(state) for state in states))
+
+    def __len__(self):
+        return self._length
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    @property
+    def columns(self):
+        return tuple(self._columns)
+
+    def get(self, name):
+        """A column, or one of missing values when the state does not have it."""
+        if name in self._columns:
+            return self._columns[name]
+        dtype, missing = column_spec(name)
+        return np.full(self._length, missing, dtype=dtype)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._columns[key]
+        return self.take(key)
+
+    def take(self, rows):
+        """New state with the given rows (slices give views, index arrays and masks copies)."""
+        columns = {name: values[rows] for name, values in self._columns.items()}
+        length = len(next(iter(columns.values()))) if columns else 0
+        return SkyState(columns, length)
+
+    def with_columns(self, **columns):
+        """New state sharing every existing column with these added or replaced."""
+        return SkyState({**self._columns, **columns}, self._length)
+
+    def freeze(self):
+        """Makes every column read-only, so the state can be shared without copies; returns self."""
+        for values in self._columns.values():
+            values.flags.writeable = False
+        return self
+
+    def hip_ids(self):
+        """'HIP n' per row, None where there is no HIP number."""
+        hip = self._columns.get('hip')
+        result = np.full(self._length, None, dtype=object)
+        if hip is not None:
+            rows = np.flatnonzero(hip >= 0)
+            result[rows] = [f"HIP {h}" for h in hip[rows].tolist()]
+        return result
+
+    def records(self):
+        """get_visible_objects-style dicts: the core columns always, 'hip_id'/'hip_int' for stars,
+        and other columns only where they hold a value. Unknown magnitudes are None."""
+        optional = []
+        for name in self._columns:
+            if name in CORE_COLUMNS:
+                continue
+            values = self._columns[name]
+            present = ~_is_missing(values, column_spec(name)[1])
+            optional.append((name, values.tolist(), present.tolist()))
+        core = [self._columns[name].tolist() for name in CORE_COLUMNS]
+        records = []
+        for i, (name, obj_type, altitude, azimuth, magnitude, constellation) in enumerate(zip(*core)):
+            record = {
+                'name': name,
+                'type': obj_type,
+                'altitude': altitude,
+                'azimuth': azimuth,
+                'magnitude': None if magnitude != magnitude else magnitude, # nan -> None
+                'constellation': constellation,
+            }
+            for column, values, present in optional:
+                if not present[i]:
+                    continue
+                if column == 'hip':
+                    record['hip_id'], record['hip_int'] = f"HIP {values[i]}", values[i]
+                elif column == 'sunlit':
+                    record['sunlit'] = bool(values[i])
+                else:
+                    record[column] = values[i]
+            records.append(record)
+        return records
+
+    def _export_columns(self, columns):
+        columns = columns or [name for name in self._columns if name != 'hip'] + ['hip_id']
+        return {name: self.hip_ids() if name == 'hip_id' and 'hip_id' not in self else self._columns[name] for name in columns}
+
+    def tuples(self, columns=None):
+        """One tuple of the given columns per row, missing values as None: for row writers (csv, json)."""
+        lists = []
+        for name, values in self._export_columns(columns).items():
+            column = values.tolist()
+            missing = column_spec(name)[1]
+            if missing is not None:
+                for i in np.flatnonzero(_is_missing(values, missing)).tolist():
+                    column[i] = None
+            lists.append(column)
+        return list(zip(*lists))
+
+    def to_pandas(self, columns=None):
+        """DataFrame of the given columns (default: all, with 'hip_id' for 'hip'), built from the arrays.
+        Missing values stay as stored (None, nan, -1)."""
+        import pandas as pd
+        return pd.DataFrame(self._export_columns(columns), copy=False)
+
+    def to_arrow(self, columns=None):
+        """pyarrow Table of the given columns; missing values become nulls."""
+        import pyarrow as pa
+        arrays = {}
+        for name, values in self._export_columns(columns).items():
+            missing = column_spec(name)[1]
+            mask = _is_missing(values, missing) if missing is not None else None
+            arrays[name] = pa.array(values, mask=mask, from_pandas=values.dtype == object)
+        return pa.table(arrays)
@@ -0,0 +1,156 @@
+# star_index.py
+# Spatial index over the star catalog for horizon, cone and field-of-view queries.
+# GridIndex works on any RA/Dec (or longitude/latitude) points; StarIndex adds the catalog specifics.
+# The sky is cut into declination bands of band_degrees, each split into RA cells of about
+# the same width on the sky (fewer cells towards the poles), so cells have roughly equal area.
+# Stars are stored sorted by (cell, magnitude) with CSR-style offsets, which makes both
+# "the stars in these cells" and "... brighter than m" contiguous slices.
+#
+# A cone query first keeps the cells whose centre lies within radius + cell radius of the
+# cone axis (one dot product per cell), then tests only the stars in those cells. Work is
+# proportional to the stars near the answer, not to the catalog size.
+#
+# Positions are the catalog's (ICRS, epoch J1991.25). Apparent places differ by proper motion
+# since the epoch and by aberration, so horizon_margin() widens a query enough for the
+# result to be a superset of what the exact computation will keep.
+
+import numpy as np
+
+ABERRATION_DEGREES = 20.5 / 3600.0 # Annual aberration, the largest of the small apparent-place terms
+DAYS_PER_YEAR = 365.25
+MAGNITUDE_OFFSET = 100.0
+
+def radec_to_vectors(ra_hours, dec_degrees):
+    """Unit vectors (..., 3) for RA/Dec; inputs broadcast."""
+    ra = np.radians(np.asarray(ra_hours, dtype=float) * 15.0)
+    dec = np.radians(np.asarray(dec_degrees, dtype=float))
+    cos_dec = np.cos(dec)
+    return np.stack([cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)], axis=-1)
+
+def zenith_vector(t, lat_degrees, lon_degrees):
+    """ICRS unit vector of the observer's zenith at Skyfield Time t (geodetic latitude, as altaz() uses)."""
+    zenith_of_date = radec_to_vectors(t.gast + lon_degrees / 15.0, lat_degrees)
+    return zenith_of_date @ t.M # t.M rotates ICRS into the equator of date; its transpose undoes it
+
+class GridIndex:
+    """Grid index over points on the sphere; queries return row numbers into the input arrays.
+    Points are ordered by magnitude within a cell (lower first), so a magnitude cut is cheap."""
+
+    def __init__(self, ra_hours, dec_degrees, magnitude=None, band_degrees=2.0):
+        self.band_degrees = band_degrees
+        ra_hours = np.asarray(ra_hours, dtype=float)
+        dec = np.asarray(dec_degrees, dtype=float)
+        magnitude = np.zeros(len(dec)) if magnitude is None else np.asarray(magnitude, dtype=float)
+
+        band_count = int(np.ceil(180.0 / band_degrees))
+        band_edges = np.linspace(-90.0, 90.0, band_count + 1)
+        band_centres = (band_edges[:-1] + band_edges[1:]) / 2
+        self.cells_per_band = np.maximum(1, np.ceil(360.0 * np.cos(np.radians(band_centres)) / band_degrees)).astype(np.int64)
+        self.band_start = np.concatenate([[0], np.cumsum(self.cells_per_band)])
+        cell_count = int(self.band_start[-1])
+
+        band = np.clip(((dec + 90.0) / band_degrees).astype(np.int64), 0, band_count - 1)
+        ra_fraction = (ra_hours % 24.0) / 24.0
+        cell = self.band_start[band] + np.minimum((ra_fraction * self.cells_per_band[band]).astype(np.int64),
+                                                  self.cells_per_band[band] - 1)
+        # Sorted by cell, then magnitude; the key makes "cell c, brighter than m" one searchsorted
+        self.rows = np.lexsort((magnitude, cell))
+        self.cell_offsets = np.concatenate([[0], np.cumsum(np.bincount(cell, minlength=cell_count))])
+        # (cell, magnitude) folded into one increasing float; magnitudes span well under 1000
+        self._keys = cell[self.rows] * 1000.0 + np.clip(np.nan_to_num(magnitude[self.rows], nan=99.0) + MAGNITUDE_OFFSET, 0.0, 999.0)
+        self.vectors = radec_to_vectors(ra_hours[self.rows], dec[self.rows])
+
+        # Cell centres and radii (largest angle from the centre to the cell boundary, sampled)
+        cell_band = np.repeat(np.arange(band_count), self.cells_per_band)
+        cell_in_band = np.arange(cell_count) - self.band_start[cell_band]
+        width = 24.0 / self.cells_per_band[cell_band]
+        ra_lo, dec_lo = cell_in_band * width, band_edges[cell_band]
+        self.cell_vectors = radec_to_vectors(ra_lo + width / 2, dec_lo + band_degrees / 2)
+        steps = np.linspace(0.0, 1.0, 17)
+        edge_ra = np.concatenate([ra_lo[:, None] + width[:, None] * steps, ra_lo[:, None] + width[:, None] * steps,
+                                  np.repeat(ra_lo[:, None], 17, axis=1), np.repeat((ra_lo + width)[:, None], 17, axis=1)], axis=1)
+        edge_dec = np.concatenate([np.repeat(dec_lo[:, None], 17, axis=1), np.repeat((dec_lo + band_degrees)[:, None], 17, axis=1),
+                                   dec_lo[:, None] + band_degrees * steps, dec_lo[:, None] + band_degrees * steps], axis=1)
+        cos_angle = np.einsum('ckx,cx->ck', radec_to_vectors(edge_ra, edge_dec), self.cell_vectors)
+        # Padded by half a band for the boundary between samples
+        self.cell_radius = np.degrees(np.arccos(np.clip(cos_angle.min(axis=1), -1.0, 1.0))) + band_degrees / 2
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def cell_count(self):
+        return len(self.cell_offsets) - 1
+
+    def _cone_positions(self, vector, radius_degrees, mag_limit=None):
+        """Positions in sorted order (indices into self.rows / self.vectors) of the cone's points."""
+        if radius_degrees >= 180.0:
+            cells = np.arange(self.cell_count)
+        else:
+            angle = np.degrees(np.arccos(np.clip(self.cell_vectors @ vector, -1.0, 1.0)))
+            cells = np.flatnonzero(angle <= radius_degrees + self.cell_radius)
+        starts = self.cell_offsets[cells]
+        if mag_limit is None:
+            ends = self.cell_offsets[cells + 1]
+        else:
+            # Within a cell points are sorted by magnitude, so the bright ones form a prefix
+            ends = np.searchsorted(self._keys, cells * 1000.0 + mag_limit + MAGNITUDE_OFFSET, side='left')
+        positions = _concat_ranges(starts, ends)
+        if radius_degrees < 180.0 and len(positions):
+            positions = positions[self.vectors[positions] @ vector >= np.cos(np.radians(radius_degrees))]
+        return positions
+
+    def cone(self, vector, radius_degrees, mag_limit=None):
+        """Rows within radius_degrees of the unit vector with magnitude < mag_limit (all when None),
+        in ascending row order, i.e. brightest first for a magnitude-sorted catalog."""
+        positions = self._cone_positions(np.asarray(vector, dtype=float), radius_degrees, mag_limit)
+        return np.sort(self.rows[positions])
+
+    def cone_radec(self, ra_hours, dec_degrees, radius_degrees, mag_limit=None):
+        """Rows within radius_degrees of an RA/Dec (a circular field of view)."""
+        return self.cone(radec_to_vectors(ra_hours, dec_degrees), radius_degrees, mag_limit)
+
+    def nearest(self, vector, max_degrees=180.0):
+        """(row, angle in degrees) of the point closest to the unit vector, or (None, None) if
+        nothing lies within max_degrees. Cones grow from one band, so dense areas answer at once."""
+        vector = np.asarray(vector, dtype=float)
+        radius = min(self.band_degrees, max_degrees)
+        while True:
+            positions = self._cone_positions(vector, radius)
+            if len(positions):
+                cos_angle = self.vectors[positions] @ vector
+                best = int(np.argmax(cos_angle))
+                return int(self.rows[positions[best]]), float(np.degrees(np.arccos(min(cos_angle[best], 1.0))))
+            if radius >= max_degrees:
+                return None, None
+            radius = min(radius * 4, max_degrees)
+
+class StarIndex(GridIndex):
+    """GridIndex over a catalog_utils star catalog; rows index that catalog."""
+
+    def __init__(self, catalog, band_degrees=2.0):
+        super().__init__(catalog['ra_hours'], catalog['dec_degrees'], catalog['magnitude'], band_degrees)
+        pm = np.hypot(np.nan_to_num(np.asarray(catalog['ra_mas_per_year'], dtype=float)),
+                      np.nan_to_num(np.asarray(catalog['dec_mas_per_year'], dtype=float)))
+        self.max_proper_motion = float(pm.max()) / 3.6e6 if len(pm) else 0.0 # degrees per year
+
+    def horizon_margin(self, t):
+        """Degrees by which catalog positions can differ from apparent places at Skyfield Time t."""
+        from catalog_utils import HIPPARCOS_EPOCH # Deferred: catalog_utils pulls in Skyfield
+        years = abs(t.tt - HIPPARCOS_EPOCH) / DAYS_PER_YEAR
+        return ABERRATION_DEGREES + self.max_proper_motion * years + 1e-3
+
+    def above_horizon(self, t, lat_degrees, lon_degrees, mag_limit=None, min_altitude=0.0):
+        """Rows that can be above min_altitude at Skyfield Time t: a superset of the exact answer,
+        widened by horizon_margin(t). Filter on the computed altitude afterwards."""
+        radius = 90.0 - min_altitude + self.horizon_margin(t)
+        return self.cone(zenith_vector(t, lat_degrees, lon_degrees), radius, mag_limit)
+
+def _concat_ranges(starts, ends):
+    """np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)]) without the Python loop."""
+    counts = np.maximum(ends - starts, 0)
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts)
+    return offsets + np.arange(total)
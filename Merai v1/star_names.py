@@ -0,0 +1,79 @@
+# star_names.py
+# Offline cross-identification index for stars: HIP number -> IAU proper name, Bayer and
+# Flamsteed designations and Wikipedia title. The table is bundled as star_names.csv.gz
+# (IAU WGSN names and designations of 3357 stars, from starplot's star_designations table, MIT)
+# and held as NumPy columns sorted by HIP, so names for a whole array of stars are one
+# searchsorted instead of a Wikipedia request (and a regex over its text) per star.
+# HD numbers come from hip_main.dat itself (catalog_utils reads them into the star catalog).
+
+import csv
+import gzip
+import os
+
+import numpy as np
+
+STAR_NAMES_PATH = os.environ.get("MERAI_STAR_NAMES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "star_names.csv.gz"))
+
+NAME_FIELDS = ('proper', 'bayer', 'flamsteed', 'wiki_title')
+
+class StarNames:
+    """Name columns for the stars in the index, one row per HIP number.
+
+    proper is the IAU proper name ("Vega"), bayer and flamsteed are short designations
+    ("α Lyr", "3 Lyr") and wiki_title the Wikipedia title of the star ("Alpha Lyrae";
+    Wikipedia redirects designations to the star's article).
+    Text columns are object arrays with None where the star has no such name.
+    """
+
+    def __init__(self, hip, proper, bayer, flamsteed, wiki_title):
+        hip = np.asarray(hip, dtype=np.int64)
+        order = np.argsort(hip, kind='stable')
+        self.hip = hip[order]
+        for field, values in zip(NAME_FIELDS, (proper, bayer, flamsteed, wiki_title)):
+            column = np.empty(len(hip), dtype=object)
+            column[:] = [value or None for value in values]
+            setattr(self, field, column[order])
+
+    @classmethod
+    def load(cls, path=STAR_NAMES_PATH):
+        """Reads the gzipped CSV (hip, proper, bayer, flamsteed, wiki_title)."""
+        with gzip.open(path, 'rt', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            next(reader) # header
+            hip, proper, bayer, flamsteed, wiki_title = zip(*reader)
+        return cls(list(map(int, hip)), proper, bayer, flamsteed, wiki_title)
+
+    def __len__(self):
+        return len(self.hip)
+
+    def rows(self, hips):
+        """Index row of each HIP number, -1 for stars that are not in the index."""
+        hips = np.asarray(hips, dtype=np.int64)
+        if not len(self.hip):
+            return np.full(hips.shape, -1, dtype=np.int64)
+        rows = np.minimum(np.searchsorted(self.hip, hips), len(self.hip) - 1)
+        return np.where(self.hip[rows] == hips, rows, -1)
+
+    def lookup(self, hips):
+        """{'proper', 'bayer', 'flamsteed', 'wiki_title'} columns for an array of HIP numbers,
+        with None for stars the index does not name."""
+        rows = self.rows(hips)
+        found = rows >= 0
+        columns = {}
+        for field in NAME_FIELDS:
+            column = np.full(len(rows), None, dtype=object)
+            column[found] = getattr(self, field)[rows[found]]
+            columns[field] = column
+        return columns
+
+    def get(self, hip):
+        """The names of one star as a dict, or None if the index does not have it."""
+        row = int(self.rows([hip])[0])
+        if row < 0:
+            return None
+        return {field: getattr(self, field)[row] for field in NAME_FIELDS}
+
+    def designations(self, hips):
+        """Bayer designation per HIP number, else Flamsteed, else None."""
+        columns = self.lookup(hips)
+        return np.where(columns['bayer'].astype(bool), columns['bayer'], columns['flamsteed'])
@@ -0,0 +1,75 @@
+# test_sky_cache.py
+# Checks the bucketed sky cache against the exact computation and its disk tier.
+# Needs the DE421 ephemeris and the Hipparcos catalogue (MERAI_DE421_PATH and
+# MERAI_HIPPARCOS_PATH, or the usual download); run with: python -m pytest test_sky_cache.py
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from astro_utils import compute_sky_state
+from sky_cache import SkyStateCache, load_tile, save_tile
+
+MAG_LIMIT = 4.0
+SITES = [(28.61, 77.21), (51.48, -0.01), (-33.87, 151.21), (64.13, -21.9), (0.04, -78.45)]
+START = datetime(2025, 6, 14, 18, 7, 41, tzinfo=timezone.utc)
+
+def _altitude_error(cached, exact):
+    """Largest altitude difference of the objects present in both states."""
+    cached_rows = {key: i for i, key in enumerate(zip(cached['name'].tolist(), cached['type'].tolist()))}
+    worst = 0.0
+    for j, key in enumerate(zip(exact['name'].tolist(), exact['type'].tolist())):
+        i = cached_rows.get(key)
+        if i is not None:
+            worst = max(worst, abs(cached['altitude'][i] - exact['altitude'][j]))
+    return worst
+
+@pytest.mark.parametrize("lat_step,lon_step,time_bucket", [(0.1, 0.1, 60), (0.5, 0.5, 300)])
+def test_cached_state_within_accuracy_bound(lat_step, lon_step, time_bucket):
+    cache = SkyStateCache(lat_step=lat_step, lon_step=lon_step, time_bucket=time_bucket)
+    for k, (lat, lon) in enumerate(SITES):
+        # Off-centre points, so the cached bucket centre really differs from the request
+        lat, lon = lat + 0.37 * lat_step, lon - 0.41 * lon_step
+        user_dt = START + timedelta(minutes=97 * k, seconds=0.29 * time_bucket)
+        cached = cache.get_sky_state(lat, lon, user_dt, MAG_LIMIT)
+        exact = compute_sky_state(lat, lon, user_dt, mag_limit=MAG_LIMIT)
+        assert len(cached) > 0
+        assert _altitude_error(cached, exact) <= cache.accuracy_bound
+
+def test_disk_tier_round_trip(tmp_path):
+    cache = SkyStateCache(disk_dir=str(tmp_path))
+    state = cache.get_sky_state(*SITES[0], START, MAG_LIMIT)
+    reloaded = SkyStateCache(disk_dir=str(tmp_path)).get_sky_state(*SITES[0], START, MAG_LIMIT)
+    assert reloaded.columns == state.columns
+    for name in state.columns:
+        assert reloaded[name].dtype == state[name].dtype
+        if state[name].dtype == object:
+            assert reloaded[name].tolist() == state[name].tolist() # None kept apart from ''
+        else:
+            np.testing.assert_array_equal(reloaded[name], state[name])
+
+def test_tiles_load_without_pickle(tmp_path):
+    state = compute_sky_state(*SITES[1], START, mag_limit=MAG_LIMIT)
+    path = tmp_path / "tile.npz"
+    with open(path, 'wb') as f:
+        save_tile(f, state)
+    assert load_tile(str(path))['name'].tolist() == state['name'].tolist()
+    with np.load(path, allow_pickle=False) as tile:
+        assert all(tile[name].dtype != object for name in tile.files)
+
+def test_disk_tier_is_size_capped(tmp_path):
+    probe = SkyStateCache(disk_dir=str(tmp_path / "probe"))
+    probe.get_sky_state(*SITES[0], START, MAG_LIMIT)
+    tile_bytes = probe.stats()['disk_bytes']
+    cache = SkyStateCache(disk_dir=str(tmp_path / "capped"), disk_max_bytes=int(tile_bytes * 3.5))
+    for k in range(8):
+        cache.get_sky_state(*SITES[0], START + timedelta(minutes=5 * k), MAG_LIMIT)
+    stats = cache.stats()
+    assert stats['disk_bytes'] <= cache.disk_max_bytes
+    assert 0 < stats['disk_tiles'] < 8
+    assert len(list((tmp_path / "capped").glob("*.npz"))) == stats['disk_tiles']
+    # The most recent tile survives eviction and is served from disk by a fresh cache
+    fresh = SkyStateCache(disk_dir=str(tmp_path / "capped"))
+    fresh.get_sky_state(*SITES[0], START + timedelta(minutes=35), MAG_LIMIT)
+    assert fresh.stats()['disk_hits'] == 1
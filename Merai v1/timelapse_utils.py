@@ -0,0 +1,287 @@
+# timelapse_utils.py
+# Time-lapse sky charts: a night of frames as an animated GIF, an MP4 or a folder of PNGs.
+#
+#   python timelapse_utils.py --lat 28.61 --lon 77.21 --start 2025-06-14T14:30 --end 2025-06-14T23:30 -o night.gif
+#
+# Positions for every frame come from one get_visibility_tracks call (all objects x all
+# times in NumPy). Rendering never rebuilds a figure: each worker process draws one chart,
+# caches its static parts (axes, grid, ticks, legend) as a bitmap, and per frame only moves
+# the existing artists (scatter offsets, line segments, label positions) and blits them
+# onto that background. Frames are split into contiguous chunks over a process pool and
+# come back in order, already encoded for the writer (palette images for GIF, raw RGB for
+# MP4, PNG bytes for an image sequence), so writers can stream them.
+
+import argparse
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from io import BytesIO
+
+import numpy as np
+
+FRAME_CHUNK = 20 # frames per pool task
+DEFAULT_MAG_LIMIT = 4.5
+
+def compute_frames(lat, lon, start, end, step=timedelta(minutes=2), mag_limit=DEFAULT_MAG_LIMIT):
+    """Chart input for every frame from one vectorized track computation.
+
+    Returns a dict with 'times' (T datetimes), per-object 'name', 'type', 'hip' (-1 for bodies)
+    and 'magnitude' (N,), and 'theta' (azimuth, radians) / 'r' (90 - altitude) of shape (N, T).
+    """
+    from timeseries_utils import get_visibility_tracks
+    from chart_utils import hip_number
+    tracks = get_visibility_tracks(lat, lon, start, end, step=step, mag_limit=mag_limit, include_events=False)
+    mid = len(tracks['times']) // 2
+    # Bodies have per-time magnitudes; the value at mid-night is plenty for marker sizes
+    magnitude = np.array([np.ravel(m)[mid] if np.size(m) > 1 else np.ravel(m)[0] for m in tracks['magnitude']], dtype=float)
+    return {
+        'times': tracks['times'],
+        'name': list(tracks['name']),
+        'type': np.array(tracks['type'], dtype=object),
+        'hip': np.array([hip_number({'hip_id': h}) or -1 for h in tracks['hip_id']], dtype=np.int64),
+        'magnitude': magnitude,
+        'theta': np.radians(tracks['azimuth']),
+        'r': 90.0 - tracks['altitude'],
+    }
+
+class TimelapseRenderer:
+    """One chart figure whose artists are updated in place for each frame of `frames`.
+
+    Markers, lines and the title are matplotlib artists blitted onto a cached background.
+    Labels never change text, only position, so they are drawn with PIL straight onto the
+    frame: matplotlib re-lays-out and re-rasterizes every Text on every draw, which made
+    labels the bulk of the frame time.
+    """
+
+    def __init__(self, frames, title=None, constellation_index=None, figsize=(6, 6), dpi=100, label_limit=10):
+        from matplotlib import font_manager
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.collections import LineCollection
+        from matplotlib.figure import Figure
+        from matplotlib.transforms import IdentityTransform
+        from PIL import ImageFont
+        from chart_utils import (BODY_MARKER, LINE_COLOR, TYPE_COLORS, TYPE_MARKERS, BACKGROUND,
+                                 marker_sizes, segment_rows, setup_axes)
+        self.frames = frames
+        self.title = title
+        types = frames['type']
+        self.stars = types == 'Star'
+        self.star_sizes = marker_sizes(frames['magnitude'][self.stars])
+
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot(111, polar=True)
+        setup_axes(self.ax, title)
+        self.title_artist = self.ax.title
+        empty = np.empty((0, 2))
+        # Segments between objects are resolved once; each frame only drops those below the horizon
+        if constellation_index is not None:
+            self.segment_rows, self.segment_owners = segment_rows(frames['hip'], constellation_index)
+            self.constellation_names = [str(name) for name in constellation_index.names]
+        else:
+            self.segment_rows, self.segment_owners = np.empty((0, 2), dtype=np.int64), np.empty(0, dtype=np.int32)
+            self.constellation_names = []
+        # Artists take display (pixel) coordinates: every object is projected once per frame in
+        # one vectorized call instead of the polar transform running path by path
+        self.lines = self.ax.add_collection(LineCollection([], colors=LINE_COLOR, linewidths=0.6, alpha=0.8, zorder=1,
+                                                           transform=IdentityTransform()))
+        self.star_scatter = self.ax.scatter(empty[:, 0], empty[:, 1], c=TYPE_COLORS['Star'], marker='o',
+                                            linewidths=0, label='Star', zorder=2)
+        self.body_scatters = {}
+        for obj_type in dict.fromkeys(types[~self.stars]):
+            self.body_scatters[obj_type] = (np.flatnonzero(types == obj_type), self.ax.scatter(
+                empty[:, 0], empty[:, 1], s=BODY_MARKER, c=TYPE_COLORS.get(obj_type, '#dddddd'),
+                marker=TYPE_MARKERS.get(obj_type, 'o'), edgecolors='black', linewidths=0.5, label=obj_type, zorder=3))
+        for scatter in [self.star_scatter, *(scatter for _, scatter in self.body_scatters.values())]:
+            scatter.set_offset_transform(IdentityTransform())
+        self.fig.legend(loc='lower right', fontsize=7, facecolor=BACKGROUND, labelcolor='#dddddd')
+
+        # Labels for the bodies and the brightest stars
+        star_rows = np.flatnonzero(self.stars)
+        brightest = star_rows[np.argsort(np.nan_to_num(frames['magnitude'][star_rows], nan=np.inf), kind='stable')[:label_limit]]
+        self.label_rows = np.concatenate([np.flatnonzero(~self.stars), brightest])
+        font_path = font_manager.findfont(font_manager.FontProperties())
+        self.label_font = ImageFont.truetype(font_path, max(1, round(7 * dpi / 72)))
+        self.constellation_font = ImageFont.truetype(font_path, max(1, round(6 * dpi / 72)))
+        self.line_color = LINE_COLOR
+
+        # Everything that moves is drawn by hand each frame; the rest is rendered once and blitted
+        self.animated = [self.lines, self.star_scatter, *(scatter for _, scatter in self.body_scatters.values()), self.title_artist]
+        for artist in self.animated:
+            artist.set_animated(True)
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.height = int(self.canvas.get_width_height()[1])
+        self._text = [] # (x, y, text, font, color, anchor) in pixels for the current frame
+
+    def __len__(self):
+        return len(self.frames['times'])
+
+    def update(self, j):
+        """Moves every artist (and label) to frame j."""
+        from chart_utils import constellation_label_positions
+        theta, r = self.frames['theta'][:, j], self.frames['r'][:, j]
+        up = r < 90.0
+        xy = self.ax.transData.transform(np.column_stack([theta, r]))
+        visible_stars = up[self.stars]
+        self.star_scatter.set_offsets(xy[self.stars][visible_stars])
+        self.star_scatter.set_sizes(self.star_sizes[visible_stars])
+        for rows, scatter in self.body_scatters.values():
+            scatter.set_offsets(xy[rows[up[rows]]])
+
+        keep = up[self.segment_rows].all(axis=1)
+        rows = self.segment_rows[keep]
+        self.lines.set_segments(xy[rows])
+
+        # PIL's origin is the top-left corner, matplotlib's the bottom-left
+        self._text = []
+        if len(rows):
+            lines = np.stack([theta[rows], r[rows]], axis=-1)
+            ids, label_theta, label_r = constellation_label_positions(lines, self.segment_owners[keep])
+            label_xy = self.ax.transData.transform(np.column_stack([label_theta, label_r]))
+            for cid, (x, y) in zip(ids, label_xy):
+                self._text.append((x, self.height - y, self.constellation_names[cid], self.constellation_font, self.line_color, 'mm'))
+        for i in self.label_rows[up[self.label_rows]]:
+            self._text.append((xy[i, 0], self.height - xy[i, 1], self.frames['name'][i], self.label_font, '#dddddd', 'mb'))
+        stamp = f"{self.frames['times'][j]:%Y-%m-%d %H:%M} UTC"
+        self.title_artist.set_text(f"{self.title} – {stamp}" if self.title else stamp)
+
+    def frame_image(self, j):
+        """Frame j as an RGBA PIL image."""
+        from PIL import Image, ImageDraw
+        self.update(j)
+        self.canvas.restore_region(self.background)
+        for artist in self.animated:
+            self.fig.draw_artist(artist)
+        image = Image.fromarray(np.asarray(self.canvas.buffer_rgba())) # Copies, so the canvas can move on
+        draw = ImageDraw.Draw(image)
+        for x, y, text, font, color, anchor in self._text:
+            draw.text((x, y), text, font=font, fill=color, anchor=anchor)
+        return image
+
+    def encode_frame(self, j, encoding='rgb'):
+        """Frame j ready for a writer: an RGB image ('rgb'), a palette image ('palette', for GIF)
+        or PNG bytes ('png'). Doing this here keeps quantizing and compression in the workers."""
+        from PIL import Image
+        image = self.frame_image(j).convert('RGB')
+        if encoding == 'palette':
+            return image.quantize(colors=255, method=Image.Quantize.FASTOCTREE)
+        if encoding == 'png':
+            buffer = BytesIO()
+            image.save(buffer, format='png', compress_level=1)
+            return buffer.getvalue()
+        return image
+
+# Per-process renderer, built once by the pool initializer and reused for every chunk
+_worker_renderer = None
+
+def _init_worker(frames, render_kwargs):
+    global _worker_renderer
+    _worker_renderer = TimelapseRenderer(frames, **render_kwargs)
+
+def _render_chunk(args):
+    start, stop, encoding = args
+    return [_worker_renderer.encode_frame(j, encoding) for j in range(start, stop)]
+
+def iter_frames(frames, processes=None, encoding='rgb', chunk_size=FRAME_CHUNK, **render_kwargs):
+    """Every frame in order, encoded as in TimelapseRenderer.encode_frame.
+    processes=None uses every CPU; 1 renders in this process."""
+    count = len(frames['times'])
+    processes = processes or os.cpu_count() or 1
+    if 'constellation_index' not in render_kwargs:
+        from chart_utils import default_constellation_index
+        render_kwargs['constellation_index'] = default_constellation_index()
+    if processes <= 1 or count <= chunk_size:
+        renderer = TimelapseRenderer(frames, **render_kwargs)
+        for j in range(count):
+            yield renderer.encode_frame(j, encoding)
+        return
+    chunks = [(i, min(i + chunk_size, count), encoding) for i in range(0, count, chunk_size)]
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(frames, render_kwargs)) as pool:
+        for encoded in pool.map(_render_chunk, chunks):
+            yield from encoded
+
+def write_gif(images, path, fps=10):
+    """Writes palette frames as a looping GIF. Frames are handed to Pillow as they arrive, but
+    Pillow assembles the animation from all of them in memory: about width x height bytes per
+    frame (360 KB at 600 x 600 px, so roughly 100 MB for 9 hours at 2-minute steps).
+    For long runs write an .mp4 or a PNG directory instead, which stream."""
+    images = iter(images)
+    first = next(images, None)
+    if first is None:
+        raise ValueError("no frames to write")
+    count = 1
+
+    def rest():
+        nonlocal count
+        for image in images:
+            count += 1
+            yield image
+
+    first.save(path, save_all=True, append_images=rest(), duration=round(1000 / fps), loop=0)
+    return count
+
+def write_mp4(images, path, fps=10):
+    """Streams raw RGB frames into ffmpeg (H.264); frames are never all held in memory."""
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        raise RuntimeError("MP4 output needs ffmpeg on PATH; use .gif or a directory instead")
+    count, proc = 0, None
+    for image in images:
+        if proc is None: # Frame size is only known once the first frame arrives
+            width, height = image.size
+            command = [ffmpeg, '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+                       '-s', f"{width}x{height}", '-framerate', str(fps), '-i', '-',
+                       '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-vcodec', 'libx264', '-pix_fmt', 'yuv420p', path]
+            proc = subprocess.Popen(command, stdin=subprocess.PIPE)
+        proc.stdin.write(image.tobytes())
+        count += 1
+    if proc is None:
+        raise ValueError("no frames to write")
+    proc.stdin.close()
+    if proc.wait():
+        raise RuntimeError(f"ffmpeg exited with status {proc.returncode}")
+    return count
+
+def write_sequence(pngs, directory):
+    os.makedirs(directory, exist_ok=True)
+    count = 0
+    for count, png in enumerate(pngs, 1):
+        with open(os.path.join(directory, f"frame_{count - 1:04d}.png"), 'wb') as f:
+            f.write(png)
+    return count
+
+def write_timelapse(frames, output, fps=10, processes=None, **render_kwargs):
+    """Renders frames to output: '.gif', '.mp4', or anything else as a directory of PNGs. Returns the frame count."""
+    extension = os.path.splitext(output)[1].lower()
+    if extension == '.gif':
+        return write_gif(iter_frames(frames, processes, 'palette', **render_kwargs), output, fps)
+    if extension == '.mp4':
+        return write_mp4(iter_frames(frames, processes, 'rgb', **render_kwargs), output, fps)
+    return write_sequence(iter_frames(frames, processes, 'png', **render_kwargs), output)
+
+def render_timelapse(lat, lon, start, end, output, step=timedelta(minutes=2), mag_limit=DEFAULT_MAG_LIMIT,
+                     fps=10, processes=None, **render_kwargs):
+    """Computes a night of positions and writes the time-lapse; see write_timelapse for output types."""
+    frames = compute_frames(lat, lon, start, end, step, mag_limit)
+    return write_timelapse(frames, output, fps, processes, **render_kwargs)
+
+if __name__ == "__main__":
+    from cli import parse_time
+    parser = argparse.ArgumentParser(description="Render a time-lapse sky chart.")
+    parser.add_argument("--lat", type=float, required=True)
+    parser.add_argument("--lon", type=float, required=True)
+    parser.add_argument("--start", type=parse_time, required=True, help="ISO start time, UTC if no offset")
+    parser.add_argument("--end", type=parse_time, required=True, help="ISO end time, UTC if no offset")
+    parser.add_argument("--step", type=float, default=2.0, help="minutes between frames (default: 2)")
+    parser.add_argument("--mag-limit", type=float, default=DEFAULT_MAG_LIMIT)
+    parser.add_argument("--fps", type=float, default=10)
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: all CPUs)")
+    parser.add_argument("-o", "--output", required=True, help="file.gif, file.mp4, or a directory for PNG frames")
+    args = parser.parse_args()
+    count = render_timelapse(args.lat, args.lon, args.start, args.end, args.output,
+                             step=timedelta(minutes=args.step), mag_limit=args.mag_limit,
+                             fps=args.fps, processes=args.processes, title=f"{args.lat:.2f}, {args.lon:.2f}")
+    print(f"Wrote {count} frames to {args.output}")
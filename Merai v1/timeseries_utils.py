@@ -0,0 +1,145 @@
+# timeseries_utils.py
+# Visibility over a time range ("what's up over the next 8 hours") in one batched call.
+# Solar-system bodies are evaluated with Skyfield's vectorized Time arrays; stars use one
+# apparent RA/Dec per star and a NumPy rotation to every sample time, giving
+# (objects x times) altitude/azimuth grids. Rise/transit/set times are found by
+# root-finding (Skyfield's almanac for moving bodies, closed-form hour angles for stars).
+
+from datetime import timedelta
+import numpy as np
+from skyfield import almanac
+from skyfield.api import Topos
+
+from resource_utils import DE421_PATH, HIPP_PATH, get_timescale, get_ephemeris, get_star_catalog
+from catalog_utils import brighter_than, star_from_catalog, proper_names
+from astro_utils import STAR_MAGNITUDE_LIMIT, altaz_from_radec
+from planet_utils import compute_bodies
+from constellation_utils import constellation_at
+
+# Ratio of sidereal to solar time: the sky turns once every 23.934 solar hours
+SIDEREAL_RATE = 1.00273790935
+
+def time_grid(start, end, step=timedelta(minutes=10)):
+    """Sample datetimes from start to end (inclusive when it lands on a step), each exactly start + j * step."""
+    count = (end - start) // step + 1
+    return [start + j * step for j in range(max(count, 1))]
+
+def make_time_range(start, end, step=timedelta(minutes=10)):
+    """Skyfield Time array for time_grid(start, end, step). Built from the datetimes themselves, so
+    samples stay on the requested minutes instead of drifting with Julian-date arithmetic."""
+    return get_timescale().from_datetimes(time_grid(start, end, step))
+
+def _star_events(ra_hours, dec_degrees, lat, lon, start_time, end_time):
+    """Rise/transit/set for fixed RA/Dec from the hour angle at which each star meets the horizon.
+    Returns three lists (one per star) of Julian dates (TT)."""
+    lst0 = (start_time.gast + lon / 15.0) % 24.0
+    duration_hours = (end_time.tt - start_time.tt) * 24.0
+    sidereal_day = 24.0 / SIDEREAL_RATE
+    # Hours from start to the first transit at or after start, then one transit per sidereal day
+    first_transit = ((ra_hours - lst0) % 24.0) / SIDEREAL_RATE
+    k = np.arange(-1, int(np.ceil(duration_hours / sidereal_day)) + 1)
+    transits = first_transit[:, None] + k[None, :] * sidereal_day
+    # cos(H0) outside [-1, 1]: the star never sets (< -1) or never rises (> 1)
+    lat_r, dec_r = np.radians(lat), np.radians(dec_degrees)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cos_h0 = -np.tan(lat_r) * np.tan(dec_r)
+    crosses = np.abs(cos_h0) < 1.0
+    h0_hours = np.where(crosses, np.degrees(np.arccos(np.clip(cos_h0, -1.0, 1.0))) / 15.0, 0.0)
+    half_arc = (h0_hours / SIDEREAL_RATE)[:, None]
+    rises, sets = transits - half_arc, transits + half_arc
+    in_window = lambda hours: (hours >= 0.0) & (hours <= duration_hours)
+    never_up = cos_h0 >= 1.0
+    to_jd = lambda hours: start_time.tt + hours / 24.0
+    results = ([], [], [])
+    for i in range(len(ra_hours)):
+        transit_hours = transits[i][in_window(transits[i])] if not never_up[i] else []
+        if crosses[i]:
+            rise_hours = rises[i][in_window(rises[i])]
+            set_hours = sets[i][in_window(sets[i])]
+        else:
+            rise_hours = set_hours = []
+        results[0].append(to_jd(np.asarray(rise_hours)))
+        results[1].append(to_jd(np.asarray(transit_hours)))
+        results[2].append(to_jd(np.asarray(set_hours)))
+    return results
+
+def _planet_events(observer, target, start_time, end_time):
+    """Rise/transit/set for a moving body via Skyfield's almanac root finders (TT Julian dates)."""
+    rise_t, rise_ok = almanac.find_risings(observer, target, start_time, end_time, horizon_degrees=0.0)
+    set_t, set_ok = almanac.find_settings(observer, target, start_time, end_time, horizon_degrees=0.0)
+    transit_t = almanac.find_transits(observer, target, start_time, end_time)
+    return rise_t.tt[rise_ok], transit_t.tt, set_t.tt[set_ok]
+
+def get_visibility_tracks(lat, lon, start, end, step=timedelta(minutes=10),
+                          mag_limit=STAR_MAGNITUDE_LIMIT, include_events=True):
+    """Altitude/azimuth tracks for the planets, Sun, Moon and every star brighter than mag_limit.
+
+    start and end are timezone-aware datetimes; step is a timedelta. Returns a dict:
+      'times'     : list of T UTC datetimes
+      'name', 'type', 'hip_id' : lists of length N (hip_id is None for solar-system bodies)
+      'altitude', 'azimuth'    : float arrays of shape (N, T), in degrees
+      'constellation' : list of N names (IAU boundaries, at the middle of the range)
+      'magnitude' : list of N values (per-time arrays for solar-system bodies, catalog value for stars)
+      'errors'    : (name, message) for bodies that could not be computed
+      'events'    : list of N dicts {'rise': [...], 'transit': [...], 'set': [...]} of UTC datetimes
+                    (only when include_events is True)
+    Objects are included whether or not they ever rise; filter on altitude for "visible".
+    """
+    ts = get_timescale()
+    grid = time_grid(start, end, step)
+    times = ts.from_datetimes(grid)
+    start_time, end_time = times[0], times[-1]
+    planets = get_ephemeris(DE421_PATH)
+    earth = planets['earth']
+    observer = earth + Topos(latitude_degrees=lat, longitude_degrees=lon)
+    # Every body is evaluated for all sample times in one call each
+    bodies = compute_bodies(observer, times, planets)
+    names, types = list(bodies['name']), list(bodies['type'])
+    hip_ids = [None] * len(names)
+    altitudes, azimuths = list(bodies['altitude']), list(bodies['azimuth'])
+    # Constellation at the middle sample; bodies move well under a constellation per night
+    mid = len(times) // 2
+    constellations = [constellation_at(apparent)[mid] for apparent in bodies['apparent']]
+    events = []
+    if include_events:
+        for target_id in bodies['target_id']:
+            target = planets[target_id]
+            events.append(_planet_events(observer, target, start_time, end_time))
+
+    stars = brighter_than(get_star_catalog(source_path=HIPP_PATH), mag_limit)
+    star_alt = star_az = np.empty((0, len(times)))
+    if len(stars):
+        # Star apparent places drift by well under an arcsecond over a night: compute them once at mid-range
+        mid_time = ts.tt_jd((start_time.tt + end_time.tt) / 2.0)
+        star_apparent = observer.at(mid_time).observe(star_from_catalog(stars)).apparent()
+        ra, dec, _ = star_apparent.radec(epoch='date')
+        constellations.extend(constellation_at(star_apparent))
+        lst = (times.gast + lon / 15.0) % 24.0
+        star_alt, star_az = altaz_from_radec(ra.hours[:, None], dec.degrees[:, None], lat, lst[None, :])
+        star_names = proper_names(stars)
+        for hip, proper_name in zip(stars['hip'], star_names):
+            hip_id = f"HIP {int(hip)}"
+            names.append(proper_name or hip_id)
+            types.append('Star')
+            hip_ids.append(hip_id)
+        if include_events:
+            events.extend(zip(*_star_events(ra.hours, dec.degrees, lat, lon, start_time, end_time)))
+
+    result = {
+        'times': grid, # The requested datetimes, not a round trip through Julian dates
+        'name': names,
+        'type': types,
+        'hip_id': hip_ids,
+        'altitude': np.vstack(altitudes + [star_alt]),
+        'azimuth': np.vstack(azimuths + [star_az]),
+        'magnitude': list(bodies['magnitude']) + [float(m) for m in stars['magnitude']],
+        'constellation': [str(c) for c in constellations],
+        'errors': bodies['errors'],
+    }
+    if include_events:
+        to_datetimes = lambda jd: list(ts.tt_jd(np.asarray(jd)).utc_datetime()) if len(jd) else []
+        result['events'] = [
+            {'rise': to_datetimes(rise), 'transit': to_datetimes(transit), 'set': to_datetimes(set_)}
+            for rise, transit, set_ in events
+        ]
+    return result
@@ -1,31 +1,214 @@
+import os
 import requests
 import html
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError # Not the builtin TimeoutError before Python 3.11
+from urllib.parse import quote
+from requests.adapters import HTTPAdapter
+from cache_utils import SummaryCache
 
-def get_object_image_url(name):
-    url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{name}"
+# Base of the REST API; point MERAI_WIKI_API_URL at a local stub server for offline testing
+WIKI_API_URL = os.environ.get("MERAI_WIKI_API_URL", "https://en.wikipedia.org/api/rest_v1")
+# MediaWiki action API, which answers many titles per request (MERAI_WIKI_ACTION_URL for a stub)
+WIKI_ACTION_URL = os.environ.get("MERAI_WIKI_ACTION_URL", "https://en.wikipedia.org/w/api.php")
+
+REQUEST_TIMEOUT = 5   # seconds per HTTP request
+BATCH_DEADLINE = 15   # seconds for a whole fetch_summaries call
+MAX_WORKERS = 8       # concurrent requests (and pooled connections) per batch
+MULTI_TITLE_LIMIT = 20  # titles per action API query; TextExtracts returns at most 20 intros at once
+THUMBNAIL_SIZE = 320    # px, the thumbnail width the REST summaries use
+
+# Offline mode serves only what is already in the summary cache. MERAI_OFFLINE=1 makes it the
+# default; callers pass offline= per call (e.g. per Streamlit session) to override it
+OFFLINE = os.environ.get("MERAI_OFFLINE", "") == "1"
+
+_session = None
+_session_lock = threading.Lock()
+_cache = None
+_cache_lock = threading.Lock()
+
+def is_offline(offline=None):
+    """The offline= argument of a call, or the process default (MERAI_OFFLINE) when it is None."""
+    return OFFLINE if offline is None else offline
+
+def get_summary_cache():
+    """The process-wide persistent summary cache, opened on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SummaryCache()
+        return _cache
+
+def set_summary_cache(cache):
+    """Swaps in a different SummaryCache (e.g. SummaryCache(':memory:') for testing), or None to reset."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+def get_session():
+    """One shared Session so every lookup reuses pooled keep-alive connections."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            _session.headers["User-Agent"] = "Merai/1.0 (astronomy dashboard)"
+        return _session
+
+def _fetch_remote(name, timeout=REQUEST_TIMEOUT):
+    """Returns (ok, summary). ok is False when the request failed, so the miss must not be cached;
+    a definite "no such page" comes back as (True, None)."""
+    url = f"{WIKI_API_URL}/page/summary/{quote(name.replace(' ', '_'), safe='')}"
     try:
-        resp = requests.get(url, timeout=5)
+        resp = get_session().get(url, timeout=timeout)
         if resp.status_code == 200:
-            data = resp.json()
-            if 'thumbnail' in data and 'source' in data['thumbnail']:
-                return data['thumbnail']['source']
+            summary = resp.json()
+            # A disambiguation page describes nothing in particular; treat it like a missing page
+            return True, None if summary.get('type') == 'disambiguation' else summary
+        if resp.status_code == 404:
+            return True, None
     except Exception:
         pass
-    return None
+    return False, None
 
-def get_object_description(name):
-    url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{name}"
+def _page_summary(page):
+    """REST-summary-shaped dict (extract, thumbnail) for one page of an action API query, or None."""
+    if page.get('missing') or page.get('invalid') or 'disambiguation' in page.get('pageprops', {}):
+        return None
+    summary = {}
+    if page.get('extract'):
+        summary['extract'] = page['extract'].split('\n', 1)[0] # First paragraph, like the REST summary
+    if 'thumbnail' in page:
+        summary['thumbnail'] = {'source': page['thumbnail']['source']}
+    return summary
+
+def _fetch_remote_batch(names, timeout=REQUEST_TIMEOUT):
+    """One action API query for up to MULTI_TITLE_LIMIT titles, with redirects followed.
+    Returns {name: (ok, summary)} like _fetch_remote for each title; all not-ok if the request failed."""
+    params = {
+        'action': 'query', 'format': 'json', 'formatversion': 2, 'redirects': 1,
+        'prop': 'extracts|pageimages|pageprops', 'exintro': 1, 'explaintext': 1, 'exlimit': 'max',
+        'piprop': 'thumbnail', 'pithumbsize': THUMBNAIL_SIZE, 'pilimit': 'max', 'ppprop': 'disambiguation',
+        'titles': '|'.join(names),
+    }
     try:
-        resp = requests.get(url, timeout=5)
-        if resp.status_code == 200:
-            data = resp.json()
-            if 'extract' in data:
-                return html.unescape(data['extract'])
+        resp = get_session().get(WIKI_ACTION_URL, params=params, timeout=timeout)
+        resp.raise_for_status()
+        query = resp.json()['query']
     except Exception:
-        pass
+        return {name: (False, None) for name in names}
+    # Requested title -> page title, through normalization ("HIP_1" -> "HIP 1") and then redirects
+    normalized = {step['from']: step['to'] for step in query.get('normalized', [])}
+    redirects = {step['from']: step['to'] for step in query.get('redirects', [])}
+    pages = {page['title']: page for page in query.get('pages', [])}
+    results = {}
+    for name in names:
+        title = normalized.get(name, name)
+        for _ in range(len(redirects)): # Follows a chain of redirects, without looping on a cycle
+            if title not in redirects:
+                break
+            title = redirects[title]
+        page = pages.get(title)
+        # A title the query did not return a page for (e.g. an interwiki link) counts as missing
+        results[name] = (True, _page_summary(page) if page is not None else None)
+    return results
+
+def _fetch_remote_single(names, timeout=REQUEST_TIMEOUT):
+    return {name: _fetch_remote(name, timeout) for name in names}
+
+def fetch_summary(name, timeout=REQUEST_TIMEOUT, offline=None):
+    """Fetches the /page/summary JSON for one title, through the persistent cache.
+    Returns the dict, or None if missing or unreachable (or not cached, offline)."""
+    if not name:
+        return None
+    offline = is_offline(offline)
+    cache = get_summary_cache()
+    hit, summary = cache.get(name, allow_expired=offline)
+    if hit or offline:
+        return summary
+    ok, summary = _fetch_remote(name, timeout)
+    if ok:
+        cache.put(name, summary)
+    return summary
+
+def iter_summaries(names, max_workers=MAX_WORKERS, timeout=REQUEST_TIMEOUT, deadline=BATCH_DEADLINE,
+                   batch_size=MULTI_TITLE_LIMIT, offline=None):
+    """Yields (name, known, summary) for each distinct title as soon as it is answered:
+    cached titles first, then network results in completion order. summary is None for a
+    page that does not exist (known True) and for a title that could not be answered
+    (known False: request failed, still pending at the deadline, or not cached offline).
+    Only known answers are cached, and callers should not treat unknown titles as missing.
+
+    Uncached titles are sent batch_size at a time as multi-title action API queries, the
+    batches running concurrently; batch_size=1 uses one REST summary request per title.
+    Offline (offline=True, or the MERAI_OFFLINE default) only cached titles are answered.
+    """
+    offline = is_offline(offline)
+    unique_names = list(dict.fromkeys(n for n in names if n))
+    cache = get_summary_cache()
+    missing = []
+    for name in unique_names:
+        hit, summary = cache.get(name, allow_expired=offline)
+        if hit:
+            yield name, True, summary
+        else:
+            missing.append(name)
+    if not missing:
+        return
+    if offline:
+        for name in missing:
+            yield name, False, None
+        return
+    batch_size = max(1, min(batch_size, MULTI_TITLE_LIMIT))
+    fetch = _fetch_remote_batch if batch_size > 1 else _fetch_remote_single
+    batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(batches)))
+    futures = [executor.submit(fetch, batch, timeout) for batch in batches]
+    pending = set(missing)
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            for name, (ok, summary) in future.result().items():
+                if ok:
+                    cache.put(name, summary)
+                pending.discard(name)
+                yield name, ok, summary
+    except FuturesTimeoutError:
+        for name in missing:
+            if name in pending:
+                yield name, False, None
+    finally:
+        # Don't block the caller on stragglers; they finish (or time out) in the background
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def fetch_summaries(names, max_workers=MAX_WORKERS, timeout=REQUEST_TIMEOUT, deadline=BATCH_DEADLINE,
+                    batch_size=MULTI_TITLE_LIMIT, offline=None):
+    """Fetches summaries for many titles concurrently, each distinct title once.
+    Cached titles are answered from disk; only the rest go to the network.
+    Returns {name: summary or None}; titles still pending when the deadline passes map to None.
+    """
+    results = dict.fromkeys(n for n in names if n)
+    results.update((name, summary) for name, _, summary in iter_summaries(names, max_workers, timeout, deadline, batch_size, offline))
+    return results
+
+def summary_image_url(summary):
+    if summary and 'thumbnail' in summary and 'source' in summary['thumbnail']:
+        return summary['thumbnail']['source']
+    return None
+
+def summary_description(summary):
+    if summary and 'extract' in summary:
+        return html.unescape(summary['extract'])
     return None
 
+def get_object_image_url(name):
+    return summary_image_url(fetch_summary(name))
+
+def get_object_description(name):
+    return summary_description(fetch_summary(name))
+
 def extract_name_from_description(description: str) -> str | None:
     """Extracts the first capitalized word from a description, likely a name."""
     if not description: